@@ -11,7 +11,9 @@
 # distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF
 # ANY KIND, either express or implied. See the License for the specific
 # language governing permissions and limitations under the License.
+import asyncio
 import base64
+import bisect
 import datetime
 from hashlib import sha256
 from hashlib import sha1
@@ -19,14 +21,17 @@ import hmac
 import logging
 from email.utils import formatdate
 from operator import itemgetter
+from collections import namedtuple
 import functools
 import time
 import calendar
 import json
+import threading
 
-from awsclient.exceptions import NoCredentialsError
-from awsclient.utils import normalize_url_path, percent_encode_sequence
-from urllib.parse import quote, unquote, urlsplit, parse_qs
+from awsclient.exceptions import CredentialRetrievalError, NoCredentialsError
+from awsclient.utils import (
+    normalize_url_path, percent_encode, percent_encode_sequence)
+from urllib.parse import unquote, urlsplit, parse_qs, parse_qsl
 from urllib.parse import urlunsplit
 from base64 import encodebytes
 
@@ -46,7 +51,132 @@ SIGNED_HEADERS_BLACKLIST = [
     'user-agent',
     'x-amzn-trace-id',
 ]
+# Payloads at least this large are hashed off the event loop by
+# ``SigV4Auth.add_auth_async``.
+ASYNC_PAYLOAD_HASH_THRESHOLD = 8 * PAYLOAD_BUFFER
 UNSIGNED_PAYLOAD = 'UNSIGNED-PAYLOAD'
+STREAMING_PAYLOAD = 'STREAMING-AWS4-HMAC-SHA256-PAYLOAD'
+STREAMING_CHUNK_ALGORITHM = 'AWS4-HMAC-SHA256-PAYLOAD'
+# Size of the data carried by each aws-chunked frame.  S3 requires every
+# chunk but the last one to be at least 8 KiB.
+STREAMING_CHUNK_SIZE = 64 * 1024
+# Length of the ``;chunk-signature=<64 hex chars>\r\n`` part of a chunk
+# header, and of the ``\r\n`` trailing the chunk data.
+_CHUNK_SIGNATURE_LENGTH = len(';chunk-signature=') + 64 + 2
+_CHUNK_TRAILER_LENGTH = 2
+
+# The canonical hosts are cached by the scheme and netloc of the urls,
+# which are the few endpoints the clients of a process talk to.
+MAX_CANONICAL_HOSTS = 1024
+
+SigV4Signature = namedtuple(
+    'SigV4Signature',
+    ['canonical_request', 'signed_headers', 'signature', 'authorization'])
+
+
+class SigningKeyCache(object):
+    """Cache of derived SigV4 signing keys.
+
+    Deriving the signing key takes four chained HMACs, but the result only
+    changes once a day for a given access key, region and service.  Keys are
+    cached on ``(access_key, date, region, service)``.  Keys for older dates,
+    and the secret keys of the access keys left without keys, are evicted
+    as soon as a newer date is seen, and the whole cache is cleared when the
+    secret key behind an access key changes, i.e. when the credentials are
+    rotated.
+
+    A single instance is shared by all the SigV4 signers in the process.
+    """
+
+    def __init__(self):
+        self._keys = {}
+        self._secret_keys = {}
+        self._current_date = None
+        self._lock = threading.Lock()
+
+    def get_key(self, credentials, date, region_name, service_name):
+        access_key = credentials.access_key
+        secret_key = credentials.secret_key
+        cache_key = (access_key, date, region_name, service_name)
+        if self._secret_keys.get(access_key) == secret_key:
+            signing_key = self._keys.get(cache_key)
+            if signing_key is not None:
+                return signing_key
+        signing_key = self.derive_key(
+            secret_key, date, region_name, service_name)
+        with self._lock:
+            if self._secret_keys.get(access_key, secret_key) != secret_key:
+                # The credentials have been rotated, none of the keys
+                # derived from the previous secret can be used anymore.
+                self._clear()
+            if self._current_date is None or date > self._current_date:
+                self._evict_before(date)
+            if date == self._current_date:
+                self._secret_keys[access_key] = secret_key
+                self._keys[cache_key] = signing_key
+        return signing_key
+
+    @staticmethod
+    def derive_key(secret_key, date, region_name, service_name):
+        k_date = _hmac_digest(('AWS4' + secret_key).encode('utf-8'), date)
+        k_region = _hmac_digest(k_date, region_name)
+        k_service = _hmac_digest(k_region, service_name)
+        return _hmac_digest(k_service, 'aws4_request')
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def _clear(self):
+        self._keys = {}
+        self._secret_keys = {}
+
+    def _evict_before(self, date):
+        self._current_date = date
+        self._keys = dict(
+            (k, v) for k, v in self._keys.items() if k[1] == date)
+        # The secret keys of the rotated access keys go with their keys.
+        access_keys = set(k[0] for k in self._keys)
+        self._secret_keys = dict(
+            (k, v) for k, v in self._secret_keys.items() if k in access_keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+
+def _hmac_digest(key, msg):
+    return hmac.new(key, msg.encode('utf-8'), sha256).digest()
+
+
+signing_key_cache = SigningKeyCache()
+_canonical_hosts = {}
+
+
+def _read_chunk(fileobj, size):
+    # Read size bytes, or up to the end of fileobj: raw files, pipes and
+    # sockets may return fewer bytes than asked for.
+    chunk = fileobj.read(size)
+    if not chunk or len(chunk) == size:
+        return chunk
+    chunks = [chunk]
+    remaining = size - len(chunk)
+    while remaining:
+        chunk = fileobj.read(remaining)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b''.join(chunks)
+
+
+def _form_body_as_dict(data):
+    # The body of query requests, serialized by the generated clients, is
+    # already form encoded.
+    if isinstance(data, bytes):
+        data = data.decode('utf-8')
+    if isinstance(data, str):
+        return dict(parse_qsl(data, keep_blank_values=True))
+    return data
 
 
 class BaseSigner(object):
@@ -55,6 +185,33 @@ class BaseSigner(object):
     def add_auth(self, request):
         raise NotImplementedError("add_auth")
 
+    async def add_auth_async(self, request):
+        """Sign the request, once the credentials are refreshed if needed."""
+        await self._refresh_credentials()
+        self.add_auth(request)
+
+    async def _refresh_credentials(self):
+        # ``RefreshableCredentials`` are refreshed before they expire, the
+        # signature is then computed without yielding to the event loop,
+        # so that all its parts come from the same credentials.
+        get_frozen_credentials = getattr(
+            self.credentials, 'get_frozen_credentials', None)
+        if get_frozen_credentials is not None:
+            await get_frozen_credentials()
+
+    def _check_credentials(self):
+        # The synchronous signing paths can not refresh the credentials:
+        # expired ones are refused rather than signing requests bound to
+        # be rejected.
+        if self.credentials is None:
+            raise NoCredentialsError
+        refresh_needed = getattr(self.credentials, 'refresh_needed', None)
+        if refresh_needed is not None and refresh_needed(0):
+            raise CredentialRetrievalError(
+                provider=self.credentials.method,
+                error_msg='the credentials expired, sign with '
+                          'add_auth_async to refresh them')
+
 
 class SigV2Auth(BaseSigner):
     """
@@ -82,9 +239,9 @@ class SigV2Auth(BaseSigner):
             # issues during retries.
             if key == 'Signature':
                 continue
-            value = six.text_type(params[key])
-            pairs.append(quote(key.encode('utf-8'), safe='') + '=' +
-                         quote(value.encode('utf-8'), safe='-_~'))
+            value = str(params[key])
+            pairs.append(percent_encode(key, safe='') + '=' +
+                         percent_encode(value, safe='-_~'))
         qs = '&'.join(pairs)
         string_to_sign += qs
         logger.debug('String to sign: %s', string_to_sign)
@@ -98,20 +255,36 @@ class SigV2Auth(BaseSigner):
         # Because of this we have to parse the query params
         # from the request body so we can update them with
         # the sigv2 auth params.
-        if self.credentials is None:
-            raise NoCredentialsError
+        self._check_credentials()
+        auth_params = {
+            'AWSAccessKeyId': self.credentials.access_key,
+            'SignatureVersion': '2',
+            'SignatureMethod': 'HmacSHA256',
+            'Timestamp': time.strftime(ISO8601, time.gmtime()),
+        }
+        if self.credentials.token:
+            auth_params['SecurityToken'] = self.credentials.token
+        if isinstance(request.data, (bytes, str)) and request.data:
+            # POST of a body already form encoded by the query serializer.
+            # The auth params are appended to it, they only need to be
+            # sorted with the others in the string to sign.
+            params = _form_body_as_dict(request.data)
+            params.update(auth_params)
+            qs, auth_params['Signature'] = self.calc_signature(request,
+                                                               params)
+            body = request.data
+            if isinstance(body, bytes):
+                body = body.decode('utf-8')
+            request.data = request.body = (
+                body + '&' + percent_encode_sequence(auth_params))
+            return request
         if request.data:
             # POST
             params = request.data
         else:
             # GET
             params = request.params
-        params['AWSAccessKeyId'] = self.credentials.access_key
-        params['SignatureVersion'] = '2'
-        params['SignatureMethod'] = 'HmacSHA256'
-        params['Timestamp'] = time.strftime(ISO8601, time.gmtime())
-        if self.credentials.token:
-            params['SecurityToken'] = self.credentials.token
+        params.update(auth_params)
         qs, signature = self.calc_signature(request, params)
         params['Signature'] = signature
         return request
@@ -122,8 +295,7 @@ class SigV3Auth(BaseSigner):
         self.credentials = credentials
 
     def add_auth(self, request):
-        if self.credentials is None:
-            raise NoCredentialsError
+        self._check_credentials()
         if 'Date' in request.headers:
             del request.headers['Date']
         request.headers['Date'] = formatdate(usegmt=True)
@@ -149,13 +321,17 @@ class SigV4Auth(BaseSigner):
     """
     REQUIRES_REGION = True
 
-    def __init__(self, credentials, service_name, region_name):
+    def __init__(self, credentials, service_name, region_name,
+                 async_hash_threshold=ASYNC_PAYLOAD_HASH_THRESHOLD):
         self.credentials = credentials
         # We initialize these value here so the unit tests can have
         # valid values.  But these will get overriden in ``add_auth``
         # later for real requests.
         self._region_name = region_name
         self._service_name = service_name
+        # Payloads smaller than this are hashed inline by ``add_auth_async``,
+        # larger ones are hashed on a worker thread.
+        self.async_hash_threshold = async_hash_threshold
 
     def _sign(self, key, msg, hex=False):
         if hex:
@@ -164,26 +340,37 @@ class SigV4Auth(BaseSigner):
             sig = hmac.new(key, msg.encode('utf-8'), sha256).digest()
         return sig
 
-    def headers_to_sign(self, request):
+    def headers_to_sign(self, request, url_parts=None):
         """
         Select the headers from the request that need to be included
         in the StringToSign.
+
+        The returned dict maps each lowercased header name to the list
+        of values sent for that header.
         """
-        header_map = dict()
-        for name, value in request.headers.items():
-            lname = name.lower()
-            if lname not in SIGNED_HEADERS_BLACKLIST:
-                header_map[lname] = value
-        if 'host' not in header_map:
+        return dict(self._sorted_headers_to_sign(request, url_parts))
+
+    def _sorted_headers_to_sign(self, request, url_parts=None):
+        # The ``(lowercased name, values)`` of the headers to sign, sorted
+        # by name, from the lowercased view of the request headers.
+        headers = [item for item in request.headers.sorted_lower_items()
+                   if item[0] not in SIGNED_HEADERS_BLACKLIST]
+        if 'host' not in request.headers:
             # Ensure we sign the lowercased version of the host, as that
             # is what will ultimately be sent on the wire.
             # TODO: We should set the host ourselves, instead of relying on our
             # HTTP client to set it for us.
-            header_map['host'] = self._canonical_host(request.url).lower()
-        return header_map
-
-    def _canonical_host(self, url):
-        url_parts = urlsplit(url)
+            if url_parts is None:
+                url_parts = urlsplit(request.url)
+            host = _canonical_hosts.get(url_parts[:2])
+            if host is None:
+                host = self._canonical_host(url_parts).lower()
+                if len(_canonical_hosts) < MAX_CANONICAL_HOSTS:
+                    _canonical_hosts[url_parts[:2]] = host
+            bisect.insort(headers, ('host', [host]))
+        return headers
+
+    def _canonical_host(self, url_parts):
         default_ports = {
             'http': 80,
             'https': 443
@@ -195,24 +382,17 @@ class SigV4Auth(BaseSigner):
         # Strip out auth if it's present in the netloc.
         return url_parts.netloc.rsplit('@', 1)[-1]
 
-    def canonical_query_string(self, request):
+    def canonical_query_string(self, request, url_parts=None):
         # The query string can come from two parts.  One is the
         # params attribute of the request.  The other is from the request
         # url (in which case we have to re-split the url into its components
         # and parse out the query string component).
         if request.params:
-            return self._canonical_query_string_params(request.params)
+            return request.params.canonical_query_string()
         else:
-            return self._canonical_query_string_url(urlsplit(request.url))
-
-    def _canonical_query_string_params(self, params):
-        l = []
-        for param in sorted(params):
-            value = str(params[param])
-            l.append('%s=%s' % (quote(param, safe='-_.~'),
-                                quote(value, safe='-_.~')))
-        cqs = '&'.join(l)
-        return cqs
+            if url_parts is None:
+                url_parts = urlsplit(request.url)
+            return self._canonical_query_string_url(url_parts)
 
     def _canonical_query_string_url(self, parts):
         canonical_query_string = ''
@@ -230,19 +410,27 @@ class SigV4Auth(BaseSigner):
             canonical_query_string = '&'.join(sorted_key_vals)
         return canonical_query_string
 
-    def canonical_headers(self, headers_to_sign):
+    def canonical_headers(self, headers_to_sign, sorted_header_names=None):
         """
         Return the headers that need to be included in the StringToSign
         in their canonical form by converting all header keys to lower
         case, sorting them in alphabetical order and then joining
         them into a string, separated by newlines.
         """
+        if sorted_header_names is None:
+            sorted_header_names = sorted(headers_to_sign)
+        return self._canonical_headers([(key, headers_to_sign[key])
+                                        for key in sorted_header_names])
+
+    def _canonical_headers(self, sorted_headers):
+        # ``_header_value`` inlined, most headers have a single value.
         headers = []
-        sorted_header_names = sorted(set(headers_to_sign))
-        for key in sorted_header_names:
-            value = ','.join(self._header_value(v) for v in
-                             sorted(headers_to_sign.get_all(key)))
-            headers.append('%s:%s' % (key, value))
+        for key, values in sorted_headers:
+            if len(values) == 1:
+                headers.append(key + ':' + ' '.join(values[0].split()))
+            else:
+                headers.append(key + ':' + ','.join(
+                    ' '.join(v.split()) for v in sorted(values)))
         return '\n'.join(headers)
 
     def _header_value(self, value):
@@ -253,17 +441,22 @@ class SigV4Auth(BaseSigner):
         # values, and converts sequential spaces to a single space.
         return ' '.join(value.split())
 
-    def signed_headers(self, headers_to_sign):
-        l = ['%s' % n.lower().strip() for n in set(headers_to_sign)]
-        l = sorted(l)
-        return ';'.join(l)
+    def signed_headers(self, headers_to_sign, sorted_header_names=None):
+        if sorted_header_names is None:
+            sorted_header_names = sorted(headers_to_sign)
+        return ';'.join(sorted_header_names)
 
     def payload(self, request):
         if not self._should_sha256_sign_payload(request):
             # When payload signing is disabled, we use this static string in
             # place of the payload checksum.
             return UNSIGNED_PAYLOAD
-        request_body = request.body
+        precomputed = request.context.get('payload_sha256')
+        if precomputed is not None:
+            return precomputed
+        return self._payload_checksum(request.body)
+
+    def _payload_checksum(self, request_body):
         if request_body and hasattr(request_body, 'seek'):
             position = request_body.tell()
             read_chunksize = functools.partial(request_body.read,
@@ -281,6 +474,23 @@ class SigV4Auth(BaseSigner):
         else:
             return EMPTY_SHA256_HASH
 
+    def _payload_length(self, body):
+        if not body:
+            return 0
+        if hasattr(body, 'seek'):
+            position = body.tell()
+            body.seek(0, 2)
+            length = body.tell() - position
+            body.seek(position)
+            return length
+        return len(body)
+
+    def _needs_payload_hash(self, request):
+        # Whether signing the request will hash its body.
+        if 'X-Amz-Content-SHA256' in request.headers:
+            return False
+        return self._should_sha256_sign_payload(request)
+
     def _should_sha256_sign_payload(self, request):
         # Payloads will always be signed over insecure connections.
         if not request.url.startswith('https'):
@@ -292,22 +502,36 @@ class SigV4Auth(BaseSigner):
         return request.context.get('payload_signing_enabled', True)
 
     def canonical_request(self, request):
-        cr = [request.method.upper()]
-        path = self._normalize_url_path(urlsplit(request.url).path)
-        cr.append(path)
-        cr.append(self.canonical_query_string(request))
-        headers_to_sign = self.headers_to_sign(request)
-        cr.append(self.canonical_headers(headers_to_sign) + '\n')
-        cr.append(self.signed_headers(headers_to_sign))
+        return self._canonical_request(request)[0]
+
+    def _canonical_request(self, request):
+        """
+        Build the canonical request in a single pass over the request.
+
+        The url is split once and the headers are read from the sorted,
+        lowercased view of the request headers.  Returns a
+        ``(canonical_request, signed_headers)`` tuple.
+        """
+        url_parts = urlsplit(request.url)
+        sorted_headers = self._sorted_headers_to_sign(request, url_parts)
+        signed_headers = ';'.join([key for key, _ in sorted_headers])
         if 'X-Amz-Content-SHA256' in request.headers:
             body_checksum = request.headers['X-Amz-Content-SHA256']
         else:
             body_checksum = self.payload(request)
-        cr.append(body_checksum)
-        return '\n'.join(cr)
+        cr = '\n'.join([
+            request.method.upper(),
+            self._normalize_url_path(url_parts.path),
+            self.canonical_query_string(request, url_parts),
+            self._canonical_headers(sorted_headers) + '\n',
+            signed_headers,
+            body_checksum,
+        ])
+        return cr, signed_headers
 
     def _normalize_url_path(self, path):
-        normalized_path = quote(normalize_url_path(path), safe='/~')
+        normalized_path = percent_encode(normalize_url_path(path),
+                                         safe='/~')
         return normalized_path
 
     def scope(self, request):
@@ -338,39 +562,72 @@ class SigV4Auth(BaseSigner):
         sts.append(sha256(canonical_request.encode('utf-8')).hexdigest())
         return '\n'.join(sts)
 
+    def signing_key(self, request):
+        return signing_key_cache.get_key(
+            self.credentials, request.context['timestamp'][0:8],
+            self._region_name, self._service_name)
+
     def signature(self, string_to_sign, request):
-        key = self.credentials.secret_key
-        k_date = self._sign(('AWS4' + key).encode('utf-8'),
-                            request.context['timestamp'][0:8])
-        k_region = self._sign(k_date, self._region_name)
-        k_service = self._sign(k_region, self._service_name)
-        k_signing = self._sign(k_service, 'aws4_request')
+        k_signing = self.signing_key(request)
         return self._sign(k_signing, string_to_sign, hex=True)
 
     def add_auth(self, request):
-        if self.credentials is None:
-            raise NoCredentialsError
+        self._check_credentials()
         datetime_now = datetime.datetime.utcnow()
         request.context['timestamp'] = datetime_now.strftime(SIGV4_TIMESTAMP)
         # This could be a retry.  Make sure the previous
         # authorization header is removed first.
         self._modify_request_before_signing(request)
-        canonical_request = self.canonical_request(request)
+        signed = self.sign(request)
+        self._inject_signature_to_request(request, signed)
+
+    async def add_auth_async(self, request):
+        """
+        Sign the request without blocking the event loop on the payload.
+
+        Bodies at least ``async_hash_threshold`` bytes long are read and
+        hashed on the loop's default executor before signing.  ``hashlib``
+        releases the GIL while hashing large buffers, so other coroutines
+        keep running meanwhile.  Smaller bodies are hashed inline, where
+        handing off to a thread would cost more than it saves.
+        """
+        if self.credentials is None:
+            raise NoCredentialsError
+        body = request.body
+        if (body and self._needs_payload_hash(request) and
+                self._payload_length(body) >= self.async_hash_threshold):
+            loop = asyncio.get_running_loop()
+            request.context['payload_sha256'] = await loop.run_in_executor(
+                None, self._payload_checksum, body)
+        await self._refresh_credentials()
+        try:
+            self.add_auth(request)
+        finally:
+            request.context.pop('payload_sha256', None)
+
+    def sign(self, request):
+        """
+        Compute the signature of an already prepared request.
+
+        Returns a ``SigV4Signature`` holding the canonical request, the
+        signed headers string, the signature and the Authorization header
+        value, all computed from a single canonicalization pass.
+        """
+        canonical_request, signed_headers = self._canonical_request(request)
         logger.debug("Calculating signature using v4 auth.")
         logger.debug('CanonicalRequest:\n%s', canonical_request)
         string_to_sign = self.string_to_sign(request, canonical_request)
         logger.debug('StringToSign:\n%s', string_to_sign)
         signature = self.signature(string_to_sign, request)
         logger.debug('Signature:\n%s', signature)
-
-        self._inject_signature_to_request(request, signature)
-
-    def _inject_signature_to_request(self, request, signature):
-        l = ['AWS4-HMAC-SHA256 Credential=%s' % self.scope(request)]
-        headers_to_sign = self.headers_to_sign(request)
-        l.append('SignedHeaders=%s' % self.signed_headers(headers_to_sign))
-        l.append('Signature=%s' % signature)
-        request.headers['Authorization'] = ', '.join(l)
+        authorization = (
+            'AWS4-HMAC-SHA256 Credential=%s, SignedHeaders=%s, Signature=%s'
+            % (self.scope(request), signed_headers, signature))
+        return SigV4Signature(canonical_request, signed_headers,
+                              signature, authorization)
+
+    def _inject_signature_to_request(self, request, signed):
+        request.headers['Authorization'] = signed.authorization
         return request
 
     def _modify_request_before_signing(self, request):
@@ -406,12 +663,117 @@ class SigV4Auth(BaseSigner):
 
 
 class S3SigV4Auth(SigV4Auth):
+    """
+    Sign a S3 request with Signature V4.
+
+    Setting ``request.context['streaming_payload_signing']`` to True signs
+    the body with the ``aws-chunked`` encoding instead of hashing it up
+    front: only the headers are signed before sending, and the body is
+    replaced with an async generator that signs each chunk, chained to the
+    signature of the previous one, as it is streamed to the socket.  The
+    body is therefore read once, with constant memory.  The chunk size can
+    be set with ``request.context['streaming_chunk_size']``.
+    """
+
     def _modify_request_before_signing(self, request):
         super(S3SigV4Auth, self)._modify_request_before_signing(request)
         if 'X-Amz-Content-SHA256' in request.headers:
             del request.headers['X-Amz-Content-SHA256']
 
-        request.headers['X-Amz-Content-SHA256'] = self.payload(request)
+        if self._should_stream_sign_payload(request):
+            self._set_aws_chunked_headers(request)
+            request.headers['X-Amz-Content-SHA256'] = STREAMING_PAYLOAD
+        else:
+            request.headers['X-Amz-Content-SHA256'] = self.payload(request)
+
+    def _inject_signature_to_request(self, request, signed):
+        super(S3SigV4Auth, self)._inject_signature_to_request(request, signed)
+        if request.headers.get('X-Amz-Content-SHA256') == STREAMING_PAYLOAD:
+            # The chunks are signed as they are sent, with the signing key
+            # of the credentials the headers were signed with.
+            request.body = self._aws_chunked_body(
+                request, request.body, signed.signature,
+                self.signing_key(request))
+        return request
+
+    def _needs_payload_hash(self, request):
+        return (self._should_sha256_sign_payload(request) and
+                not self._should_stream_sign_payload(request))
+
+    def _should_stream_sign_payload(self, request):
+        return (request.context.get('streaming_payload_signing', False) and
+                self._should_sha256_sign_payload(request))
+
+    def _set_aws_chunked_headers(self, request):
+        decoded_length = self._payload_length(request.body)
+        chunk_size = request.context.get(
+            'streaming_chunk_size', STREAMING_CHUNK_SIZE)
+        content_encoding = request.headers.get('Content-Encoding')
+        if content_encoding:
+            del request.headers['Content-Encoding']
+            request.headers['Content-Encoding'] = (
+                'aws-chunked,%s' % content_encoding)
+        else:
+            request.headers['Content-Encoding'] = 'aws-chunked'
+        if 'X-Amz-Decoded-Content-Length' in request.headers:
+            del request.headers['X-Amz-Decoded-Content-Length']
+        request.headers['X-Amz-Decoded-Content-Length'] = decoded_length
+        if 'Content-Length' in request.headers:
+            del request.headers['Content-Length']
+        request.headers['Content-Length'] = self._aws_chunked_length(
+            decoded_length, chunk_size)
+
+    def _aws_chunked_length(self, decoded_length, chunk_size):
+        full_chunks, remaining = divmod(decoded_length, chunk_size)
+        length = full_chunks * self._chunk_frame_length(chunk_size)
+        if remaining:
+            length += self._chunk_frame_length(remaining)
+        # The payload is terminated by an empty, but still signed, chunk.
+        return length + self._chunk_frame_length(0)
+
+    def _chunk_frame_length(self, size):
+        return (len('%x' % size) + _CHUNK_SIGNATURE_LENGTH + size +
+                _CHUNK_TRAILER_LENGTH)
+
+    async def _aws_chunked_body(self, request, body, seed_signature,
+                                signing_key):
+        chunk_size = request.context.get(
+            'streaming_chunk_size', STREAMING_CHUNK_SIZE)
+        sts_prefix = '\n'.join([
+            STREAMING_CHUNK_ALGORITHM,
+            request.context['timestamp'],
+            self.credential_scope(request),
+        ]) + '\n'
+        sts_empty_hash = '\n' + EMPTY_SHA256_HASH + '\n'
+        if hasattr(body, 'read'):
+            # File bodies are read on the loop's default executor, so that
+            # the disk does not block the other coroutines.  Every chunk but
+            # the last is read whole, as _aws_chunked_length counts on.
+            loop = asyncio.get_running_loop()
+            read = functools.partial(_read_chunk, body, chunk_size)
+        else:
+            view = memoryview(body or b'')
+            offset = 0
+        previous_signature = seed_signature
+        while True:
+            if hasattr(body, 'read'):
+                chunk = await loop.run_in_executor(None, read)
+            else:
+                chunk = view[offset:offset + chunk_size]
+                offset += len(chunk)
+            string_to_sign = (sts_prefix + previous_signature +
+                              sts_empty_hash + sha256(chunk).hexdigest())
+            previous_signature = hmac.new(
+                signing_key, string_to_sign.encode('utf-8'),
+                sha256).hexdigest()
+            yield ('%x;chunk-signature=%s\r\n' % (
+                len(chunk), previous_signature)).encode('utf-8')
+            if chunk:
+                yield chunk
+            yield b'\r\n'
+            # The payload is terminated by an empty, but still signed, chunk.
+            if not chunk:
+                return
 
     def _should_sha256_sign_payload(self, request):
         # S3 allows optional body signing, so to minimize the performance
@@ -504,7 +866,7 @@ class SigV4QueryAuth(SigV4Auth):
         if request.data:
             # We also need to move the body params into the query string. To
             # do this, we first have to convert it to a dict.
-            query_dict.update(self._get_body_as_dict(request))
+            query_dict.update(self._get_body_as_dict(request, content_type))
             request.data = ''
         if query_dict:
             operation_params = percent_encode_sequence(query_dict) + '&'
@@ -522,23 +884,27 @@ class SigV4QueryAuth(SigV4Auth):
         new_url_parts = (p[0], p[1], p[2], new_query_string, p[4])
         request.url = urlunsplit(new_url_parts)
 
-    def _get_body_as_dict(self, request):
-        # For query services, request.data is form-encoded and is already a
-        # dict, but for other services such as rest-json it could be a json
-        # string or bytes. In those cases we attempt to load the data as a
-        # dict.
+    def _get_body_as_dict(self, request, content_type=None):
+        # For query services, request.data is form-encoded, either a dict or
+        # the body built by the query serializer, but for other services
+        # such as rest-json it could be a json string or bytes. In those
+        # cases we attempt to load the data as a dict.
         data = request.data
-        if isinstance(data, six.binary_type):
+        if content_type is None:
+            content_type = request.headers.get('Content-Type') or ''
+        if content_type.startswith('application/x-www-form-urlencoded'):
+            return _form_body_as_dict(data)
+        if isinstance(data, bytes):
             data = json.loads(data.decode('utf-8'))
-        elif isinstance(data, six.string_types):
+        elif isinstance(data, str):
             data = json.loads(data)
         return data
 
-    def _inject_signature_to_request(self, request, signature):
+    def _inject_signature_to_request(self, request, signed):
         # Rather than calculating an "Authorization" header, for the query
         # param quth, we just append an 'X-Amz-Signature' param to the end
         # of the query string.
-        request.url += '&X-Amz-Signature=%s' % signature
+        request.url += '&X-Amz-Signature=%s' % signed.signature
 
 
 class S3SigV4QueryAuth(SigV4QueryAuth):
@@ -556,6 +922,9 @@ class S3SigV4QueryAuth(SigV4QueryAuth):
         # For S3, we do not normalize the path.
         return path
 
+    def _needs_payload_hash(self, request):
+        return False
+
     def payload(self, request):
         # From the doc link above:
         # "You don't include a payload hash in the Canonical Request, because
@@ -563,6 +932,98 @@ class S3SigV4QueryAuth(SigV4QueryAuth):
         # payload. Instead, you use a constant string "UNSIGNED-PAYLOAD".
         return UNSIGNED_PAYLOAD
 
+    def presign_many(self, bucket, keys, expires=None, method='GET',
+                     endpoint_url=None):
+        """Presign a url for each object of keys in bucket.
+
+        The urls of a batch share their timestamp, so everything but the
+        path is computed once: the credential scope, the signing key, the
+        auth query string and the signed headers, which are only the host.
+        Each key then costs the encoding of its path, one SHA256 of the
+        canonical request and the HMAC of the string to sign.
+
+        :type bucket: str
+        :param bucket: The name of the bucket.
+
+        :type keys: iterable
+        :param keys: The keys of the objects to presign.
+
+        :type expires: int
+        :param expires: The number of seconds the urls are valid for, the
+            ``expires`` of the signer by default.
+
+        :type method: str
+        :param method: The HTTP method the urls are presigned for.
+
+        :type endpoint_url: str
+        :param endpoint_url: The S3 endpoint, e.g. ``http://localhost:9000``,
+            addressed path style.  By default the urls are addressed virtual
+            host style on the endpoint of the region of the signer.
+
+        :return: The list of the presigned urls, in the order of keys.
+
+        :raises CredentialRetrievalError: If the credentials are
+            ``RefreshableCredentials`` that expired, see
+            ``presign_many_async``.
+        """
+        self._check_credentials()
+        if expires is None:
+            expires = self._expires
+        if endpoint_url is None:
+            endpoint_url = 'https://%s.s3.%s.amazonaws.com' % (
+                bucket, self._region_name)
+            bucket_path = ''
+        else:
+            endpoint_url = endpoint_url.rstrip('/')
+            bucket_path = '/' + percent_encode(bucket, safe='~')
+        host = self._canonical_host(urlsplit(endpoint_url)).lower()
+        timestamp = datetime.datetime.utcnow().strftime(SIGV4_TIMESTAMP)
+        date = timestamp[0:8]
+        credential_scope = '%s/%s/%s/aws4_request' % (
+            date, self._region_name, self._service_name)
+        auth_params = [
+            ('X-Amz-Algorithm', 'AWS4-HMAC-SHA256'),
+            ('X-Amz-Credential', '%s/%s' % (self.credentials.access_key,
+                                            credential_scope)),
+            ('X-Amz-Date', timestamp),
+            ('X-Amz-Expires', expires),
+            ('X-Amz-SignedHeaders', 'host'),
+        ]
+        if self.credentials.token is not None:
+            auth_params.append(('X-Amz-Security-Token',
+                                self.credentials.token))
+        # Sorted, the query string is also the canonical one.
+        query_string = percent_encode_sequence(sorted(auth_params))
+        canonical_head = method.upper() + '\n' + bucket_path
+        canonical_tail = '\n%s\nhost:%s\n\nhost\n%s' % (
+            query_string, host, UNSIGNED_PAYLOAD)
+        string_to_sign_head = 'AWS4-HMAC-SHA256\n%s\n%s\n' % (
+            timestamp, credential_scope)
+        url_head = endpoint_url + bucket_path
+        url_tail = '?' + query_string + '&X-Amz-Signature='
+        mac = hmac.new(signing_key_cache.get_key(
+            self.credentials, date, self._region_name, self._service_name),
+            digestmod=sha256)
+        urls = []
+        for key in keys:
+            path = '/' + percent_encode(key, safe='/~')
+            canonical_request = canonical_head + path + canonical_tail
+            key_mac = mac.copy()
+            key_mac.update((string_to_sign_head + sha256(
+                canonical_request.encode('utf-8')).hexdigest()).encode())
+            urls.append(url_head + path + url_tail + key_mac.hexdigest())
+        return urls
+
+    async def presign_many_async(self, bucket, keys, expires=None,
+                                 method='GET', endpoint_url=None):
+        """Presign the urls of keys like ``presign_many``, once the
+        credentials are refreshed if needed."""
+        if self.credentials is None:
+            raise NoCredentialsError
+        await self._refresh_credentials()
+        return self.presign_many(bucket, keys, expires=expires,
+                                 method=method, endpoint_url=endpoint_url)
+
 
 class S3SigV4PostAuth(SigV4Auth):
     """
@@ -572,6 +1033,7 @@ class S3SigV4PostAuth(SigV4Auth):
     http://docs.aws.amazon.com/AmazonS3/latest/API/sigv4-UsingHTTPPOST.html
     """
     def add_auth(self, request):
+        self._check_credentials()
         datetime_now = datetime.datetime.utcnow()
         request.context['timestamp'] = datetime_now.strftime(SIGV4_TIMESTAMP)
 
@@ -641,28 +1103,16 @@ class HmacV1Auth(BaseSigner):
             del headers['Date']
         headers['Date'] = self._get_date()
         for ih in interesting_headers:
-            found = False
-            for key in headers:
-                lk = key.lower()
-                if headers[key] is not None and lk == ih:
-                    hoi.append(headers[key].strip())
-                    found = True
-            if not found:
-                hoi.append('')
+            value = headers.get(ih)
+            hoi.append(value.strip() if value is not None else '')
         return '\n'.join(hoi)
 
     def canonical_custom_headers(self, headers):
         hoi = []
-        custom_headers = {}
-        for key in headers:
-            lk = key.lower()
-            if headers[key] is not None:
-                if lk.startswith('x-amz-'):
-                    custom_headers[lk] = ','.join(v.strip() for v in
-                                                  headers.get_all(key))
-        sorted_header_keys = sorted(custom_headers.keys())
-        for key in sorted_header_keys:
-            hoi.append("%s:%s" % (key, custom_headers[key]))
+        for key, values in headers.sorted_lower_items():
+            if key.startswith('x-amz-'):
+                hoi.append("%s:%s" % (key, ','.join(v.strip()
+                                                    for v in values)))
         return '\n'.join(hoi)
 
     def unquote_v(self, nv):
@@ -712,7 +1162,8 @@ class HmacV1Auth(BaseSigner):
     def get_signature(self, method, split, headers, expires=None,
                       auth_path=None):
         if self.credentials.token:
-            del headers['x-amz-security-token']
+            if 'x-amz-security-token' in headers:
+                del headers['x-amz-security-token']
             headers['x-amz-security-token'] = self.credentials.token
         string_to_sign = self.canonical_string(method,
                                                split,
@@ -722,8 +1173,7 @@ class HmacV1Auth(BaseSigner):
         return self.sign_string(string_to_sign)
 
     def add_auth(self, request):
-        if self.credentials is None:
-            raise NoCredentialsError
+        self._check_credentials()
         logger.debug("Calculating signature using hmacv1 auth.")
         split = urlsplit(request.url)
         logger.debug('HTTP request method: %s', request.method)
@@ -807,6 +1257,7 @@ class HmacV1PostAuth(HmacV1Auth):
     http://docs.aws.amazon.com/AmazonS3/latest/dev/UsingHTTPPOST.html
     """
     def add_auth(self, request):
+        self._check_credentials()
         fields = {}
         if request.context.get('s3-presign-post-fields', None) is not None:
             fields = request.context['s3-presign-post-fields']
@@ -0,0 +1,267 @@
+import asyncio
+import copy
+import logging
+import xml.etree.ElementTree as ElementTree
+
+from .auth import S3SigV4Auth, SigV4Auth
+from .datastructures import QueryParams
+from .endpoints import ServiceEndpoints
+from .exceptions import ClientError, NoCredentialsError
+from .paginate import Paginator, PaginatorModel
+from .parsers import XMLStreamParser, xml_root
+from .request import Request
+from .retries import CONNECTION_ERRORS, DEFAULT_RETRY_MODE, RetryHandler
+from .session import Session
+from .utils import json_loads
+from .waiter import Waiter, WaiterModel, WaiterScheduler
+
+logger = logging.getLogger(__name__)
+
+
+def parse_empty(status_code, headers, body):
+    """The parser of the operations without output."""
+    return {}
+
+
+class BaseClient(object):
+    """Base class of the service clients generated by clientmaker.
+
+    A generated client has one coroutine method per operation.  The method
+    serializes its arguments into a request dict, with straight-line code
+    specialised for the operation, and hands it to ``_make_api_call``
+    together with the operation's generated response parser.
+
+    A request dict holds:
+
+        * method - The HTTP method.
+        * url_path - The path of the url, already percent encoded.
+        * query - A list of ``(name, value)`` query string parameters.
+        * headers - A dict of headers.
+        * body - The body, as bytes, or None.
+
+    Requests failing with transient errors are retried as described by the
+    ``RETRY_CONFIG`` of the service, see ``awsclient.retries``.
+
+    Clients created without credentials use the ones the session resolves
+    with the default provider chain, see ``awsclient.credentials``.
+    """
+    SERVICE_NAME = None
+    ENDPOINT_PREFIX = None
+    SIGNING_NAME = None
+    SIGNATURE_VERSION = 'v4'
+    PROTOCOL = None
+    RETRY_CONFIG = None
+    ENDPOINTS = None
+    WAITERS = {}
+    PAGINATORS = {}
+    # Whether the operations parsed by an XMLStreamParser return the
+    # XMLResponseStream instead of the parsed output, see ``_streaming``.
+    _stream_responses = False
+
+    def __init__(self, credentials=None, region_name='us-east-1', session=None,
+                 endpoint_url=None, retry_mode=DEFAULT_RETRY_MODE,
+                 max_attempts=None):
+        # Resolved by the session on the first request if not given.
+        self.credentials = credentials
+        self.region_name = region_name
+        self._owns_session = session is None
+        self.session = Session() if session is None else session
+        signing_name, signing_region = self.SIGNING_NAME, region_name
+        endpoint = None
+        if self.ENDPOINTS is not None:
+            endpoint = self._service_endpoints().resolve(region_name)
+        if endpoint is not None:
+            credential_scope = endpoint.get('credentialScope', {})
+            signing_name = credential_scope.get('service', signing_name)
+            signing_region = credential_scope.get('region', signing_region)
+        if endpoint_url is None:
+            if endpoint is not None:
+                endpoint_url = self._service_endpoints().url(region_name)
+            else:
+                endpoint_url = 'https://%s.%s.amazonaws.com' % (
+                    self.ENDPOINT_PREFIX, region_name)
+        self.endpoint_url = endpoint_url.rstrip('/')
+        if self.SIGNATURE_VERSION in ('s3', 's3v4'):
+            signer_cls = S3SigV4Auth
+        else:
+            signer_cls = SigV4Auth
+        self._signer = signer_cls(credentials, signing_name, signing_region)
+        self._retry_handler = RetryHandler(self.RETRY_CONFIG, retry_mode,
+                                           max_attempts)
+        self._waiter_scheduler = None
+
+    @classmethod
+    def _service_endpoints(cls):
+        # Compiled once per client class.
+        endpoints = cls.__dict__.get('_endpoints')
+        if endpoints is None:
+            endpoints = ServiceEndpoints(cls.ENDPOINTS)
+            cls._endpoints = endpoints
+        return endpoints
+
+    def can_paginate(self, operation_name):
+        """Whether the operation, e.g. ``list_objects_v2``, can be
+        paginated."""
+        return operation_name in self.PAGINATORS
+
+    def get_paginator(self, operation_name):
+        """Return the paginator of operation_name, e.g.
+        ``list_objects_v2``."""
+        models = self.__class__.__dict__.get('_paginator_models')
+        if models is None:
+            models = self.__class__._paginator_models = {}
+        model = models.get(operation_name)
+        if model is None:
+            try:
+                config = self.PAGINATORS[operation_name]
+            except KeyError:
+                raise ValueError('Paginator for operation does not exist: '
+                                 '%s' % operation_name)
+            # Compiled once per client class.
+            model = models[operation_name] = PaginatorModel(config)
+        return Paginator(self, model)
+
+    def _streaming(self):
+        """A copy of the client whose rest-xml list operations return the
+        ``XMLResponseStream`` of their response, to iterate over the items
+        of the lists as they are received.  A stream left before its end
+        must be closed, see ``XMLResponseStream``."""
+        client = copy.copy(self)
+        client._stream_responses = True
+        return client
+
+    @property
+    def waiter_names(self):
+        """The names of the waiters of the service."""
+        return sorted(self.WAITERS)
+
+    def get_waiter(self, waiter_name):
+        """Return the waiter waiter_name, e.g. ``instance_running``.
+
+        All the waiters of a client share a ``WaiterScheduler``.
+        """
+        models = self.__class__.__dict__.get('_waiter_models')
+        if models is None:
+            models = self.__class__._waiter_models = {}
+        model = models.get(waiter_name)
+        if model is None:
+            try:
+                config = self.WAITERS[waiter_name]
+            except KeyError:
+                raise ValueError('Waiter does not exist: %s' % waiter_name)
+            # Compiled once per client class.
+            model = models[waiter_name] = WaiterModel(config['name'], config)
+        if self._waiter_scheduler is None:
+            self._waiter_scheduler = WaiterScheduler()
+        return Waiter(self, model, self._waiter_scheduler)
+
+    async def aclose(self):
+        """Close the session, if it was created by this client."""
+        if self._owns_session:
+            await self.session.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def _make_api_call(self, operation_name, request_dict, parser,
+                             stream_output=False, auth_type=None):
+        attempts = self._retry_handler.attempts(operation_name)
+        # Bodies read from a stream can not be sent again.
+        retryable = isinstance(request_dict['body'], (
+            bytes, bytearray, memoryview, str, type(None)))
+        while True:
+            await attempts.before_send()
+            try:
+                response = await self._send(request_dict, stream_output,
+                                            auth_type)
+            except CONNECTION_ERRORS as error:
+                delay = attempts.retry_delay(exception=error,
+                                             retryable=retryable)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            if stream_output:
+                body = response
+            else:
+                body = response.content
+            if response.status_code >= 300:
+                if stream_output:
+                    body = await response.read()
+                    await response.close()
+                error = self._error_from_response(
+                    operation_name, response.status_code, response.headers,
+                    body)
+                delay = attempts.retry_delay(
+                    response.status_code, error.response['Error']['Code'],
+                    response.headers, body, retryable=retryable)
+                if delay is None:
+                    raise error
+            else:
+                delay = attempts.retry_delay(
+                    response.status_code, None, response.headers,
+                    None if stream_output else body, retryable=retryable)
+                if delay is None:
+                    if isinstance(parser, XMLStreamParser):
+                        stream = parser.iter_parse(
+                            response.status_code, response.headers, body)
+                        if self._stream_responses:
+                            return stream
+                        return await stream.read()
+                    return parser(response.status_code, response.headers,
+                                  body)
+            await asyncio.sleep(delay)
+
+    async def _send(self, request_dict, stream_output, auth_type):
+        request = Request(request_dict['method'],
+                          self.endpoint_url + request_dict['url_path'],
+                          data=request_dict['body'],
+                          params=QueryParams(request_dict['query']),
+                          stream_output=stream_output)
+        for name, value in request_dict['headers'].items():
+            request.headers[name] = value
+        if auth_type == 'v4-unsigned-body':
+            request.context['payload_signing_enabled'] = False
+        if auth_type != 'none':
+            if self.credentials is None:
+                await self._resolve_credentials()
+            await self._signer.add_auth_async(request)
+        return await request(self.session.connection_pool)
+
+    async def _resolve_credentials(self):
+        credentials = await self.session.get_credentials()
+        if credentials is None:
+            raise NoCredentialsError
+        self.credentials = self._signer.credentials = credentials
+
+    def _error_from_response(self, operation_name, status_code, headers,
+                             body):
+        code, message = str(status_code), ''
+        if self.PROTOCOL in ('json', 'rest-json'):
+            code, message = self._parse_json_error(headers, body, code)
+        elif body:
+            try:
+                root = xml_root(body)
+            except ElementTree.ParseError:
+                logger.debug('Unable to parse the error response: %r', body)
+            else:
+                code = root.findtext('.//Code') or code
+                message = root.findtext('.//Message') or message
+        return ClientError(code, message, operation_name,
+                           status_code=status_code)
+
+    def _parse_json_error(self, headers, body, code):
+        try:
+            data = json_loads(body) if body else {}
+        except ValueError:
+            data = {}
+        code = (headers.get('x-amzn-errortype') or data.get('__type') or
+                data.get('code') or data.get('Code') or code)
+        # Error types can look like ``aws.protocols#ValidationException``
+        # or ``ValidationException:http://internal.amazon.com/...``.
+        code = code.split(':')[0].rsplit('#', 1)[-1]
+        message = data.get('message') or data.get('Message') or ''
+        return code, message
@@ -0,0 +1,631 @@
+"""Credentials, and the chain of providers resolving them.
+
+The credentials of a session are resolved by a chain of providers, the
+first one finding credentials wins:
+
+    * ``EnvProvider`` - The ``AWS_ACCESS_KEY_ID``, ``AWS_SECRET_ACCESS_KEY``
+      and ``AWS_SESSION_TOKEN`` environment variables.
+    * ``AssumeRoleProvider`` - The ``role_arn`` of the profile, assumed with
+      STS from the credentials of its ``source_profile`` or
+      ``credential_source``.
+    * ``SharedFileProvider`` - The keys of the profile in the shared
+      credentials file, ``~/.aws/credentials``, or in the config file,
+      ``~/.aws/config``.
+    * ``ContainerProvider`` - The container credentials endpoint, e.g. the
+      one of the ECS tasks.
+    * ``InstanceMetadataProvider`` - The role of the EC2 instance, from the
+      instance metadata service, IMDSv2.
+
+Temporary credentials are ``RefreshableCredentials``.  Once they expire
+within ``advisory_timeout`` seconds, a single background task refreshes
+them while requests keep being signed with the current ones.  Requests
+only wait for the refresh once the credentials expire within
+``mandatory_timeout`` seconds, and all of them wait for the same one, so
+the thousands of requests of a busy client hitting the expiry together
+cost a single call to the provider.
+"""
+import asyncio
+import configparser
+import functools
+import json
+import logging
+import os
+import time
+import xml.etree.ElementTree as ElementTree
+
+from .auth import SigV4Auth
+from .exceptions import CredentialRetrievalError, InvalidConfigError
+from .exceptions import PartialCredentialsError, ProfileNotFound
+from .httpsession import ConnectionPool
+from .request import Request
+from .retries import CONNECTION_ERRORS
+from .utils import parse_timestamp, percent_encode_sequence
+
+logger = logging.getLogger(__name__)
+
+# Credentials are refreshed in the background this many seconds before
+# they expire ...
+ADVISORY_REFRESH_TIMEOUT = 15 * 60
+# ... and requests wait for the refresh from this many seconds before.
+MANDATORY_REFRESH_TIMEOUT = 10 * 60
+# Seconds before trying again a refresh that did not get fresh credentials.
+REFRESH_RETRY_DELAY = 10
+
+DEFAULT_METADATA_TIMEOUT = 1
+DEFAULT_METADATA_ATTEMPTS = 1
+METADATA_ENDPOINT = 'http://169.254.169.254'
+METADATA_TOKEN_TTL = 21600
+CONTAINER_ENDPOINT = 'http://169.254.170.2'
+STS_API_VERSION = '2011-06-15'
+
+
+class Credentials(object):
+    """Static credentials.
+
+    :type access_key: str
+    :param access_key: The access key.
+
+    :type secret_key: str
+    :param secret_key: The secret key.
+
+    :type token: str
+    :param token: The session token of temporary credentials.
+
+    :type method: str
+    :param method: The provider the credentials come from, e.g. ``env``.
+    """
+
+    def __init__(self, access_key, secret_key, token=None, method=None):
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.token = token
+        self.method = method
+
+    async def get_frozen_credentials(self):
+        """The credentials to sign a request with."""
+        return self
+
+    def __repr__(self):
+        return '<Credentials access_key=%s method=%s>' % (
+            self.access_key, self.method)
+
+
+class RefreshableCredentials(object):
+    """Temporary credentials, refreshed before they expire.
+
+    The access key, secret key and token attributes are those of the
+    current credentials, which ``get_frozen_credentials`` refreshes when
+    needed.  The signers call it before signing.
+
+    :type metadata: dict
+    :param metadata: The ``access_key``, ``secret_key``, ``token`` and
+        ``expiry_time`` of the credentials.
+
+    :type refresh_using: coroutine function
+    :param refresh_using: Called without arguments, returns the metadata of
+        fresh credentials.
+
+    :type method: str
+    :param method: The provider the credentials come from.
+    """
+
+    def __init__(self, metadata, refresh_using, method,
+                 advisory_timeout=ADVISORY_REFRESH_TIMEOUT,
+                 mandatory_timeout=MANDATORY_REFRESH_TIMEOUT):
+        self._refresh_using = refresh_using
+        self.method = method
+        self.advisory_timeout = advisory_timeout
+        self.mandatory_timeout = mandatory_timeout
+        self._refresh_task = None
+        self._next_refresh = 0
+        self._update(metadata)
+
+    @property
+    def access_key(self):
+        return self._frozen.access_key
+
+    @property
+    def secret_key(self):
+        return self._frozen.secret_key
+
+    @property
+    def token(self):
+        return self._frozen.token
+
+    def refresh_needed(self, refresh_in=None):
+        """Whether the credentials expire within refresh_in seconds,
+        ``advisory_timeout`` by default."""
+        if refresh_in is None:
+            refresh_in = self.advisory_timeout
+        return self._expiry - time.time() < refresh_in
+
+    async def get_frozen_credentials(self):
+        """The credentials to sign a request with.
+
+        Starts the refresh of the credentials if they expire within
+        ``advisory_timeout`` seconds, and only waits for it if they expire
+        within ``mandatory_timeout`` seconds.
+
+        :raises CredentialRetrievalError: If the credentials expired and
+            could not be refreshed.
+        """
+        task = self._refresh_task
+        if task is None and self.refresh_needed() and \
+                time.time() >= self._next_refresh:
+            task = self._refresh_task = asyncio.get_running_loop() \
+                .create_task(self._refresh())
+        if task is not None and self.refresh_needed(self.mandatory_timeout):
+            # Shielded, so that a cancelled request does not cancel the
+            # refresh the others wait for.
+            await asyncio.shield(task)
+        if self.refresh_needed(0):
+            raise CredentialRetrievalError(
+                provider=self.method,
+                error_msg='the credentials expired and could not be '
+                          'refreshed')
+        return self._frozen
+
+    async def _refresh(self):
+        try:
+            self._update(await self._refresh_using())
+        except Exception as error:
+            # The current credentials are used as long as they are valid.
+            logger.warning('Refreshing the %s credentials failed: %s',
+                           self.method, error)
+        finally:
+            self._refresh_task = None
+            if self.refresh_needed():
+                self._next_refresh = time.time() + REFRESH_RETRY_DELAY
+
+    def _update(self, metadata):
+        self._frozen = Credentials(metadata['access_key'],
+                                   metadata['secret_key'],
+                                   metadata.get('token'), self.method)
+        self.expiry_time = parse_timestamp(metadata['expiry_time'])
+        self._expiry = self.expiry_time.timestamp()
+
+    def __repr__(self):
+        return '<RefreshableCredentials access_key=%s method=%s>' % (
+            self.access_key, self.method)
+
+
+class CredentialProvider(object):
+    METHOD = None
+
+    async def load(self):
+        """Return the credentials found by the provider, or None."""
+        raise NotImplementedError('load')
+
+
+class EnvProvider(CredentialProvider):
+    """The credentials of the environment variables.
+
+    Credentials with an ``AWS_CREDENTIAL_EXPIRATION`` are refreshed from
+    the environment, which some tools update in place.
+    """
+    METHOD = 'env'
+
+    def __init__(self, environ=None):
+        self.environ = os.environ if environ is None else environ
+
+    async def load(self):
+        metadata = self._metadata()
+        if metadata is None:
+            return None
+        if metadata['expiry_time'] is None:
+            return Credentials(metadata['access_key'], metadata['secret_key'],
+                               metadata['token'], self.METHOD)
+        return RefreshableCredentials(metadata, self._refresh, self.METHOD)
+
+    async def _refresh(self):
+        metadata = self._metadata()
+        if metadata is None:
+            raise PartialCredentialsError(provider=self.METHOD,
+                                          cred_var='AWS_ACCESS_KEY_ID')
+        return metadata
+
+    def _metadata(self):
+        access_key = self.environ.get('AWS_ACCESS_KEY_ID')
+        if not access_key:
+            return None
+        secret_key = self.environ.get('AWS_SECRET_ACCESS_KEY')
+        if not secret_key:
+            raise PartialCredentialsError(provider=self.METHOD,
+                                          cred_var='AWS_SECRET_ACCESS_KEY')
+        return {
+            'access_key': access_key,
+            'secret_key': secret_key,
+            'token': self.environ.get('AWS_SESSION_TOKEN') or
+            self.environ.get('AWS_SECURITY_TOKEN'),
+            'expiry_time': self.environ.get('AWS_CREDENTIAL_EXPIRATION'),
+        }
+
+
+class SharedFileProvider(CredentialProvider):
+    """The keys of a profile of the shared credentials or config file."""
+    METHOD = 'shared-credentials-file'
+
+    def __init__(self, profile):
+        self.profile = profile
+
+    async def load(self):
+        return _profile_credentials(self.profile, self.METHOD)
+
+
+class ContainerProvider(CredentialProvider):
+    """The credentials of the container credentials endpoint.
+
+    The endpoint is given by ``AWS_CONTAINER_CREDENTIALS_RELATIVE_URI``, a
+    path on the ECS agent, or ``AWS_CONTAINER_CREDENTIALS_FULL_URI``, with
+    the ``AWS_CONTAINER_AUTHORIZATION_TOKEN`` to send.
+    """
+    METHOD = 'container-role'
+
+    def __init__(self, environ=None, timeout=DEFAULT_METADATA_TIMEOUT,
+                 num_attempts=DEFAULT_METADATA_ATTEMPTS):
+        self.environ = os.environ if environ is None else environ
+        self.timeout = timeout
+        self.num_attempts = num_attempts
+
+    async def load(self):
+        relative_uri = self.environ.get(
+            'AWS_CONTAINER_CREDENTIALS_RELATIVE_URI')
+        if relative_uri:
+            url = CONTAINER_ENDPOINT + relative_uri
+        else:
+            url = self.environ.get('AWS_CONTAINER_CREDENTIALS_FULL_URI')
+            if not url:
+                return None
+        headers = {}
+        token = self.environ.get('AWS_CONTAINER_AUTHORIZATION_TOKEN')
+        if token:
+            headers['Authorization'] = token
+        fetch = functools.partial(self._fetch, url, headers)
+        return RefreshableCredentials(await fetch(), fetch, self.METHOD)
+
+    async def _fetch(self, url, headers):
+        try:
+            response = await _http_request(
+                'GET', url, headers, self.timeout, self.num_attempts)
+        except CONNECTION_ERRORS as error:
+            raise CredentialRetrievalError(provider=self.METHOD,
+                                           error_msg=str(error))
+        if response.status_code != 200:
+            raise CredentialRetrievalError(
+                provider=self.METHOD,
+                error_msg='received status code %s from %s: %s' % (
+                    response.status_code, url, response.text))
+        return _json_metadata(response.content, self.METHOD)
+
+
+class InstanceMetadataProvider(CredentialProvider):
+    """The credentials of the role of the EC2 instance.
+
+    They are read from the instance metadata service with a session token,
+    as required by IMDSv2.  The service can be disabled with
+    ``AWS_EC2_METADATA_DISABLED=true``, and another endpoint given with
+    ``AWS_EC2_METADATA_SERVICE_ENDPOINT``.
+    """
+    METHOD = 'iam-role'
+
+    def __init__(self, environ=None, endpoint=None,
+                 timeout=DEFAULT_METADATA_TIMEOUT,
+                 num_attempts=DEFAULT_METADATA_ATTEMPTS):
+        self.environ = os.environ if environ is None else environ
+        if endpoint is None:
+            endpoint = self.environ.get('AWS_EC2_METADATA_SERVICE_ENDPOINT',
+                                        METADATA_ENDPOINT)
+        self.endpoint = endpoint.rstrip('/')
+        self.timeout = timeout
+        self.num_attempts = num_attempts
+
+    async def load(self):
+        if self.environ.get('AWS_EC2_METADATA_DISABLED',
+                            '').lower() == 'true':
+            return None
+        try:
+            metadata = await self._fetch()
+        except CredentialRetrievalError as error:
+            # Most likely not on an EC2 instance.
+            logger.debug('No credentials from the instance metadata '
+                         'service: %s', error)
+            return None
+        return RefreshableCredentials(metadata, self._fetch, self.METHOD)
+
+    async def _fetch(self):
+        token = await self._get(
+            'PUT', '/latest/api/token',
+            {'X-aws-ec2-metadata-token-ttl-seconds': str(METADATA_TOKEN_TTL)})
+        headers = {'X-aws-ec2-metadata-token': token.decode('utf-8')}
+        path = '/latest/meta-data/iam/security-credentials/'
+        role_name = (await self._get('GET', path, headers)).decode(
+            'utf-8').strip().splitlines()
+        if not role_name:
+            raise CredentialRetrievalError(
+                provider=self.METHOD,
+                error_msg='no role is attached to the instance')
+        body = await self._get('GET', path + role_name[0], headers)
+        return _json_metadata(body, self.METHOD)
+
+    async def _get(self, method, path, headers):
+        try:
+            response = await _http_request(
+                method, self.endpoint + path, headers, self.timeout,
+                self.num_attempts)
+        except CONNECTION_ERRORS as error:
+            raise CredentialRetrievalError(provider=self.METHOD,
+                                           error_msg=str(error))
+        if response.status_code != 200:
+            raise CredentialRetrievalError(
+                provider=self.METHOD,
+                error_msg='received status code %s from %s' % (
+                    response.status_code, path))
+        return response.content
+
+
+class AssumeRoleProvider(CredentialProvider):
+    """The credentials of the ``role_arn`` of a profile, assumed with STS.
+
+    The role is assumed with the credentials of the ``source_profile`` of
+    the profile, which may itself assume a role, or of its
+    ``credential_source``: ``Environment``, ``Ec2InstanceMetadata`` or
+    ``EcsContainer``.  The ``role_session_name``, ``external_id`` and
+    ``duration_seconds`` of the profile are passed to STS.
+
+    :type profiles: dict
+    :param profiles: The profiles, as returned by ``load_profiles``.
+
+    :type sts_endpoint_url: str
+    :param sts_endpoint_url: The STS endpoint.  By default the regional one
+        of the ``region`` of the profile, or the global one.
+    """
+    METHOD = 'assume-role'
+
+    def __init__(self, profile_name, profiles, environ=None,
+                 sts_endpoint_url=None):
+        self.profile_name = profile_name
+        self.profiles = profiles
+        self.environ = os.environ if environ is None else environ
+        self.sts_endpoint_url = sts_endpoint_url
+
+    async def load(self):
+        profile = self.profiles.get(self.profile_name, {})
+        if 'role_arn' not in profile:
+            return None
+        return await self._assume_role_credentials(self.profile_name, [])
+
+    async def _assume_role_credentials(self, profile_name, visited):
+        if profile_name in visited:
+            raise InvalidConfigError(
+                error_msg='Infinite loop in the source profiles of %s: %s' % (
+                    visited[0], ' -> '.join(visited + [profile_name])))
+        visited = visited + [profile_name]
+        profile = self.profiles[profile_name]
+        source_credentials = await self._source_credentials(
+            profile_name, profile, visited)
+        assume_role = functools.partial(
+            self._assume_role, profile, source_credentials)
+        return RefreshableCredentials(await assume_role(), assume_role,
+                                      self.METHOD)
+
+    async def _source_credentials(self, profile_name, profile, visited):
+        source_profile = profile.get('source_profile')
+        credential_source = profile.get('credential_source')
+        if source_profile is not None:
+            if source_profile not in self.profiles:
+                raise ProfileNotFound(profile=source_profile)
+            source = self.profiles[source_profile]
+            # A profile can use its own keys to assume its role.
+            if 'role_arn' in source and source_profile != profile_name:
+                return await self._assume_role_credentials(
+                    source_profile, visited)
+            credentials = _profile_credentials(source, self.METHOD)
+        elif credential_source is not None:
+            providers = {
+                'Environment': EnvProvider,
+                'Ec2InstanceMetadata': InstanceMetadataProvider,
+                'EcsContainer': ContainerProvider,
+            }
+            if credential_source not in providers:
+                raise InvalidConfigError(
+                    error_msg='Unsupported credential_source %s in profile '
+                              '%s' % (credential_source, profile_name))
+            credentials = await providers[credential_source](
+                self.environ).load()
+        else:
+            raise InvalidConfigError(
+                error_msg='The profile %s has a role_arn but neither a '
+                          'source_profile nor a credential_source' %
+                          profile_name)
+        if credentials is None:
+            raise CredentialRetrievalError(
+                provider=self.METHOD,
+                error_msg='no source credentials for the profile %s' %
+                          profile_name)
+        return credentials
+
+    async def _assume_role(self, profile, source_credentials):
+        region_name = profile.get('region') or 'us-east-1'
+        endpoint_url = self.sts_endpoint_url
+        if endpoint_url is None:
+            if profile.get('region'):
+                endpoint_url = 'https://sts.%s.amazonaws.com' % region_name
+            else:
+                endpoint_url = 'https://sts.amazonaws.com'
+        params = [
+            ('Action', 'AssumeRole'),
+            ('Version', STS_API_VERSION),
+            ('RoleArn', profile['role_arn']),
+            ('RoleSessionName', profile.get(
+                'role_session_name', 'awsclient-session-%d' % time.time())),
+        ]
+        if 'external_id' in profile:
+            params.append(('ExternalId', profile['external_id']))
+        if 'duration_seconds' in profile:
+            params.append(('DurationSeconds', profile['duration_seconds']))
+        request = Request('POST', endpoint_url.rstrip('/') + '/',
+                          data=percent_encode_sequence(params))
+        request.headers['Content-Type'] = (
+            'application/x-www-form-urlencoded; charset=utf-8')
+        await SigV4Auth(source_credentials, 'sts',
+                        region_name).add_auth_async(request)
+        try:
+            async with ConnectionPool() as pool:
+                response = await request(pool)
+        except CONNECTION_ERRORS as error:
+            raise CredentialRetrievalError(provider=self.METHOD,
+                                           error_msg=str(error))
+        try:
+            root = ElementTree.fromstring(response.content)
+        except ElementTree.ParseError:
+            root = None
+        if response.status_code != 200 or root is None:
+            raise CredentialRetrievalError(
+                provider=self.METHOD,
+                error_msg='AssumeRole of %s failed with status code %s: '
+                          '%s' % (profile['role_arn'], response.status_code,
+                                  _findtext(root, 'Message')))
+        return {
+            'access_key': _findtext(root, 'AccessKeyId'),
+            'secret_key': _findtext(root, 'SecretAccessKey'),
+            'token': _findtext(root, 'SessionToken'),
+            'expiry_time': _findtext(root, 'Expiration'),
+        }
+
+
+class CredentialResolver(object):
+    """Resolve credentials with the first provider finding some."""
+
+    def __init__(self, providers):
+        self.providers = providers
+
+    async def load_credentials(self):
+        """The credentials of the first provider finding some, or None."""
+        for provider in self.providers:
+            logger.debug('Looking for credentials via: %s', provider.METHOD)
+            credentials = await provider.load()
+            if credentials is not None:
+                logger.info('Found credentials via: %s', provider.METHOD)
+                return credentials
+        return None
+
+
+def create_credential_resolver(profile_name=None, environ=None,
+                               sts_endpoint_url=None):
+    """Create the default chain of credential providers.
+
+    :type profile_name: str
+    :param profile_name: The profile to use, by default the one of the
+        ``AWS_PROFILE`` environment variable, or ``default``.  The
+        environment variables are ignored if a profile is given.
+
+    :raises ProfileNotFound: If the profile, given or from the
+        environment, is found in neither the config nor the credentials
+        file.
+    """
+    environ = os.environ if environ is None else environ
+    explicit_profile = profile_name is not None
+    if profile_name is None:
+        profile_name = environ.get('AWS_PROFILE') or \
+            environ.get('AWS_DEFAULT_PROFILE')
+    profiles = load_profiles(environ)
+    if profile_name is None:
+        profile_name = 'default'
+    elif profile_name not in profiles:
+        raise ProfileNotFound(profile=profile_name)
+    profile = profiles.get(profile_name, {})
+    providers = [
+        AssumeRoleProvider(profile_name, profiles, environ,
+                           sts_endpoint_url=sts_endpoint_url),
+        SharedFileProvider(profile),
+        ContainerProvider(environ),
+        InstanceMetadataProvider(environ),
+    ]
+    if not explicit_profile:
+        providers.insert(0, EnvProvider(environ))
+    return CredentialResolver(providers)
+
+
+def load_profiles(environ=None):
+    """Load the profiles of the config and shared credentials files.
+
+    The files are ``~/.aws/config`` and ``~/.aws/credentials``, or the
+    ones of the ``AWS_CONFIG_FILE`` and ``AWS_SHARED_CREDENTIALS_FILE``
+    environment variables.  The values of the credentials file take
+    precedence.
+
+    :return: The dict of the profiles, keyed by name.
+    """
+    environ = os.environ if environ is None else environ
+    profiles = {}
+    config_file = environ.get('AWS_CONFIG_FILE', '~/.aws/config')
+    for section, values in _read_ini(config_file).items():
+        if section.startswith('profile '):
+            profiles[section[len('profile '):].strip()] = values
+        elif section == 'default':
+            profiles.setdefault('default', {}).update(values)
+    credentials_file = environ.get('AWS_SHARED_CREDENTIALS_FILE',
+                                   '~/.aws/credentials')
+    for section, values in _read_ini(credentials_file).items():
+        profiles.setdefault(section, {}).update(values)
+    return profiles
+
+
+def _read_ini(path):
+    parser = configparser.RawConfigParser()
+    try:
+        parser.read(os.path.expanduser(path), encoding='utf-8')
+    except configparser.Error as error:
+        raise InvalidConfigError(error_msg='Unable to parse %s: %s' % (
+            path, error))
+    return dict((section, dict(parser.items(section)))
+                for section in parser.sections())
+
+
+def _profile_credentials(profile, method):
+    access_key = profile.get('aws_access_key_id')
+    if access_key is None:
+        return None
+    secret_key = profile.get('aws_secret_access_key')
+    if secret_key is None:
+        raise PartialCredentialsError(provider=method,
+                                      cred_var='aws_secret_access_key')
+    return Credentials(access_key, secret_key,
+                       profile.get('aws_session_token'), method)
+
+
+def _json_metadata(body, method):
+    try:
+        data = json.loads(body)
+        return {
+            'access_key': data['AccessKeyId'],
+            'secret_key': data['SecretAccessKey'],
+            'token': data['Token'],
+            'expiry_time': data['Expiration'],
+        }
+    except (ValueError, KeyError, TypeError) as error:
+        raise CredentialRetrievalError(
+            provider=method,
+            error_msg='invalid credentials response: %r' % (error,))
+
+
+def _findtext(root, name):
+    # The STS responses are namespaced.
+    if root is not None:
+        for element in root.iter():
+            if element.tag == name or element.tag.endswith('}' + name):
+                return element.text
+    return None
+
+
+async def _http_request(method, url, headers, timeout, num_attempts):
+    for attempt in range(1, num_attempts + 1):
+        request = Request(method, url)
+        for name, value in headers.items():
+            request.headers[name] = value
+        try:
+            async with ConnectionPool(timeout=timeout) as pool:
+                return await request(pool)
+        except CONNECTION_ERRORS:
+            if attempt == num_attempts:
+                raise
@@ -1,9 +1,11 @@
 # -*- coding: utf-8 -*-
 from collections.abc import MutableMapping as DictMixin
 
+from .utils import percent_encode
+
 
 def _hkey(s):
-    return s.title().replace('_', '-')
+    return s.lower().replace('_', '-')
 
 
 class MultiDict(DictMixin):
@@ -107,38 +109,180 @@ class MultiDict(DictMixin):
 
 class HeaderDict(MultiDict):
     """ A case-insensitive version of `MultiDict` that defaults to
-        replace the old value instead of appending it. """
+        replace the old value instead of appending it.
+
+        The values are indexed by the lowercased name of their header, with
+        underscores read as dashes, so that ``content_type`` is the
+        ``Content-Type`` header.  The name a header is first set with, its
+        underscores replaced by dashes, is kept to send it.  The signers
+        read the lowercased names through `lower_items` and
+        `sorted_lower_items`, whose sorted view is cached until the headers
+        change. """
 
     def __init__(self, *a, **ka):
         self.dict = {}
+        self._names = {}
+        self._sorted = None
         if a or ka: self.update(*a, **ka)
 
+    def __iter__(self):
+        return iter(self._names.values())
+
     def __contains__(self, key):
         return _hkey(key) in self.dict
 
     def __delitem__(self, key):
-        del self.dict[_hkey(key)]
+        lkey = _hkey(key)
+        del self.dict[lkey]
+        del self._names[lkey]
+        self._sorted = None
 
     def __getitem__(self, key):
         return self.dict[_hkey(key)][0]
 
     def __setitem__(self, key, value):
-        self.dict[_hkey(key)] = [value if isinstance(value, str) else
-                                 str(value)]
+        lkey = _hkey(key)
+        if lkey not in self._names:
+            self._names[lkey] = key.replace('_', '-')
+        self.dict[lkey] = [value if isinstance(value, str) else str(value)]
+        self._sorted = None
 
-    def append(self, key, value):
-        self.dict.setdefault(_hkey(key), []).append(
-            value if isinstance(value, str) else str(value))
+    def keys(self):
+        return self._names.values()
 
-    def replace(self, key, value):
-        self.dict[_hkey(key)] = [value if isinstance(value, str) else
-                                 str(value)]
+    def items(self):
+        names = self._names
+        return ((names[k], v[0]) for k, v in self.dict.items())
+
+    def allitems(self):
+        names = self._names
+        return ((names[k], v) for k, vl in self.dict.items() for v in vl)
+
+    iterkeys = keys
+    iteritems = items
+    iterallitems = allitems
+
+    def append(self, key, value):
+        lkey = _hkey(key)
+        value = value if isinstance(value, str) else str(value)
+        values = self.dict.get(lkey)
+        if values is None:
+            self._names[lkey] = key.replace('_', '-')
+            self.dict[lkey] = [value]
+        else:
+            values.append(value)
+        self._sorted = None
+
+    replace = __setitem__
 
     def getall(self, key):
-        return self.dict.get(_hkey(key)) or []
+        return list(self.dict.get(_hkey(key), ()))
+
+    get_all = getall
+    getlist = getall
 
     def get(self, key, default=None, index=0):
-        return MultiDict.get(self, _hkey(key), default, index)
+        try:
+            return self.dict[_hkey(key)][index]
+        except (KeyError, IndexError):
+            return default
+
+    getone = get
+
+    def lower_items(self):
+        """ The ``(lowercased name, values)`` of the headers. """
+        return self.dict.items()
+
+    def sorted_lower_items(self):
+        """ The ``(lowercased name, values)`` of the headers, sorted by
+            name. """
+        if self._sorted is None:
+            self._sorted = sorted(self.dict.items())
+        return self._sorted
+
+
+class QueryParams(DictMixin):
+    """ The query string parameters of a request, percent-encoded once.
+
+        Each key and value is encoded with the AWS safe characters when it
+        is added.  The signers read `canonical_query_string`, built from the
+        encoded pairs sorted by key then value and cached until the
+        parameters change, and the request is sent with `query_string`,
+        built from the same encoded pairs, so the encoding signed is the
+        one on the wire.
 
+        Like `MultiDict`, a key can have several values, the first one is
+        returned for a key, but setting a key replaces all its values. """
 
+    def __init__(self, *a, **kwargs):
+        self._items = []
+        self._encoded = []
+        self._canonical = None
+        for pl in a:
+            for k, v in pl:
+                self.append(k, v)
+        for k, v in kwargs.items():
+            self.append(k, v)
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __bool__(self):
+        return bool(self._items)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __contains__(self, key):
+        return any(k == key for k, _ in self._items)
+
+    def __getitem__(self, key):
+        for k, v in self._items:
+            if k == key:
+                return v
+        raise KeyError(key)
 
+    def __setitem__(self, key, value):
+        if key in self:
+            del self[key]
+        self.append(key, value)
+
+    def __delitem__(self, key):
+        kept = [i for i, (k, _) in enumerate(self._items) if k != key]
+        if len(kept) == len(self._items):
+            raise KeyError(key)
+        self._items = [self._items[i] for i in kept]
+        self._encoded = [self._encoded[i] for i in kept]
+        self._canonical = None
+
+    def keys(self):
+        return list(dict.fromkeys(k for k, _ in self._items))
+
+    def allitems(self):
+        return iter(self._items)
+
+    def append(self, key, value):
+        """ Add a value for key, encoded with its key. """
+        self._items.append((key, value))
+        self._encoded.append((percent_encode(key), percent_encode(value)))
+        self._canonical = None
+
+    def getall(self, key):
+        """ Return a (possibly empty) list of values for a key. """
+        return [v for k, v in self._items if k == key]
+
+    def encoded_items(self):
+        """ The percent-encoded ``(key, value)`` pairs, in insertion
+            order. """
+        return iter(self._encoded)
+
+    def query_string(self):
+        """ The query string to send, in insertion order. """
+        return '&'.join([k + '=' + v for k, v in self._encoded])
+
+    def canonical_query_string(self):
+        """ The query string sorted by key then value, as signed. """
+        if self._canonical is None:
+            self._canonical = '&'.join(
+                [k + '=' + v for k, v in sorted(self._encoded)])
+        return self._canonical
@@ -0,0 +1,61 @@
+"""Resolve the endpoint of a client from the endpoints of its service.
+
+The endpoints are resolved by clientmaker from ``endpoints.json`` and
+embedded in the generated clients as ``ENDPOINTS``::
+
+    {'endpoints': {'us-east-1': {'hostname': 'sqs.us-east-1.amazonaws.com',
+                                 'protocols': ['http', 'https'], ...},
+                   ...},
+     'partitions': [{'regionRegex': '^cn\\-\\w+\\-\\d+$',
+                     'endpoint': {'hostname': 'sqs.{region}.amazonaws.com.cn',
+                                  ...}},
+                    ...]}
+
+The regions listed are looked up directly, the others are matched
+against the region regex of each partition and memoized.
+"""
+import re
+
+
+class ServiceEndpoints(object):
+    """The endpoints of a service.
+
+    :type config: dict
+    :param config: The ``ENDPOINTS`` of a generated client.
+    """
+
+    def __init__(self, config):
+        self._endpoints = dict(config['endpoints'])
+        self._partitions = [(re.compile(partition['regionRegex']),
+                             partition['endpoint'])
+                            for partition in config['partitions']]
+
+    def resolve(self, region_name):
+        """Return the endpoint of region_name, or None if no partition has
+        the region.
+        """
+        endpoint = self._endpoints.get(region_name)
+        if endpoint is None:
+            for regex, template in self._partitions:
+                if regex.match(region_name):
+                    endpoint = _format_endpoint(template, region_name)
+                    self._endpoints[region_name] = endpoint
+                    break
+        return endpoint
+
+    def url(self, region_name):
+        """Return the url of the endpoint of region_name, or None."""
+        endpoint = self.resolve(region_name)
+        if endpoint is None:
+            return None
+        protocols = endpoint.get('protocols', ['https'])
+        scheme = 'https' if 'https' in protocols else protocols[0]
+        return '%s://%s' % (scheme, endpoint['hostname'])
+
+
+def _format_endpoint(template, region_name):
+    endpoint = dict(template, endpointName=region_name)
+    for name in ('hostname', 'sslCommonName'):
+        if name in endpoint:
+            endpoint[name] = endpoint[name].replace('{region}', region_name)
+    return endpoint
@@ -18,3 +18,66 @@ class NoCredentialsError(AWSClientError):
     No credentials could be found
     """
     fmt = 'Unable to locate credentials'
+
+
+class IncompleteReadError(AWSClientError):
+    """HTTP response did not return expected number of bytes."""
+    fmt = ('{actual_bytes} read, but total bytes '
+           'expected is {expected_bytes}.')
+
+
+class ClientError(AWSClientError):
+    """An AWS service returned an error response."""
+    fmt = ('An error occurred ({error_code}) when calling the '
+           '{operation_name} operation: {error_message}')
+
+    def __init__(self, error_code, error_message, operation_name,
+                 status_code=None):
+        super(ClientError, self).__init__(
+            error_code=error_code, error_message=error_message,
+            operation_name=operation_name)
+        self.status_code = status_code
+        self.response = {
+            'Error': {'Code': error_code, 'Message': error_message},
+            'ResponseMetadata': {'HTTPStatusCode': status_code},
+        }
+
+
+class InvalidRetryModeError(AWSClientError):
+    """An unknown retry mode was given to a client."""
+    fmt = ('Invalid retry mode "{mode}", the valid modes are: '
+           '{valid_modes}')
+
+
+class WaiterError(AWSClientError):
+    """A waiter reached a failure state, or ran out of attempts."""
+    fmt = 'Waiter {name} failed: {reason}'
+
+    def __init__(self, name, reason, last_response):
+        super(WaiterError, self).__init__(name=name, reason=reason)
+        self.last_response = last_response
+
+
+class PaginationError(AWSClientError):
+    """The pagination of an operation can not go on."""
+    fmt = 'Error during pagination: {message}'
+
+
+class PartialCredentialsError(AWSClientError):
+    """Only some of the values of the credentials were found."""
+    fmt = 'Partial credentials found in {provider}, missing: {cred_var}'
+
+
+class CredentialRetrievalError(AWSClientError):
+    """A provider failed to retrieve the credentials it is configured for."""
+    fmt = 'Error when retrieving credentials from {provider}: {error_msg}'
+
+
+class ProfileNotFound(AWSClientError):
+    """The profile is in neither the config nor the credentials file."""
+    fmt = 'The config profile ({profile}) could not be found'
+
+
+class InvalidConfigError(AWSClientError):
+    """The config of a profile is not valid."""
+    fmt = '{error_msg}'
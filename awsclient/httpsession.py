@@ -0,0 +1,123 @@
+import logging
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_POOL_CONNECTIONS = 10
+DEFAULT_KEEPALIVE_EXPIRY = 60.0
+DEFAULT_TIMEOUT = 60.0
+
+
+class PoolStats(object):
+    """Counters for the requests sent through a ``ConnectionPool``.
+
+    A request is a pool hit when it is sent on an already open, kept alive
+    connection, and a miss when a new connection had to be opened for it.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.connections_opened = 0
+
+    @property
+    def hits(self):
+        return max(self.requests - self.connections_opened, 0)
+
+    @property
+    def hit_rate(self):
+        if not self.requests:
+            return 0.0
+        return self.hits / self.requests
+
+    def __repr__(self):
+        return ('<PoolStats requests=%s connections_opened=%s '
+                'hit_rate=%.2f>' % (self.requests, self.connections_opened,
+                                    self.hit_rate))
+
+
+class ConnectionPool(object):
+    """Long lived HTTP connections shared by all the requests of a session.
+
+    One ``httpx.AsyncClient`` is kept per origin (scheme, host and port),
+    so the connection limits apply per host: a slow endpoint can not
+    starve the connections used for the others.  Idle connections are kept
+    alive for ``keepalive_expiry`` seconds.  The pool must be closed with
+    ``aclose()`` once it is not needed anymore.
+
+    :type max_connections: int
+    :param max_connections: Maximum number of connections open at the same
+        time to a single host.
+
+    :type max_keepalive_connections: int
+    :param max_keepalive_connections: Maximum number of idle connections
+        kept alive for a single host.  Defaults to ``max_connections``.
+
+    :type keepalive_expiry: float
+    :param keepalive_expiry: Number of seconds an idle connection is kept
+        alive before being closed.
+
+    :type timeout: float
+    :param timeout: Connect, read, write and pool acquisition timeout, in
+        seconds.
+    """
+
+    def __init__(self, max_connections=DEFAULT_MAX_POOL_CONNECTIONS,
+                 max_keepalive_connections=None,
+                 keepalive_expiry=DEFAULT_KEEPALIVE_EXPIRY,
+                 timeout=DEFAULT_TIMEOUT, transport=None):
+        if max_keepalive_connections is None:
+            max_keepalive_connections = max_connections
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry)
+        self._timeout = httpx.Timeout(timeout)
+        # Mostly useful to plug a mock transport in.
+        self._transport = transport
+        self._clients = {}
+        self._closed = False
+        self.stats = PoolStats()
+
+    def get_client(self, url):
+        """Return the client holding the connections to the host of url."""
+        if self._closed:
+            raise RuntimeError('The connection pool is closed.')
+        parts = urlsplit(url)
+        origin = (parts.scheme, parts.hostname, parts.port)
+        client = self._clients.get(origin)
+        if client is None:
+            client = httpx.AsyncClient(limits=self._limits,
+                                       timeout=self._timeout,
+                                       transport=self._transport)
+            self._clients[origin] = client
+        return client
+
+    def build_request(self, method, url, headers=None, params=None,
+                      content=None):
+        client = self.get_client(url)
+        return client.build_request(
+            method, url, headers=headers, params=params, content=content,
+            extensions={'trace': self._trace})
+
+    async def send(self, request, stream=False):
+        client = self.get_client(str(request.url))
+        self.stats.requests += 1
+        return await client.send(request, stream=stream)
+
+    async def _trace(self, event_name, info):
+        if event_name == 'connection.connect_tcp.started':
+            self.stats.connections_opened += 1
+
+    async def aclose(self):
+        self._closed = True
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
@@ -0,0 +1,527 @@
+"""Iterate over the pages of the results of an operation.
+
+The paginators of a service are described by its ``paginators-1.json``
+model, embedded by clientmaker in the generated clients as ``PAGINATORS``,
+keyed by the snake case name of the operation::
+
+    paginator = client.get_paginator('list_objects_v2')
+    async for page in paginator.paginate(Bucket='bucket', prefetch=1):
+        for item in page.get('Contents', []):
+            ...
+
+Pages are requested one after the other, the output token of a page being
+the input token of the next one.  With ``prefetch``, the next pages are
+requested as soon as the previous one is received, while the caller
+processes it, so that listing takes the time of the requests or of the
+processing, not their sum.
+
+``items`` iterates over the items of a result key instead.  The items of
+rest-xml operations, like S3 ListObjectsV2, are yielded as they are
+parsed from the stream of the response, before the rest of the page has
+been received::
+
+    async for item in paginator.paginate(Bucket='bucket').items():
+        ...
+
+Where the operation allows it, ``paginate_parallel`` splits a listing into
+independent streams, paginated concurrently and merged::
+
+    paginator = client.get_paginator('scan')
+    async for page in paginator.paginate_parallel(
+            TableName='table', segments=16, max_concurrency=8):
+        ...
+"""
+import asyncio
+import base64
+import collections
+import json
+
+import jmespath
+
+from .exceptions import PaginationError
+from .parsers import XMLResponseStream
+
+# Number of streams of a parallel listing paginated at the same time.
+DEFAULT_MAX_CONCURRENCY = 8
+
+_expressions = {}
+
+
+def _compile_expression(expression):
+    compiled = _expressions.get(expression)
+    if compiled is None:
+        compiled = _expressions[expression] = jmespath.compile(expression)
+    return compiled
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _set_value(result, path, value):
+    # Sets a value at a dotted path, e.g. ``DistributionList.Items``.
+    keys = path.split('.')
+    for key in keys[:-1]:
+        result = result.setdefault(key, {})
+    result[keys[-1]] = value
+
+
+class PaginatorModel(object):
+    """The compiled config of a paginator.
+
+    :type config: dict
+    :param config: The config of the paginator, from ``PAGINATORS``.
+    """
+
+    def __init__(self, config):
+        self.method = config['method']
+        self.input_tokens = _as_list(config['input_token'])
+        self.output_tokens = [_compile_expression(token) for token in
+                              _as_list(config['output_token'])]
+        self.limit_key = config.get('limit_key')
+        more_results = config.get('more_results')
+        self.more_results = None if more_results is None else \
+            _compile_expression(more_results)
+        self.result_keys = [(key, _compile_expression(key))
+                            for key in _as_list(config.get('result_key'))]
+        self.non_aggregate_keys = [
+            (key, _compile_expression(key))
+            for key in _as_list(config.get('non_aggregate_keys'))]
+        # How a listing can be split into parallel streams.
+        self.segments = config.get('segments', False)
+        self.start_after = config.get('start_after')
+        self.list_members = config.get('list_members', [])
+
+    def next_token(self, page):
+        """The input tokens of the page after page, or None."""
+        if self.more_results is not None and \
+                not self.more_results.search(page):
+            return None
+        token = {}
+        for name, expression in zip(self.input_tokens, self.output_tokens):
+            value = expression.search(page)
+            if value not in (None, ''):
+                token[name] = value
+        return token or None
+
+
+class Paginator(object):
+    """A paginator of a client, returned by ``BaseClient.get_paginator``."""
+
+    def __init__(self, client, model):
+        self.client = client
+        self.model = model
+
+    def paginate(self, PaginationConfig=None, prefetch=0, **kwargs):
+        """Iterate over the pages of the operation called with kwargs.
+
+        :type PaginationConfig: dict
+        :param PaginationConfig: The ``MaxItems`` to return, the
+            ``PageSize`` of the requests and the ``StartingToken``, the
+            ``resume_token`` of a previous iteration.
+
+        :type prefetch: int
+        :param prefetch: The number of pages requested ahead of the one the
+            caller processes.
+
+        :rtype: PageIterator
+        """
+        config = PaginationConfig or {}
+        client, method = self.client, self.model.method
+        stream_method = None
+        if client.PROTOCOL == 'rest-xml':
+            stream_method = getattr(client._streaming(), method)
+        return PageIterator(
+            getattr(client, method), self.model, kwargs,
+            max_items=config.get('MaxItems'),
+            page_size=config.get('PageSize'),
+            starting_token=config.get('StartingToken'),
+            prefetch=prefetch, stream_method=stream_method)
+
+
+    def paginate_parallel(self, segments=None, ranges=None, split=None,
+                          max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                          range_key='Key', prefetch=0, **kwargs):
+        """Split the listing into streams, paginated concurrently.
+
+        The pages of the streams are merged, in the order they are
+        received.  Exactly one way of splitting the listing must be
+        given:
+
+        :type segments: int
+        :param segments: The number of segments the listing is split in,
+            for the operations taking ``Segment`` and ``TotalSegments``,
+            like the DynamoDB Scan.
+
+        :type ranges: list
+        :param ranges: The sorted bounds of ranges the listing is split in,
+            for the operations starting after a given key, like S3
+            ListObjectsV2.  Each stream starts after a bound, and stops
+            after the next one.
+
+        :type split: tuple
+        :param split: The name of a list parameter and a number of values,
+            to run a stream per chunk of that many values of the list,
+            e.g. ``('logStreamNames', 10)`` for CloudWatch Logs.
+
+        :type max_concurrency: int
+        :param max_concurrency: The number of streams paginated at the same
+            time.
+
+        :type range_key: str
+        :param range_key: The key of the items compared to the ranges.
+            The items of ``CommonPrefixes`` are compared on their
+            ``Prefix``.
+
+        :type prefetch: int
+        :param prefetch: The number of pages each stream requests ahead.
+
+        :return: An async iterator over the pages of all the streams.
+        """
+        model = self.model
+        streams = []
+        if segments is not None:
+            if not model.segments:
+                raise ValueError('%s can not be split in segments.' %
+                                 model.method)
+            streams = [self.paginate(Segment=segment, TotalSegments=segments,
+                                     prefetch=prefetch, **kwargs)
+                       for segment in range(segments)]
+        elif ranges is not None:
+            if model.start_after is None:
+                raise ValueError('%s can not be split in ranges.' %
+                                 model.method)
+            bounds = [kwargs.pop(model.start_after, None)] + list(ranges)
+            for lower, upper in zip(bounds, bounds[1:] + [None]):
+                stream_kwargs = dict(kwargs)
+                if lower is not None:
+                    stream_kwargs[model.start_after] = lower
+                streams.append(_RangeIterator(
+                    self.paginate(prefetch=prefetch, **stream_kwargs),
+                    model, range_key, upper))
+        elif split is not None:
+            name, size = split
+            if name not in model.list_members:
+                raise ValueError('%s can not be split on %s.' % (
+                    model.method, name))
+            values = kwargs.pop(name)
+            streams = [self.paginate(prefetch=prefetch, **dict(
+                kwargs, **{name: values[start:start + size]}))
+                for start in range(0, len(values), size)]
+        else:
+            raise ValueError('One of segments, ranges or split is required.')
+        return merge_pages(streams, max_concurrency)
+
+
+# The keys of the items compared to the ranges, for the result keys whose
+# items are not compared on the ``range_key`` of ``paginate_parallel``.
+_RANGE_KEYS = {'CommonPrefixes': 'Prefix'}
+
+
+class _RangeIterator(object):
+    # The pages of a stream, up to the upper bound of its range.
+
+    def __init__(self, pages, model, range_key, upper):
+        self._pages = pages
+        self._model = model
+        self._range_key = range_key
+        self._upper = upper
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        pages = self._pages.__aiter__()
+        try:
+            async for page in pages:
+                cut = self._upper is not None and self._cut(page)
+                yield page
+                if cut:
+                    return
+        finally:
+            await pages.aclose()
+
+    def _cut(self, page):
+        # Drops the items after the upper bound, True if there were any.
+        cut = False
+        for key, expression in self._model.result_keys:
+            items = expression.search(page)
+            if not isinstance(items, list):
+                continue
+            range_key = _RANGE_KEYS.get(key, self._range_key)
+            # Items without the key can not be placed in a range, and are
+            # kept.
+            kept = [item for item in items
+                    if not isinstance(item, dict) or
+                    item.get(range_key) is None or
+                    item[range_key] <= self._upper]
+            if len(kept) < len(items):
+                _set_value(page, key, kept)
+                cut = True
+        return cut
+
+
+async def merge_pages(iterators, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+    """Merge async iterators into one, iterating over at most
+    max_concurrency of them at the same time.
+
+    Items are yielded as they are received, whichever iterator they come
+    from.  If an iterator raises an exception, the others are cancelled
+    and the exception is raised.
+    """
+    pending = collections.deque(iterators)
+    # Bounded, so that fast streams wait for the caller.
+    queue = asyncio.Queue(max_concurrency)
+    done = object()
+
+    async def pump():
+        while pending:
+            iterator = pending.popleft()
+            async for item in iterator:
+                await queue.put((item, None))
+        await queue.put((done, None))
+
+    async def run():
+        try:
+            await pump()
+        except asyncio.CancelledError:
+            raise
+        except Exception as error:
+            await queue.put((done, error))
+
+    workers = [asyncio.ensure_future(run())
+               for _ in range(min(max_concurrency, len(pending)))]
+    running = len(workers)
+    try:
+        while running:
+            item, error = await queue.get()
+            if error is not None:
+                raise error
+            if item is done:
+                running -= 1
+                continue
+            yield item
+    finally:
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+
+class PageIterator(object):
+    """An async iterator over pages, created by ``Paginator.paginate``.
+
+    Once the iteration is over, ``resume_token`` is the
+    ``StartingToken`` continuing it if it stopped at ``MaxItems``.
+
+    ``stream_method``, if given, is the method of the operation returning
+    the ``XMLResponseStream`` of the response, used by ``items``.
+    """
+
+    def __init__(self, method, model, kwargs, max_items=None,
+                 page_size=None, starting_token=None, prefetch=0,
+                 stream_method=None):
+        self._method = method
+        self._stream_method = stream_method
+        self._model = model
+        self._kwargs = dict(kwargs)
+        if page_size is not None and model.limit_key is not None:
+            self._kwargs[model.limit_key] = page_size
+        self._max_items = max_items
+        self._starting_token = starting_token
+        self._prefetch = prefetch
+        self.resume_token = None
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        model = self._model
+        token, truncate = self._parse_starting_token()
+        primary = model.result_keys[0] if model.result_keys else None
+        remaining = self._max_items
+        pages = self._fetch_pages(token)
+        try:
+            async for page, page_token in pages:
+                # Items of the first page returned by the previous iteration
+                # are skipped.
+                skipped, truncate = truncate, 0
+                if skipped:
+                    self._truncate(page, skipped, None)
+                if remaining is None or primary is None:
+                    yield page
+                    continue
+                count = len(primary[1].search(page) or [])
+                if count >= remaining:
+                    next_token = model.next_token(page)
+                    if count > remaining:
+                        self._truncate(page, 0, remaining)
+                        self.resume_token = self._encode_token(
+                            page_token, skipped + remaining)
+                    elif next_token is not None:
+                        self.resume_token = self._encode_token(next_token)
+                    yield page
+                    return
+                remaining -= count
+                yield page
+        finally:
+            await pages.aclose()
+
+    async def _fetch_pages(self, token):
+        # Yields each page with the input tokens it was requested with.
+        if not self._prefetch:
+            while True:
+                page = await self._fetch(token)
+                yield page, token
+                token = self._next_token(page, token)
+                if token is None:
+                    return
+        queue = asyncio.Queue(self._prefetch)
+        producer = asyncio.ensure_future(self._produce(queue, token))
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            producer.cancel()
+            try:
+                await producer
+            except asyncio.CancelledError:
+                pass
+
+    async def _produce(self, queue, token):
+        try:
+            while True:
+                page = await self._fetch(token)
+                await queue.put((page, token))
+                token = self._next_token(page, token)
+                if token is None:
+                    break
+        except asyncio.CancelledError:
+            raise
+        except Exception as error:
+            await queue.put(error)
+            return
+        await queue.put(None)
+
+    async def items(self, result_key=None):
+        """Iterate over the items of a result key of all the pages.
+
+        :type result_key: str
+        :param result_key: The result key, the first one of the paginator
+            by default, e.g. ``Contents`` for S3 ListObjectsV2.
+
+        With a ``stream_method``, the items are yielded as soon as they are
+        received, unless the iteration is limited by ``MaxItems`` or
+        continues from a ``StartingToken``, which count the items of whole
+        pages.  The pages are then requested one after the other.
+        """
+        if result_key is None:
+            result_key = self._model.result_keys[0][0]
+        expression = _compile_expression(result_key)
+        if self._stream_method is None or self._max_items is not None or \
+                self._starting_token is not None:
+            async for page in self:
+                for item in expression.search(page) or []:
+                    yield item
+            return
+        token = None
+        while True:
+            response = await self._fetch(token, self._stream_method)
+            if not isinstance(response, XMLResponseStream):
+                page = response
+                for item in expression.search(page) or []:
+                    yield item
+            else:
+                # The last item of each list, as output tokens can refer
+                # to it, e.g. ``Contents[-1].Key``.
+                last_items = {}
+                async with response as stream:
+                    async for name, item in stream:
+                        if name == result_key:
+                            yield item
+                        last_items[name] = item
+                page = response.parsed
+                if result_key not in last_items:
+                    for item in expression.search(page) or []:
+                        yield item
+                for name, item in last_items.items():
+                    page[name] = [item]
+            token = self._next_token(page, token)
+            if token is None:
+                return
+
+    async def _fetch(self, token, method=None):
+        kwargs = self._kwargs
+        if token:
+            kwargs = dict(kwargs, **token)
+        return await (method or self._method)(**kwargs)
+
+    def _next_token(self, page, token):
+        next_token = self._model.next_token(page)
+        if next_token is not None and next_token == token:
+            raise PaginationError(
+                message='The same next token was received twice: %s' %
+                next_token)
+        return next_token
+
+    def _truncate(self, page, start, stop):
+        for key, expression in self._model.result_keys:
+            items = expression.search(page)
+            if isinstance(items, list):
+                _set_value(page, key, items[start:stop])
+
+    def _parse_starting_token(self):
+        if self._starting_token is None:
+            return None, 0
+        try:
+            token = json.loads(base64.b64decode(
+                self._starting_token).decode('utf-8'))
+        except ValueError:
+            raise PaginationError(message='Invalid starting token: %s' %
+                                  self._starting_token)
+        truncate = token.pop('boto_truncate_amount', 0)
+        return token or None, truncate
+
+    def _encode_token(self, token, truncate=0):
+        token = dict(token or {})
+        if truncate:
+            token['boto_truncate_amount'] = truncate
+        return base64.b64encode(
+            json.dumps(token).encode('utf-8')).decode('utf-8')
+
+    async def build_full_result(self):
+        """Iterate over all the pages and aggregate their results.
+
+        The lists of the result keys of the pages are concatenated, the
+        non aggregate keys are taken from the first page.
+        """
+        result = {}
+        model = self._model
+        async for page in self:
+            for key, expression in model.result_keys:
+                items = expression.search(page)
+                if items is None:
+                    continue
+                aggregated = jmespath.search(key, result)
+                if aggregated is None:
+                    _set_value(result, key, list(items) if isinstance(
+                        items, list) else items)
+                elif isinstance(items, list):
+                    aggregated.extend(items)
+                else:
+                    # Numbers are summed and strings concatenated.
+                    _set_value(result, key, aggregated + items)
+            for key, expression in model.non_aggregate_keys:
+                if jmespath.search(key, result) is None:
+                    value = expression.search(page)
+                    if value is not None:
+                        _set_value(result, key, value)
+        if self.resume_token is not None:
+            result['NextToken'] = self.resume_token
+        return result
@@ -0,0 +1,208 @@
+"""Parse XML responses, whole or incrementally as they are received.
+
+The parsers of the operations are generated by clientmaker, see
+``clientmaker.codegen``.  Those of the rest-xml operations whose output
+holds lists, like S3 ListObjectsV2, are ``XMLStreamParser``s: the client
+feeds them the response as it is received, so that the body is never
+buffered whole, and a ``Paginator`` can yield the items of a page before
+the page has been received entirely::
+
+    stream = _parse_list_objects_v2.iter_parse(status_code, headers, body)
+    async with stream:
+        async for member_name, item in stream:
+            ...
+    next_token = stream.parsed.get('NextContinuationToken')
+
+The body is closed, and its connection returned to the pool, once the
+stream has been read to its end.  Consumers that may stop before, by
+``break``, ``return`` or an exception, must close the stream, with
+``async with`` or ``aclose``.
+"""
+import xml.etree.ElementTree as ElementTree
+
+# Size of the chunks a streamed XML body is fed to the parser in.
+XML_STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def _strip_namespace(element):
+    if element.tag[0] == '{':
+        element.tag = element.tag.rsplit('}', 1)[1]
+    if element.attrib:
+        for name in list(element.attrib):
+            if name[0] == '{':
+                element.attrib[name.rsplit('}', 1)[1]] = \
+                    element.attrib.pop(name)
+
+
+def xml_root(body):
+    """Parse an XML document, dropping the namespaces from the tags.
+
+    The service models refer to elements and attributes by their local
+    names only, so namespaces are stripped once here instead of being
+    handled by every lookup of the generated parsers.
+    """
+    root = ElementTree.fromstring(body)
+    for element in root.iter():
+        _strip_namespace(element)
+    return root
+
+
+class XMLStreamParser(object):
+    """The generated parser of a rest-xml operation whose output holds
+    lists.
+
+    :type parse_head: function
+    :param parse_head: Parses the members read from the headers and the
+        status code, called with the status code and the headers.
+
+    :type parse_body: function
+    :param parse_body: Parses the members of the root element into the
+        parsed dict, called with the root element and the dict.
+
+    :type lists: dict
+    :param lists: The list members of the output, keyed by the tag of
+        their elements, as ``(member_name, convert, item_tag)`` tuples.
+        ``convert`` parses the element of an item.  ``item_tag`` is the tag
+        of the items in the element of the list, or None if the list is
+        flattened, its items being repeated elements of the root.
+    """
+
+    def __init__(self, parse_head, parse_body, lists):
+        self.parse_head = parse_head
+        self.parse_body = parse_body
+        self.lists = lists
+
+    def __call__(self, status_code, headers, body):
+        """Parse a response whose body has been received whole."""
+        parsed = self.parse_head(status_code, headers)
+        if body:
+            self.parse_body(xml_root(body), parsed)
+        return parsed
+
+    def iter_parse(self, status_code, headers, body,
+                   chunk_size=XML_STREAM_CHUNK_SIZE):
+        """Parse a streamed response incrementally.
+
+        :type body: awsclient.response.AsyncStreamingBody
+        :param body: The body of the response, or any async iterable of
+            bytes.  It is closed once parsed.
+
+        :rtype: XMLResponseStream
+        """
+        return XMLResponseStream(self, status_code, headers, body,
+                                 chunk_size)
+
+
+class XMLResponseStream(object):
+    """Incremental parse of the body of a rest-xml response.
+
+    Iterating over the stream, with ``async for``, yields a
+    ``(member_name, item)`` tuple for each item of the list members of the
+    output, as soon as the item has been received.  Items are dropped from
+    the document once yielded, so the memory used does not grow with the
+    length of the lists.  The other members of the output are in
+    ``parsed`` once the iteration is over.
+
+    ``read`` collects the items instead, and returns the whole output.
+
+    The body is closed once read to its end.  A stream left before must be
+    closed, with ``async with`` or ``aclose``, to release the connection of
+    its body, otherwise held until the stream is garbage collected.
+    """
+
+    def __init__(self, parser, status_code, headers, body,
+                 chunk_size=XML_STREAM_CHUNK_SIZE):
+        self.parsed = parser.parse_head(status_code, headers)
+        self._parser = parser
+        self._body = body
+        self._chunk_size = chunk_size
+        self._iterator = None
+        self._closed = False
+
+    def __aiter__(self):
+        self._iterator = self._iterate()
+        return self._iterator
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        """Stop the iteration, close the body."""
+        if self._iterator is not None:
+            await self._iterator.aclose()
+        await self._close_body()
+
+    async def _close_body(self):
+        if not self._closed:
+            self._closed = True
+            if hasattr(self._body, 'close'):
+                await self._body.close()
+
+    async def read(self):
+        """Parse the whole body, return the parsed output.
+
+        :rtype: dict
+        """
+        lists = {}
+        async for name, item in self:
+            lists.setdefault(name, []).append(item)
+        self.parsed.update(lists)
+        return self.parsed
+
+    async def _iterate(self):
+        lists = self._parser.lists
+        parser = ElementTree.XMLPullParser(events=('start', 'end'))
+        depth = 0
+        root = container = None
+        try:
+            async for chunk in _iter_chunks(self._body, self._chunk_size):
+                parser.feed(chunk)
+                for event, element in parser.read_events():
+                    if event == 'start':
+                        depth += 1
+                        _strip_namespace(element)
+                        if depth == 1:
+                            root = element
+                        elif depth == 2:
+                            member = lists.get(element.tag)
+                            if member is not None and member[2] is not None:
+                                container, item_member = element, member
+                        continue
+                    depth -= 1
+                    if depth == 2 and container is not None:
+                        # An item of a list member.
+                        name, convert, item_tag = item_member
+                        if element.tag == item_tag:
+                            yield name, convert(element)
+                        container.remove(element)
+                    elif depth == 1:
+                        member = lists.get(element.tag)
+                        if member is None:
+                            continue
+                        if member[2] is None:
+                            # An item of a flattened list member.
+                            yield member[0], member[1](element)
+                            root.remove(element)
+                        else:
+                            container = None
+            if root is not None:
+                parser.close()
+        finally:
+            await self._close_body()
+        if root is not None:
+            # The list members are left empty in the document.
+            self._parser.parse_body(root, self.parsed)
+
+
+async def _iter_chunks(body, chunk_size):
+    if isinstance(body, (bytes, bytearray)):
+        yield body
+    elif hasattr(body, 'iter_chunks'):
+        async for chunk in body.iter_chunks(chunk_size):
+            yield chunk
+    else:
+        async for chunk in body:
+            yield chunk
@@ -1,8 +1,13 @@
 
-import httpx
-from .datastructures import MultiDict, HeaderDict
+from .datastructures import HeaderDict, QueryParams
+from .httpsession import ConnectionPool
+from .response import AsyncStreamingBody
 from urllib.parse import urlencode
 
+# Size of the slices a memoryview body is streamed in.
+MEMORYVIEW_CHUNK_SIZE = 1024 * 1024
+
+
 class Request:
     def __init__(self, method, url, data=None,
                  params=None,
@@ -15,7 +20,13 @@ class Request:
         self.method = method
         self.url = url
         self.headers = HeaderDict()
-        self.params = params or MultiDict()
+        if not isinstance(params, QueryParams):
+            if hasattr(params, 'allitems'):
+                params = params.allitems()
+            elif hasattr(params, 'items'):
+                params = params.items()
+            params = QueryParams(params)
+        self.params = params
         self.auth_path = auth_path
         self.stream_output = stream_output
         self._body = ""
@@ -60,27 +71,60 @@ class Request:
         if isinstance(body, str):
             body = body.encode('utf-8')
 
-        self.body = body
+        self._body = body
+
+    async def __call__(self, pool=None):
+        """Send the request.
+
+        Returns the ``httpx.Response``, or an ``AsyncStreamingBody`` over
+        the response when ``stream_output`` is set.  The streaming body must
+        be closed by the caller.
 
-    def get_client(self):
+        :type pool: awsclient.httpsession.ConnectionPool
+        :param pool: The connection pool to send the request with, usually
+            the one owned by the session.  If not given, a pool is created
+            for this request only and closed afterwards.
+        """
+        if pool is not None:
+            return await self.send(pool)
+        pool = ConnectionPool()
         try:
-            return httpx.AsyncClient()
-        except:
-            return httpx
+            result = await self.send(pool)
+        except BaseException:
+            await pool.aclose()
+            raise
+        if self.stream_output:
+            # The connection is in use until the body is closed.
+            result.add_release_callback(pool.aclose)
+        else:
+            await pool.aclose()
+        return result
 
-    async def __call__(self):
-        client = self.get_client()
+    async def send(self, pool):
+        headers = list(self.headers.allitems())
+        content = self.body
+        if isinstance(content, memoryview):
+            # httpx would iterate a memoryview as a sequence of ints, so it
+            # is streamed in slices instead, which also avoids a copy.
+            if 'Content-Length' not in self.headers:
+                headers.append(('Content-Length', str(content.nbytes)))
+            content = _iter_memoryview(content)
+        url = self.url
+        if self.params:
+            # Encoded once, as signed, httpx keeps the encoded query as is.
+            url += ('&' if '?' in url else '?') + self.params.query_string()
+        request = pool.build_request(self.method.upper(),
+            url,
+            headers=headers,
+            content=content)
         if not self.stream_output:
-            ret = await client.get(self.method.upper(),
-                self.url,
-                headers=self.headers.allitems(),
-                params=self.params.allitems())
-            return ret
-        else:
-            async with client.stream(self.method.upper(),
-                self.url,
-                headers=self.headers.allitems(),
-                params=self.params.allitems()) as response:
-                async for chunk in response.aiter_bytes():
-                    pass
+            return await pool.send(request)
+        response = await pool.send(request, stream=True)
+        return AsyncStreamingBody(response,
+                                  response.headers.get('content-length'))
+
 
+async def _iter_memoryview(view, chunk_size=MEMORYVIEW_CHUNK_SIZE):
+    view = view.cast('B')
+    for start in range(0, len(view), chunk_size):
+        yield view[start:start + chunk_size]
@@ -1,36 +1,149 @@
+from .exceptions import IncompleteReadError
 
-import sys
-import xml.etree.cElementTree
 
+class AsyncStreamingBody(object):
+    """Wrapper class for an http response body.
 
+    This provides a few additional conveniences that do not exist
+    in the underlying httpx response stream:
 
-class AsyncStreamingBody(object):
+        * Reads into a caller provided buffer, without intermediate copies.
+        * Sized chunk iteration.
+        * Validation that the body is as long as the response said it is.
+
+    The body must be closed once it is not needed anymore, either with
+    ``close()`` or by using it as an async context manager.
+    """
+    _DEFAULT_CHUNK_SIZE = 1024
 
     def __init__(self, raw_stream, content_length):
         self._raw_stream = raw_stream
         self._content_length = content_length
         self._amount_read = 0
+        self._chunks = None
+        # Part of the last chunk received which was not handed out yet.
+        self._pending = None
+        self._release_callbacks = []
+
+    @property
+    def status_code(self):
+        return self._raw_stream.status_code
+
+    @property
+    def headers(self):
+        return self._raw_stream.headers
+
+    async def _next_chunk(self):
+        if self._pending is not None:
+            chunk, self._pending = self._pending, None
+            return chunk
+        if self._chunks is None:
+            self._chunks = self._raw_stream.aiter_raw()
+        while True:
+            try:
+                chunk = await self._chunks.__anext__()
+            except StopAsyncIteration:
+                self._verify_content_length()
+                return None
+            if chunk:
+                self._amount_read += len(chunk)
+                return chunk
+
+    async def read(self, amt=None):
+        """Read at most amt bytes from the stream.
+
+        If the amt argument is omitted, read all data.
+        """
+        pieces = []
+        remaining = amt
+        while remaining is None or remaining > 0:
+            chunk = await self._next_chunk()
+            if chunk is None:
+                break
+            if remaining is not None:
+                if len(chunk) > remaining:
+                    self._pending = memoryview(chunk)[remaining:]
+                    chunk = chunk[:remaining]
+                remaining -= len(chunk)
+            pieces.append(chunk)
+        if len(pieces) == 1 and isinstance(pieces[0], bytes):
+            return pieces[0]
+        return b''.join(pieces)
+
+    async def readinto(self, buffer):
+        """Read bytes into a pre-allocated, writable bytes-like object.
 
-    async def read(self):
-        chunk = await self._raw_stream.aread()
-        self._amount_read += len(chunk)
-        return chunk
+        The buffer is filled completely unless the end of the stream is
+        reached first.  Returns the number of bytes read, 0 at the end of
+        the stream.
+        """
+        view = memoryview(buffer).cast('B')
+        size = len(view)
+        filled = 0
+        while filled < size:
+            chunk = await self._next_chunk()
+            if chunk is None:
+                break
+            count = min(len(chunk), size - filled)
+            view[filled:filled + count] = chunk[:count]
+            if count < len(chunk):
+                self._pending = memoryview(chunk)[count:]
+            filled += count
+        return filled
 
-    async def __aiter__(self):
+    def __aiter__(self):
         """Return an iterator to yield 1k chunks from the raw stream.
         """
-        return await self._raw_stream.iter_bytes()
+        return self.iter_chunks(self._DEFAULT_CHUNK_SIZE)
 
+    async def iter_lines(self):
+        """Return an iterator to yield lines from the raw stream.
 
-    async def iter_lines(self,):
-        return await self._raw_stream.iter_lines()
+        This is achieved by reading chunk of bytes (of size chunk_size) at a
+        time from the raw stream, and then yielding lines from there.
+        """
+        pending = b''
+        async for chunk in self.iter_chunks():
+            lines = (pending + chunk).splitlines(True)
+            for line in lines[:-1]:
+                yield line.splitlines()[0]
+            pending = lines[-1]
+        if pending:
+            yield pending.splitlines()[0]
 
-    async def iter_chunks(self):
+    async def iter_chunks(self, chunk_size=_DEFAULT_CHUNK_SIZE):
         """Return an iterator to yield chunks of chunk_size bytes from the raw
         stream.
         """
-        return await self._raw_stream.iter_bytes()
+        while True:
+            current_chunk = await self.read(chunk_size)
+            if current_chunk == b"":
+                break
+            yield current_chunk
+
+    def _verify_content_length(self):
+        # See: https://github.com/kennethreitz/requests/issues/1855
+        # Basically, our http library doesn't do this for us, so we have
+        # to do this ourself.
+        if self._content_length is not None and \
+                self._amount_read != int(self._content_length):
+            raise IncompleteReadError(
+                actual_bytes=self._amount_read,
+                expected_bytes=int(self._content_length))
 
     async def close(self):
         """Close the underlying http response stream."""
         await self._raw_stream.aclose()
+        callbacks, self._release_callbacks = self._release_callbacks, []
+        for callback in callbacks:
+            await callback()
+
+    def add_release_callback(self, callback):
+        """Register a coroutine function awaited when the body is closed."""
+        self._release_callbacks.append(callback)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
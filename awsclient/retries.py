@@ -0,0 +1,370 @@
+"""Retry the requests failing with transient errors.
+
+What is retried is described by the retry config of each service, the
+rules of ``schema_data/_retry.json`` resolved by clientmaker and embedded
+in the generated clients as ``RETRY_CONFIG``::
+
+    {'__default__': {'max_attempts': 5,
+                     'delay': {'type': 'exponential', 'base': 'rand',
+                               'growth_factor': 2},
+                     'policies': {'throttling': {'applies_when': {
+                         'response': {'service_error_code': 'Throttling',
+                                      'http_status_code': 400}}},
+                                  ...}},
+     'OperationName': {...}}
+
+The ``applies_when`` conditions of the policies are compiled once per
+operation into ``RetryRules``, a few sets and dicts looked up with the
+status code and error code of a response.
+
+Three modes are supported:
+
+    * legacy - Only the rules of the config, with exponential backoff.
+    * standard - The rules, plus a retry quota shared by all the requests
+      of a client: retries draw tokens from it and successful requests
+      give tokens back, so that when a service is overloaded, the
+      clients stop retrying instead of amplifying the load.
+    * adaptive - Standard, plus a client side rate limiter slowing the
+      requests down as soon as the service throttles them.
+
+In every mode, the delay before a retry is drawn with full jitter, between
+zero and an exponentially growing cap.
+"""
+import asyncio
+import logging
+import math
+import random
+import time
+import zlib
+
+import httpx
+
+from .exceptions import InvalidRetryModeError
+
+logger = logging.getLogger(__name__)
+
+RETRY_MODES = ('legacy', 'standard', 'adaptive')
+DEFAULT_RETRY_MODE = 'standard'
+DEFAULT_MAX_ATTEMPTS = 5
+# Cap, in seconds, of the delay before a retry.
+MAX_BACKOFF = 20
+# Retry quota of the standard mode: its capacity, the cost of a retry, of
+# a retry after a timeout, and the tokens given back by a request
+# succeeding at the first attempt.
+INITIAL_RETRY_TOKENS = 500
+RETRY_COST = 5
+TIMEOUT_RETRY_COST = 10
+NO_RETRY_INCREMENT = 1
+# Error codes the adaptive mode treats as throttling, whatever the rules
+# of the service.
+THROTTLING_ERROR_CODES = frozenset([
+    'Throttling',
+    'ThrottlingException',
+    'ThrottledException',
+    'RequestThrottledException',
+    'TooManyRequestsException',
+    'ProvisionedThroughputExceededException',
+    'TransactionInProgressException',
+    'RequestLimitExceeded',
+    'BandwidthLimitExceeded',
+    'LimitExceededException',
+    'RequestThrottled',
+    'SlowDown',
+    'PriorRequestNotComplete',
+    'EC2ThrottledException',
+])
+# The exceptions of the ``GENERAL_CONNECTION_ERROR`` socket errors.
+CONNECTION_ERRORS = (httpx.TransportError, ConnectionError,
+                     asyncio.TimeoutError)
+TIMEOUT_ERRORS = (httpx.TimeoutException, asyncio.TimeoutError)
+
+
+class RetryRules(object):
+    """The compiled policies of the retry config of an operation.
+
+    :type config: dict
+    :param config: The resolved config of the operation, with
+        ``max_attempts``, ``delay`` and ``policies``.
+    """
+
+    def __init__(self, config):
+        self.max_attempts = config.get('max_attempts', DEFAULT_MAX_ATTEMPTS)
+        delay = config.get('delay', {})
+        base = delay.get('base', 1)
+        # A random base draws the delay within the cap, as full jitter
+        # does anyway.
+        self.base = 1 if base == 'rand' else base
+        self.growth_factor = delay.get('growth_factor', 2)
+        # Status codes retried whatever the error, and the status codes of
+        # each error code retried, None standing for any status code.
+        self._status_codes = set()
+        self._error_codes = {}
+        self._crc32_headers = []
+        self._socket_errors = False
+        for policy in config.get('policies', {}).values():
+            self._add_policy(policy.get('applies_when', {}))
+
+    def _add_policy(self, applies_when):
+        response = applies_when.get('response')
+        if response is not None:
+            error_code = response.get('service_error_code')
+            status_code = response.get('http_status_code')
+            if 'crc32body' in response:
+                self._crc32_headers.append(response['crc32body'].lower())
+            elif error_code is not None:
+                self._error_codes.setdefault(error_code, set()).add(
+                    status_code)
+            elif status_code is not None:
+                self._status_codes.add(status_code)
+        if applies_when.get('socket_errors'):
+            self._socket_errors = True
+
+    def matches(self, status_code=None, error_code=None, headers=None,
+                body=None, exception=None):
+        """Whether the outcome of an attempt is to be retried."""
+        if exception is not None:
+            return self._socket_errors and isinstance(exception,
+                                                      CONNECTION_ERRORS)
+        if status_code in self._status_codes:
+            return True
+        if error_code is not None:
+            status_codes = self._error_codes.get(error_code)
+            if status_codes is not None and (
+                    status_code in status_codes or None in status_codes):
+                return True
+        if self._crc32_headers and headers is not None and \
+                isinstance(body, bytes):
+            for header in self._crc32_headers:
+                expected = headers.get(header)
+                if expected is not None and \
+                        int(expected) != zlib.crc32(body) & 0xffffffff:
+                    logger.debug('The crc32 of the response does not match '
+                                 'its %s header.', header)
+                    return True
+        return False
+
+    def backoff(self, attempt):
+        """The delay, in seconds, before retrying after attempt."""
+        cap = min(MAX_BACKOFF, self.base * self.growth_factor ** (attempt - 1))
+        return random.uniform(0, cap)
+
+
+class RetryQuota(object):
+    """The token bucket the retries of a client draw from.
+
+    :type capacity: int
+    :param capacity: The maximum, and initial, number of tokens.
+    """
+
+    def __init__(self, capacity=INITIAL_RETRY_TOKENS):
+        self.max_capacity = capacity
+        self.available = capacity
+
+    def acquire(self, amount):
+        """Take amount tokens, return False if there is not enough."""
+        if amount > self.available:
+            return False
+        self.available -= amount
+        return True
+
+    def release(self, amount):
+        self.available = min(self.available + amount, self.max_capacity)
+
+
+class ClientRateLimiter(object):
+    """Client side rate limiting of the adaptive retry mode.
+
+    Sending a request takes a token from a bucket whose fill rate follows
+    the CUBIC congestion control algorithm: it is cut down on every
+    throttling response, then grows back, fast at first, slowly as it
+    gets close to the rate that was throttled, faster again beyond it.
+    The limiter only starts to limit after a first throttling response.
+    """
+    MIN_FILL_RATE = 0.5
+    MIN_CAPACITY = 1
+    # Weight of the latest measure in the smoothed sending rate.
+    SMOOTH = 0.8
+    # Factor the rate is cut down by on throttling.
+    BETA = 0.7
+    SCALE_CONSTANT = 0.4
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._lock = asyncio.Lock()
+        self.enabled = False
+        self.fill_rate = self.MIN_FILL_RATE
+        self.max_capacity = self.MIN_CAPACITY
+        self.current_capacity = 0
+        self._last_timestamp = None
+        self.measured_rate = 0
+        self._last_rate_bucket = math.floor(clock())
+        self._request_count = 0
+        self._last_max_rate = 0
+        self._last_throttle_time = clock()
+        self._time_window = 0
+
+    async def acquire(self):
+        """Wait until a request can be sent."""
+        if not self.enabled:
+            return
+        async with self._lock:
+            self._refill()
+            while self.current_capacity < 1:
+                await asyncio.sleep(
+                    (1 - self.current_capacity) / self.fill_rate)
+                self._refill()
+            self.current_capacity -= 1
+
+    def update(self, throttled):
+        """Adjust the rate to the response of a request."""
+        now = self._clock()
+        self._update_measured_rate(now)
+        if throttled:
+            if self.enabled:
+                rate = min(self.measured_rate, self.fill_rate)
+            else:
+                rate = self.measured_rate
+            self._last_max_rate = rate
+            self._time_window = (
+                rate * (1 - self.BETA) / self.SCALE_CONSTANT) ** (1 / 3.0)
+            self._last_throttle_time = now
+            new_rate = rate * self.BETA
+            self.enabled = True
+        else:
+            new_rate = self.SCALE_CONSTANT * (
+                now - self._last_throttle_time - self._time_window) ** 3 + \
+                self._last_max_rate
+        self._set_fill_rate(min(new_rate, 2 * self.measured_rate), now)
+
+    def _refill(self):
+        now = self._clock()
+        if self._last_timestamp is not None:
+            self.current_capacity = min(
+                self.max_capacity, self.current_capacity +
+                (now - self._last_timestamp) * self.fill_rate)
+        self._last_timestamp = now
+
+    def _set_fill_rate(self, rate, now):
+        self._refill()
+        self.fill_rate = max(rate, self.MIN_FILL_RATE)
+        self.max_capacity = max(rate, self.MIN_CAPACITY)
+        self.current_capacity = min(self.current_capacity, self.max_capacity)
+
+    def _update_measured_rate(self, now):
+        # The requests are counted in buckets of half a second.
+        bucket = math.floor(now * 2) / 2
+        self._request_count += 1
+        if bucket > self._last_rate_bucket:
+            rate = self._request_count / (bucket - self._last_rate_bucket)
+            self.measured_rate = rate * self.SMOOTH + \
+                self.measured_rate * (1 - self.SMOOTH)
+            self._request_count = 0
+            self._last_rate_bucket = bucket
+
+
+class RetryHandler(object):
+    """The retry state of a client.
+
+    :type config: dict
+    :param config: The retry config of the service, ``RETRY_CONFIG`` of the
+        generated clients.  No request is retried without it.
+
+    :type mode: str
+    :param mode: One of ``legacy``, ``standard`` and ``adaptive``.
+
+    :type max_attempts: int
+    :param max_attempts: The number of attempts of each request, including
+        the first one.  Defaults to the ``max_attempts`` of the config.
+    """
+
+    def __init__(self, config=None, mode=DEFAULT_RETRY_MODE,
+                 max_attempts=None):
+        if mode not in RETRY_MODES:
+            raise InvalidRetryModeError(mode=mode,
+                                        valid_modes=', '.join(RETRY_MODES))
+        self.mode = mode
+        self._config = config or {}
+        self._max_attempts = max_attempts
+        self._rules = {}
+        self.quota = None if mode == 'legacy' else RetryQuota()
+        self.rate_limiter = ClientRateLimiter() if mode == 'adaptive' \
+            else None
+
+    def rules(self, operation_name):
+        """The compiled rules of operation_name."""
+        rules = self._rules.get(operation_name)
+        if rules is None:
+            config = self._config.get('__default__', {})
+            operation_config = self._config.get(operation_name)
+            if operation_config is not None:
+                config = dict(config, **operation_config)
+                config['policies'] = dict(
+                    self._config.get('__default__', {}).get('policies', {}),
+                    **operation_config.get('policies', {}))
+            rules = RetryRules(config)
+            if self._max_attempts is not None:
+                rules.max_attempts = self._max_attempts
+            self._rules[operation_name] = rules
+        return rules
+
+    def attempts(self, operation_name):
+        """Start the attempts of a request of operation_name."""
+        return RetryAttempts(self, self.rules(operation_name))
+
+
+class RetryAttempts(object):
+    """The attempts of one request, created by ``RetryHandler.attempts``::
+
+        attempts = handler.attempts(operation_name)
+        while True:
+            await attempts.before_send()
+            ... send the request ...
+            delay = attempts.retry_delay(status_code=..., error_code=...)
+            if delay is None:
+                break
+            await asyncio.sleep(delay)
+    """
+
+    def __init__(self, handler, rules):
+        self._handler = handler
+        self._rules = rules
+        self.attempt = 0
+        self._retry_cost = None
+
+    async def before_send(self):
+        self.attempt += 1
+        if self._handler.rate_limiter is not None:
+            await self._handler.rate_limiter.acquire()
+
+    def retry_delay(self, status_code=None, error_code=None, headers=None,
+                    body=None, exception=None, retryable=True):
+        """Return the delay before the next attempt, None to give up.
+
+        Called with the outcome of every attempt, successful or not, to
+        keep the retry quota and the rate limiter up to date.
+        """
+        handler = self._handler
+        if handler.rate_limiter is not None:
+            handler.rate_limiter.update(
+                error_code in THROTTLING_ERROR_CODES or status_code == 429)
+        if not self._rules.matches(status_code, error_code, headers, body,
+                                   exception):
+            if exception is None and status_code < 300 and \
+                    handler.quota is not None:
+                handler.quota.release(
+                    NO_RETRY_INCREMENT if self._retry_cost is None
+                    else self._retry_cost)
+            return None
+        if not retryable or self.attempt >= self._rules.max_attempts:
+            return None
+        if handler.quota is not None:
+            cost = TIMEOUT_RETRY_COST if isinstance(
+                exception, TIMEOUT_ERRORS) else RETRY_COST
+            if not handler.quota.acquire(cost):
+                logger.debug('Retry quota exhausted, not retrying.')
+                return None
+            self._retry_cost = cost
+        delay = self._rules.backoff(self.attempt)
+        logger.debug('Retrying attempt %s in %.3f seconds.', self.attempt,
+                     delay)
+        return delay
@@ -1,9 +1,207 @@
+import xml.etree.ElementTree as ElementTree
+
+from .auth import S3SigV4Auth
+from .datastructures import QueryParams
+from .exceptions import ClientError, NoCredentialsError
+from .request import Request
+from .session import Session
+from .transfer import S3Transfer
+from .utils import percent_encode
+
+
+S3_NAMESPACE = 'http://s3.amazonaws.com/doc/2006-03-01/'
+
 
 class S3Client(object):
-    def __init__(self):
-        pass
+    """
+    A low level client for the subset of the S3 API used by the transfer
+    helpers, built on the SigV4 signer and the session's connection pool.
+
+    Requests use path style addressing (``<endpoint>/<bucket>/<key>``),
+    so ``endpoint_url`` can point at any S3 compatible server.
+    """
+
+    def __init__(self, credentials=None, region_name='us-east-1', session=None,
+                 endpoint_url=None):
+        # Resolved by the session on the first request if not given.
+        self.credentials = credentials
+        self.region_name = region_name
+        self._owns_session = session is None
+        self.session = Session() if session is None else session
+        if endpoint_url is None:
+            endpoint_url = 'https://s3.%s.amazonaws.com' % region_name
+        self.endpoint_url = endpoint_url.rstrip('/')
+        self._signer = S3SigV4Auth(credentials, 's3', region_name)
 
     @classmethod
-    def create_client(cls, region_name='us-east-1'):
-        pass
+    def create_client(cls, region_name='us-east-1', credentials=None,
+                      session=None, endpoint_url=None):
+        return cls(credentials, region_name=region_name, session=session,
+                   endpoint_url=endpoint_url)
+
+    async def _resolve_credentials(self):
+        credentials = await self.session.get_credentials()
+        if credentials is None:
+            raise NoCredentialsError
+        self.credentials = self._signer.credentials = credentials
+
+    async def aclose(self):
+        """Close the session, if it was created by this client."""
+        if self._owns_session:
+            await self.session.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    def _object_url(self, bucket, key=None):
+        url = '%s/%s' % (self.endpoint_url, percent_encode(bucket, safe=''))
+        if key is not None:
+            url += '/' + percent_encode(key, safe='/~')
+        return url
+
+    async def _make_request(self, operation_name, method, bucket, key=None,
+                            params=None, headers=None, body=None,
+                            stream_output=False):
+        request = Request(method, self._object_url(bucket, key), data=body,
+                          params=QueryParams((params or {}).items()),
+                          stream_output=stream_output)
+        for name, value in (headers or {}).items():
+            if value is not None:
+                request.headers[name] = value
+        if self.credentials is None:
+            await self._resolve_credentials()
+        await self._signer.add_auth_async(request)
+        response = await request(self.session.connection_pool)
+        if response.status_code >= 300:
+            if stream_output:
+                content = await response.read()
+                await response.close()
+            else:
+                content = response.content
+            raise self._error_from_response(
+                operation_name, response.status_code, content)
+        return response
+
+    def _error_from_response(self, operation_name, status_code, content):
+        code, message = str(status_code), ''
+        if content:
+            try:
+                root = ElementTree.fromstring(content)
+            except ElementTree.ParseError:
+                pass
+            else:
+                code = root.findtext('{*}Code') or code
+                message = root.findtext('{*}Message') or message
+        return ClientError(code, message, operation_name,
+                           status_code=status_code)
+
+    def _object_metadata(self, headers):
+        metadata = {
+            'ContentLength': int(headers.get('content-length', 0)),
+            'ETag': headers.get('etag'),
+            'ContentType': headers.get('content-type'),
+            'LastModified': headers.get('last-modified'),
+        }
+        if 'content-range' in headers:
+            metadata['ContentRange'] = headers['content-range']
+        return metadata
+
+    async def head_object(self, Bucket, Key, IfMatch=None):
+        response = await self._make_request(
+            'HeadObject', 'HEAD', Bucket, Key, headers={'If-Match': IfMatch})
+        return self._object_metadata(response.headers)
+
+    async def get_object(self, Bucket, Key, Range=None, IfMatch=None):
+        """Get an object, or a byte range of it.
+
+        The returned dict holds the object metadata and the object data
+        as an ``AsyncStreamingBody`` under ``Body``, which must be closed
+        by the caller.
+        """
+        body = await self._make_request(
+            'GetObject', 'GET', Bucket, Key,
+            headers={'Range': Range, 'If-Match': IfMatch},
+            stream_output=True)
+        result = self._object_metadata(body.headers)
+        result['Body'] = body
+        return result
+
+    async def put_object(self, Bucket, Key, Body=None):
+        response = await self._make_request(
+            'PutObject', 'PUT', Bucket, Key, body=Body)
+        return {'ETag': response.headers.get('etag')}
+
+    async def create_multipart_upload(self, Bucket, Key):
+        response = await self._make_request(
+            'CreateMultipartUpload', 'POST', Bucket, Key,
+            params={'uploads': ''})
+        root = ElementTree.fromstring(response.content)
+        return {
+            'Bucket': root.findtext('{*}Bucket'),
+            'Key': root.findtext('{*}Key'),
+            'UploadId': root.findtext('{*}UploadId'),
+        }
+
+    async def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        response = await self._make_request(
+            'UploadPart', 'PUT', Bucket, Key, body=Body,
+            params={'partNumber': str(PartNumber), 'uploadId': UploadId})
+        return {'ETag': response.headers.get('etag')}
+
+    async def complete_multipart_upload(self, Bucket, Key, UploadId,
+                                        MultipartUpload):
+        root = ElementTree.Element('CompleteMultipartUpload',
+                                   xmlns=S3_NAMESPACE)
+        for part in MultipartUpload['Parts']:
+            part_element = ElementTree.SubElement(root, 'Part')
+            ElementTree.SubElement(part_element, 'ETag').text = part['ETag']
+            ElementTree.SubElement(part_element, 'PartNumber').text = str(
+                part['PartNumber'])
+        response = await self._make_request(
+            'CompleteMultipartUpload', 'POST', Bucket, Key,
+            params={'uploadId': UploadId},
+            body=ElementTree.tostring(root))
+        # S3 can report a failure of the complete request in the body of a
+        # 200 response.
+        root = ElementTree.fromstring(response.content)
+        if root.tag.rsplit('}', 1)[-1] == 'Error':
+            raise self._error_from_response(
+                'CompleteMultipartUpload', response.status_code,
+                response.content)
+        return {
+            'Bucket': root.findtext('{*}Bucket'),
+            'Key': root.findtext('{*}Key'),
+            'ETag': root.findtext('{*}ETag'),
+            'Location': root.findtext('{*}Location'),
+        }
+
+    async def abort_multipart_upload(self, Bucket, Key, UploadId):
+        await self._make_request(
+            'AbortMultipartUpload', 'DELETE', Bucket, Key,
+            params={'uploadId': UploadId})
+        return {}
+
+    async def upload_file(self, Filename, Bucket, Key, Config=None):
+        """Upload a file, in concurrent parts if it is large enough.
+
+        See ``awsclient.transfer.TransferConfig`` for the tuning options.
+        """
+        await S3Transfer(self, Config).upload_file(Filename, Bucket, Key)
+
+    async def upload_fileobj(self, Fileobj, Bucket, Key, Config=None):
+        """Upload a readable file-like object."""
+        await S3Transfer(self, Config).upload_fileobj(Fileobj, Bucket, Key)
+
+    async def download_file(self, Bucket, Key, Filename, Config=None):
+        """Download an object to a file, fetching byte ranges concurrently.
+
+        See ``awsclient.transfer.TransferConfig`` for the tuning options.
+        """
+        await S3Transfer(self, Config).download_file(Bucket, Key, Filename)
 
+    async def download_fileobj(self, Bucket, Key, Fileobj, Config=None):
+        """Download an object into a seekable, writable file-like object."""
+        await S3Transfer(self, Config).download_fileobj(Bucket, Key, Fileobj)
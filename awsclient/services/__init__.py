@@ -0,0 +1,6 @@
+"""Generated service clients.
+
+The modules of this package are generated from the service models by
+running ``python make.py`` at the root of the repository, one module per
+service, e.g. ``awsclient.services.dynamodb.DynamoDBClient``.
+"""
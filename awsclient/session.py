@@ -1,3 +1,65 @@
+import asyncio
+
+from .credentials import create_credential_resolver
+from .httpsession import ConnectionPool, DEFAULT_MAX_POOL_CONNECTIONS
+from .httpsession import DEFAULT_KEEPALIVE_EXPIRY, DEFAULT_TIMEOUT
+
 
 class Session(object):
-    pass
\ No newline at end of file
+    """
+    A session holds the state shared by the clients created from it,
+    starting with the pool of HTTP connections they send requests through,
+    and the credentials of the clients created without any.
+
+    The session must be closed with ``aclose()``, or used as an async
+    context manager, to release its connections.
+
+    :type profile_name: str
+    :param profile_name: The profile the credentials are resolved for, see
+        ``awsclient.credentials.create_credential_resolver``.
+    """
+
+    def __init__(self, max_pool_connections=DEFAULT_MAX_POOL_CONNECTIONS,
+                 keepalive_expiry=DEFAULT_KEEPALIVE_EXPIRY,
+                 timeout=DEFAULT_TIMEOUT, profile_name=None):
+        self.connection_pool = ConnectionPool(
+            max_connections=max_pool_connections,
+            keepalive_expiry=keepalive_expiry,
+            timeout=timeout)
+        self.profile_name = profile_name
+        self._credentials_task = None
+
+    async def get_credentials(self):
+        """Resolve the credentials with the default provider chain.
+
+        They are resolved once, by a single task however many clients ask
+        for them at the same time, and kept by the session.
+
+        :return: The credentials, or None if no provider found any.
+        """
+        task = self._credentials_task
+        if task is None:
+            task = self._credentials_task = asyncio.get_running_loop() \
+                .create_task(self._resolve_credentials())
+        credentials = None
+        try:
+            credentials = await asyncio.shield(task)
+        finally:
+            if task.done() and credentials is None and \
+                    self._credentials_task is task:
+                # Resolved again by the next call.
+                self._credentials_task = None
+        return credentials
+
+    async def _resolve_credentials(self):
+        resolver = create_credential_resolver(self.profile_name)
+        return await resolver.load_credentials()
+
+    async def aclose(self):
+        await self.connection_pool.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
@@ -0,0 +1,353 @@
+"""High level, concurrent transfers between S3 and files.
+
+Downloads of objects larger than ``multipart_threshold`` are split into
+byte ranges of ``multipart_chunksize`` bytes, fetched by at most
+``max_concurrency`` tasks.  Each task reads its range into a reusable
+buffer and writes it straight at its offset in the destination, so ranges
+never have to be put back in order in memory.
+
+Uploads of that size go through a multipart upload, with at most
+``max_concurrency`` parts in flight.  Parts of regular files are
+``memoryview`` slices of a memory map of the file, other file-like
+objects are read one part at a time by the task that uploads it, so the
+memory used stays around ``max_concurrency * multipart_chunksize``.
+"""
+import asyncio
+import functools
+import io
+import logging
+import math
+import mmap
+import os
+import stat
+import threading
+import uuid
+
+logger = logging.getLogger(__name__)
+
+KB = 1024
+MB = KB * KB
+GB = MB * KB
+TB = GB * KB
+
+# Limits of the S3 multipart upload API.
+MAX_PARTS = 10000
+MIN_UPLOAD_CHUNKSIZE = 5 * MB
+MAX_UPLOAD_CHUNKSIZE = 5 * GB
+MAX_UPLOAD_SIZE = 5 * TB
+
+
+class TransferConfig(object):
+    """Configuration for ``S3Transfer``.
+
+    :type multipart_threshold: int
+    :param multipart_threshold: Objects at least this large are
+        transferred in concurrent parts.
+
+    :type multipart_chunksize: int
+    :param multipart_chunksize: The size of each part.
+
+    :type max_concurrency: int
+    :param max_concurrency: The maximum number of parts in flight.
+
+    :type io_chunksize: int
+    :param io_chunksize: The size of the buffer each task reads the
+        network stream into before writing it to the file.
+    """
+
+    def __init__(self, multipart_threshold=8 * MB,
+                 multipart_chunksize=8 * MB, max_concurrency=10,
+                 io_chunksize=256 * KB):
+        self.multipart_threshold = multipart_threshold
+        self.multipart_chunksize = multipart_chunksize
+        self.max_concurrency = max_concurrency
+        self.io_chunksize = io_chunksize
+
+
+class ChunksizeAdjuster(object):
+    """Adjust a part size to the limits of the multipart upload API."""
+
+    def __init__(self, max_size=MAX_UPLOAD_CHUNKSIZE,
+                 min_size=MIN_UPLOAD_CHUNKSIZE, max_parts=MAX_PARTS):
+        self.max_size = max_size
+        self.min_size = min_size
+        self.max_parts = max_parts
+
+    def adjust_chunksize(self, current_chunksize, file_size=None):
+        """Get a chunksize close to current that fits within all S3 limits.
+
+        :type current_chunksize: int
+        :param current_chunksize: The currently configured chunksize.
+
+        :type file_size: int or None
+        :param file_size: The size of the file to upload.  This might be
+            None if the object being transferred has an unknown size.
+
+        :returns: A valid chunksize that fits within configured limits.
+        """
+        chunksize = min(max(current_chunksize, self.min_size), self.max_size)
+        if file_size is None:
+            return chunksize
+        if file_size > MAX_UPLOAD_SIZE:
+            raise ValueError('Objects larger than %s bytes can not be '
+                             'uploaded: %s' % (MAX_UPLOAD_SIZE, file_size))
+        # Double the part size until the whole file fits in max_parts.
+        while math.ceil(file_size / chunksize) > self.max_parts:
+            chunksize *= 2
+        return min(chunksize, self.max_size)
+
+
+class FileWriter(object):
+    """Write data at arbitrary offsets of a file-like object.
+
+    Writes run on the loop's default executor, so that the disk does not
+    block the event loop, and with it the other ranges being downloaded.
+    Real files are written with ``os.pwrite``, which does not move the
+    shared file position.  Other file-like objects are written with a
+    ``seek`` followed by a ``write``, under a lock.
+    """
+
+    def __init__(self, fileobj):
+        self._fileobj = fileobj
+        self._lock = threading.Lock()
+        try:
+            self._fileno = fileobj.fileno()
+        except (AttributeError, io.UnsupportedOperation):
+            self._fileno = None
+        if not hasattr(os, 'pwrite'):
+            self._fileno = None
+
+    def preallocate(self, size):
+        if self._fileno is not None:
+            os.ftruncate(self._fileno, size)
+
+    async def write_at(self, offset, data):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._write_at, offset, data)
+
+    def _write_at(self, offset, data):
+        if self._fileno is not None:
+            view = memoryview(data)
+            while view:
+                written = os.pwrite(self._fileno, view, offset)
+                view = view[written:]
+                offset += written
+        else:
+            with self._lock:
+                self._fileobj.seek(offset)
+                self._fileobj.write(data)
+
+
+class S3Transfer(object):
+    def __init__(self, client, config=None):
+        self._client = client
+        self._config = TransferConfig() if config is None else config
+        self._adjuster = ChunksizeAdjuster()
+
+    async def upload_file(self, filename, bucket, key):
+        with open(filename, 'rb') as f:
+            await self.upload_fileobj(f, bucket, key)
+
+    async def upload_fileobj(self, fileobj, bucket, key):
+        size = _regular_file_size(fileobj)
+        if size is None:
+            await self._upload_stream(fileobj, bucket, key)
+            return
+        if size == 0:
+            await self._client.put_object(Bucket=bucket, Key=key, Body=b'')
+            return
+        position = fileobj.tell()
+        mapped = mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            view = memoryview(mapped)[position:]
+            if len(view) < self._config.multipart_threshold:
+                await self._client.put_object(
+                    Bucket=bucket, Key=key, Body=view)
+                return
+            part_size = self._adjuster.adjust_chunksize(
+                self._config.multipart_chunksize, len(view))
+            parts = _memory_parts(view, part_size)
+            await self._upload_parts(bucket, key, parts)
+        finally:
+            view = parts = None
+            try:
+                mapped.close()
+            except BufferError:
+                # A slice is still referenced, e.g. by a traceback; the
+                # map is closed when it is garbage collected.
+                pass
+
+    async def _upload_stream(self, fileobj, bucket, key):
+        part_size = self._adjuster.adjust_chunksize(
+            self._config.multipart_chunksize)
+        # Parts are read on the loop's default executor, so that reading
+        # them does not block the uploads in flight.
+        loop = asyncio.get_running_loop()
+        read = functools.partial(fileobj.read, part_size)
+        first_part = await loop.run_in_executor(None, read)
+        if len(first_part) < part_size:
+            await self._client.put_object(
+                Bucket=bucket, Key=key, Body=first_part)
+            return
+
+        async def read_parts():
+            # Each part is only read when a task is ready to upload it.
+            yield 1, first_part
+            for part_number in range(2, MAX_PARTS + 1):
+                data = await loop.run_in_executor(None, read)
+                if not data:
+                    return
+                yield part_number, data
+            if await loop.run_in_executor(None, fileobj.read, 1):
+                raise ValueError('The stream does not fit in %s parts of %s '
+                                 'bytes' % (MAX_PARTS, part_size))
+
+        await self._upload_parts(bucket, key, read_parts())
+
+    async def _upload_parts(self, bucket, key, parts):
+        response = await self._client.create_multipart_upload(
+            Bucket=bucket, Key=key)
+        upload_id = response['UploadId']
+        completed = []
+        lock = asyncio.Lock()
+
+        async def worker():
+            # The workers share the parts iterator, taking one part at a
+            # time, so at most one part per worker is being read or sent at
+            # any time.
+            while True:
+                async with lock:
+                    try:
+                        part_number, body = await parts.__anext__()
+                    except StopAsyncIteration:
+                        return
+                response = await self._client.upload_part(
+                    Bucket=bucket, Key=key, UploadId=upload_id,
+                    PartNumber=part_number, Body=body)
+                completed.append({'ETag': response['ETag'],
+                                  'PartNumber': part_number})
+
+        workers = [asyncio.ensure_future(worker())
+                   for _ in range(self._config.max_concurrency)]
+        try:
+            try:
+                await asyncio.gather(*workers)
+            finally:
+                # On failure, the other workers are stopped before the
+                # upload is aborted.
+                for task in workers:
+                    task.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+                await parts.aclose()
+            completed.sort(key=lambda part: part['PartNumber'])
+            await self._client.complete_multipart_upload(
+                Bucket=bucket, Key=key, UploadId=upload_id,
+                MultipartUpload={'Parts': completed})
+        except BaseException:
+            # Uploaded parts are billed until the upload is completed or
+            # aborted.
+            await self._abort(bucket, key, upload_id)
+            raise
+
+    async def _abort(self, bucket, key, upload_id):
+        try:
+            await self._client.abort_multipart_upload(
+                Bucket=bucket, Key=key, UploadId=upload_id)
+        except Exception:
+            logger.debug('Failed to abort multipart upload %s of s3://%s/%s',
+                         upload_id, bucket, key, exc_info=True)
+
+    async def download_file(self, bucket, key, filename):
+        """Download an object to filename.
+
+        The object is downloaded to a temporary file next to filename,
+        which is renamed once the download is complete.
+        """
+        temp_filename = '%s.%s' % (filename, uuid.uuid4().hex[:8])
+        try:
+            with open(temp_filename, 'wb') as f:
+                await self.download_fileobj(bucket, key, f)
+            os.replace(temp_filename, filename)
+        except BaseException:
+            try:
+                os.remove(temp_filename)
+            except OSError:
+                pass
+            raise
+
+    async def download_fileobj(self, bucket, key, fileobj):
+        head = await self._client.head_object(Bucket=bucket, Key=key)
+        size = head['ContentLength']
+        writer = FileWriter(fileobj)
+        writer.preallocate(size)
+        if size < self._config.multipart_threshold:
+            await self._download_range(
+                bucket, key, writer, 0, size, head['ETag'],
+                bytearray(self._config.io_chunksize))
+            return
+        await self._download_ranges(bucket, key, writer, size, head['ETag'])
+
+    async def _download_ranges(self, bucket, key, writer, size, etag):
+        part_size = self._config.multipart_chunksize
+        # The workers share this iterator, each one picking the next range
+        # to fetch as soon as it is done with the previous one.
+        starts = iter(range(0, size, part_size))
+
+        async def worker():
+            buffer = bytearray(self._config.io_chunksize)
+            for start in starts:
+                await self._download_range(
+                    bucket, key, writer, start,
+                    min(start + part_size, size), etag, buffer)
+
+        num_parts = -(-size // part_size)
+        workers = [asyncio.ensure_future(worker()) for _ in
+                   range(min(self._config.max_concurrency, num_parts))]
+        try:
+            await asyncio.gather(*workers)
+        except BaseException:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            raise
+
+    async def _download_range(self, bucket, key, writer, start, end, etag,
+                              buffer):
+        # Pinning the ETag makes sure all the ranges come from the same
+        # version of the object, even if it is overwritten meanwhile.
+        kwargs = {'Bucket': bucket, 'Key': key, 'IfMatch': etag}
+        if end > start:
+            kwargs['Range'] = 'bytes=%d-%d' % (start, end - 1)
+        elif end == 0:
+            # Ranges can not be requested for empty objects.
+            kwargs.pop('IfMatch')
+        response = await self._client.get_object(**kwargs)
+        offset = start
+        async with response['Body'] as body:
+            view = memoryview(buffer)
+            while True:
+                count = await body.readinto(buffer)
+                if not count:
+                    break
+                await writer.write_at(offset, view[:count])
+                offset += count
+        logger.debug('Downloaded bytes %s-%s of s3://%s/%s',
+                     start, offset, bucket, key)
+
+
+async def _memory_parts(view, part_size):
+    # The parts of a memory mapped file, slices of the map.
+    for start in range(0, len(view), part_size):
+        yield start // part_size + 1, view[start:start + part_size]
+
+
+def _regular_file_size(fileobj):
+    # The size of what is left to read in fileobj, if it is a regular file
+    # that can be memory mapped, None otherwise.
+    try:
+        file_stat = os.fstat(fileobj.fileno())
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+    if not stat.S_ISREG(file_stat.st_mode):
+        return None
+    return file_stat.st_size - fileobj.tell()
@@ -1,6 +1,26 @@
-from urllib.parse import quote
+import base64
+import calendar
+import datetime
+import functools
+import json
+import re
+from email.utils import formatdate, parsedate_to_datetime
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 SAFE_CHARS = '-._~'
+# The characters ``urllib.parse.quote`` never encodes, whatever its safe
+# characters.
+_ALWAYS_SAFE = ('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+                '0123456789_.-~')
+# Number of strings memoized by ``percent_encode``, and the length of the
+# longest one.  Longer strings are unlikely to repeat, and are not.
+PERCENT_ENCODE_CACHE_SIZE = 4096
+PERCENT_ENCODE_CACHE_MAX_LENGTH = 256
+_percent_encoders = {}
 
 
 def normalize_url_path(path):
@@ -83,11 +103,126 @@ def percent_encode(input_str, safe=SAFE_CHARS):
     text type, will produce the binary type by UTF-8 encoding the
     text. If given something else, will convert it to the text type
     first.
+
+    The result is the one of ``urllib.parse.quote``, but strings made of
+    safe characters only are returned as is, the others are translated
+    with a table of the 256 byte values, and encoded strings are memoized
+    in a bounded LRU cache, as the same keys, prefixes and query values
+    are encoded again and again.
     """
     # If its not a binary or text string, make it a text string.
     if not isinstance(input_str, (bytes, str)):
         input_str = str(input_str)
-    # If it's not bytes, make it bytes by UTF-8 encoding it.
-    if not isinstance(input_str, bytes):
-        input_str = input_str.encode('utf-8')
-    return quote(input_str, safe=safe)
\ No newline at end of file
+    encoder = _percent_encoders.get(safe) or _percent_encoder(safe)
+    if isinstance(input_str, bytes):
+        return encoder.encode(input_str)
+    if encoder.is_safe(input_str):
+        return input_str
+    if len(input_str) > PERCENT_ENCODE_CACHE_MAX_LENGTH:
+        return encoder.encode(input_str)
+    return _cached_encode(input_str, safe)
+
+
+class _PercentEncoder(object):
+    # The encoding table of the byte values, indexed by the characters of
+    # the bytes decoded as latin-1, and the matcher of the safe strings,
+    # for one set of safe characters.
+
+    def __init__(self, safe):
+        safe = ''.join(c for c in _ALWAYS_SAFE + safe if c < '\x80')
+        self.table = ['%c' % b if chr(b) in safe else '%%%02X' % b
+                      for b in range(256)]
+        self.is_safe = re.compile('[%s]*' % re.escape(safe)).fullmatch
+
+    def encode(self, value):
+        if isinstance(value, str):
+            if self.is_safe(value):
+                return value
+            value = value.encode('utf-8')
+        return value.decode('latin-1').translate(self.table)
+
+
+def _percent_encoder(safe):
+    encoder = _percent_encoders.get(safe)
+    if encoder is None:
+        encoder = _percent_encoders[safe] = _PercentEncoder(safe)
+    return encoder
+
+
+@functools.lru_cache(maxsize=PERCENT_ENCODE_CACHE_SIZE)
+def _cached_encode(value, safe):
+    return _percent_encoder(safe).encode(value)
+
+
+def serialize_timestamp(value, timestamp_format):
+    """Serialize a timestamp for the wire.
+
+    :param value: A ``datetime``, a number of seconds since the epoch or an
+        already formatted string, which is passed through unchanged.
+
+    :param timestamp_format: One of ``iso8601``, ``unixTimestamp`` or
+        ``rfc822``.
+    """
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)):
+        value = datetime.datetime.fromtimestamp(value, datetime.timezone.utc)
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc)
+    if timestamp_format == 'unixTimestamp':
+        seconds = calendar.timegm(value.timetuple())
+        if value.microsecond:
+            return seconds + value.microsecond / 1e6
+        return seconds
+    elif timestamp_format == 'rfc822':
+        return formatdate(calendar.timegm(value.timetuple()), usegmt=True)
+    if value.microsecond:
+        return value.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+    return value.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def parse_timestamp(value):
+    """Parse a timestamp received from a service into an aware datetime.
+
+    Services send epoch seconds, ISO 8601 or RFC 822 timestamps.
+    """
+    if isinstance(value, (int, float)):
+        return datetime.datetime.fromtimestamp(value, datetime.timezone.utc)
+    try:
+        return datetime.datetime.fromtimestamp(
+            float(value), datetime.timezone.utc)
+    except ValueError:
+        pass
+    try:
+        parsed = datetime.datetime.fromisoformat(
+            value.replace('Z', '+00:00'))
+    except ValueError:
+        parsed = parsedate_to_datetime(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed
+
+
+def encode_blob(value):
+    """Base64 encode a blob value, encoding text to UTF-8 first."""
+    if isinstance(value, str):
+        value = value.encode('utf-8')
+    return base64.b64encode(value).decode('ascii')
+
+
+def decode_blob(value):
+    return base64.b64decode(value) if value else b''
+
+
+if orjson is not None:
+    def json_dumps(value):
+        """Encode value to compact JSON, as bytes."""
+        return orjson.dumps(value)
+
+    json_loads = orjson.loads
+else:
+    def json_dumps(value):
+        """Encode value to compact JSON, as bytes."""
+        return json.dumps(value, separators=(',', ':')).encode('utf-8')
+
+    json_loads = json.loads
@@ -0,0 +1,347 @@
+"""Wait for resources to reach a state by polling an operation.
+
+The waiters of a service are described by its ``waiters-2.json`` model,
+embedded by clientmaker in the generated clients as ``WAITERS``, keyed by
+the snake case name of the waiter::
+
+    waiter = client.get_waiter('instance_running')
+    await waiter.wait(InstanceIds=['i-1234567890abcdef0'])
+
+The acceptors of a waiter, and their JMESPath expressions, are compiled
+once per client class.
+
+The waits of a client are not independent sleep loops: they are all
+scheduled on the client's ``WaiterScheduler``, a timer wheel polled by a
+single task, which sends the polls that are due with a bounded
+concurrency.  Waits of the same waiter with the same parameters share
+their polls.
+"""
+import asyncio
+import collections
+import heapq
+import logging
+import math
+
+import jmespath
+
+from .exceptions import ClientError, WaiterError
+
+logger = logging.getLogger(__name__)
+
+# Granularity, in seconds, of the timer wheel of the scheduler.
+DEFAULT_RESOLUTION = 0.1
+# Number of polls sent at the same time by a scheduler.
+DEFAULT_MAX_CONCURRENCY = 32
+
+_expressions = {}
+
+
+def _compile_expression(expression):
+    compiled = _expressions.get(expression)
+    if compiled is None:
+        compiled = _expressions[expression] = jmespath.compile(expression)
+    return compiled
+
+
+def compile_acceptor(config):
+    """Return the ``(state, matches)`` of an acceptor config.
+
+    ``matches`` is called with the parsed response of the operation, or
+    the ``response`` of the ``ClientError`` it raised.
+    """
+    matcher = config['matcher']
+    expected = config['expected']
+    if matcher in ('path', 'pathAll', 'pathAny'):
+        expression = _compile_expression(config['argument'])
+    if matcher == 'path':
+        def matches(response):
+            return 'Error' not in response and \
+                expression.search(response) == expected
+    elif matcher == 'pathAll':
+        def matches(response):
+            if 'Error' in response:
+                return False
+            result = expression.search(response)
+            # An empty list does not match.
+            return isinstance(result, list) and bool(result) and \
+                all(element == expected for element in result)
+    elif matcher == 'pathAny':
+        def matches(response):
+            if 'Error' in response:
+                return False
+            result = expression.search(response)
+            return isinstance(result, list) and expected in result
+    elif matcher == 'status':
+        def matches(response):
+            return response.get('ResponseMetadata', {}).get(
+                'HTTPStatusCode') == expected
+    elif matcher == 'error':
+        def matches(response):
+            return response.get('Error', {}).get('Code', '') == expected
+    else:
+        raise ValueError('Unknown acceptor matcher: %s' % matcher)
+    return config['state'], matches
+
+
+class WaiterModel(object):
+    """The compiled config of a waiter.
+
+    :type name: str
+    :param name: The name of the waiter, e.g. ``InstanceRunning``.
+
+    :type config: dict
+    :param config: The config of the waiter, from ``WAITERS``.
+    """
+
+    def __init__(self, name, config):
+        self.name = name
+        self.method = config['method']
+        self.delay = config['delay']
+        self.max_attempts = config['maxAttempts']
+        self.acceptors = [compile_acceptor(acceptor)
+                          for acceptor in config['acceptors']]
+
+    def state(self, response):
+        """The state of the acceptor matching response, or None."""
+        for state, matches in self.acceptors:
+            if matches(response):
+                return state
+        return None
+
+
+class Waiter(object):
+    """A waiter of a client, returned by ``BaseClient.get_waiter``."""
+
+    def __init__(self, client, model, scheduler):
+        self.client = client
+        self.model = model
+        self._scheduler = scheduler
+
+    @property
+    def name(self):
+        return self.model.name
+
+    async def wait(self, WaiterConfig=None, **kwargs):
+        """Poll the operation of the waiter with kwargs until it succeeds.
+
+        :type WaiterConfig: dict
+        :param WaiterConfig: Overrides the ``Delay`` between polls, in
+            seconds, and the ``MaxAttempts`` of the waiter.
+
+        :raises WaiterError: If the resource reaches a failure state, or
+            the maximum number of attempts is reached.
+
+        :return: The response of the last poll.
+        """
+        config = WaiterConfig or {}
+        return await self._scheduler.wait(
+            self, kwargs, config.get('Delay', self.model.delay),
+            config.get('MaxAttempts', self.model.max_attempts))
+
+    async def poll(self, kwargs):
+        """Send one poll, return its ``(state, response)``."""
+        method = getattr(self.client, self.model.method)
+        try:
+            response = await method(**kwargs)
+        except ClientError as error:
+            response = error.response
+        else:
+            response = dict(response)
+            response.setdefault('ResponseMetadata', {'HTTPStatusCode': 200})
+        return self.model.state(response), response
+
+
+class _Wait(object):
+    # The polls of a wait, shared by the waits with the same parameters.
+
+    def __init__(self, key, waiter, kwargs, delay, max_attempts, future):
+        self.key = key
+        self.waiter = waiter
+        self.kwargs = kwargs
+        self.delay = delay
+        self.max_attempts = max_attempts
+        self.future = future
+        self.attempt = 0
+        # The tick of the slot the next poll is in, None once it is due.
+        self.tick = None
+        # The number of calls of ``WaiterScheduler.wait`` awaiting it.
+        self.callers = 0
+
+
+class WaiterScheduler(object):
+    """Schedule the polls of many waits on a single timer.
+
+    The polls due are kept in the slots of a timer wheel, one slot per
+    ``resolution`` seconds.  A single task sleeps until the next slot that
+    holds polls, and queues them for at most ``max_concurrency`` workers
+    to send.  The tasks stop when no wait is left.  A wait is dropped
+    once all the calls awaiting it have been cancelled.
+
+    :type resolution: float
+    :param resolution: The granularity of the timer, in seconds.
+
+    :type max_concurrency: int
+    :param max_concurrency: The maximum number of polls sent at the same
+        time.
+    """
+
+    def __init__(self, resolution=DEFAULT_RESOLUTION,
+                 max_concurrency=DEFAULT_MAX_CONCURRENCY):
+        self.resolution = resolution
+        self.max_concurrency = max_concurrency
+        self._slots = {}
+        # The ticks of the slots, to find the next one.
+        self._ticks = []
+        self._waits = {}
+        # The polls due, and the number of workers sending them.
+        self._ready = collections.deque()
+        self._workers = 0
+        # The worker tasks, referenced until they are done.
+        self._worker_tasks = set()
+        self._task = None
+        self._wakeup = None
+
+    def __len__(self):
+        return len(self._waits)
+
+    async def wait(self, waiter, kwargs, delay, max_attempts):
+        """Wait until the state of waiter is success, see ``Waiter.wait``."""
+        key = (waiter.name, _freeze(kwargs), delay, max_attempts)
+        wait = self._waits.get(key)
+        if wait is None:
+            loop = asyncio.get_running_loop()
+            wait = _Wait(key, waiter, kwargs, delay, max_attempts,
+                         loop.create_future())
+            self._waits[key] = wait
+            self._schedule(wait, 0)
+        wait.callers += 1
+        try:
+            # Shielded, so that a cancelled wait does not cancel the others
+            # sharing its polls.
+            return await asyncio.shield(wait.future)
+        finally:
+            wait.callers -= 1
+            if not wait.callers and not wait.future.done():
+                self._drop(wait)
+
+    def _drop(self, wait):
+        # Stop polling for a wait no call awaits anymore.
+        if self._waits.get(wait.key) is wait:
+            del self._waits[wait.key]
+        if wait.tick is not None:
+            slot = self._slots[wait.tick]
+            slot.remove(wait)
+            if not slot:
+                del self._slots[wait.tick]
+                self._ticks.remove(wait.tick)
+                heapq.heapify(self._ticks)
+            wait.tick = None
+        elif wait in self._ready:
+            self._ready.remove(wait)
+        # A poll in flight is ignored once it returns.
+        wait.future.cancel()
+        self._wakeup.set()
+
+    def _schedule(self, wait, delay):
+        loop = asyncio.get_running_loop()
+        tick = math.ceil((loop.time() + delay) / self.resolution)
+        slot = self._slots.get(tick)
+        if slot is None:
+            slot = self._slots[tick] = []
+            heapq.heappush(self._ticks, tick)
+        slot.append(wait)
+        wait.tick = tick
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = loop.create_task(self._run())
+        elif tick == self._ticks[0]:
+            # Earlier than the slot the timer sleeps until.
+            self._wakeup.set()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while self._ticks or self._workers:
+            timeout = None
+            if self._ticks:
+                timeout = self._ticks[0] * self.resolution - loop.time()
+            if timeout is None or timeout > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            ready = self._slots.pop(heapq.heappop(self._ticks))
+            for wait in ready:
+                wait.tick = None
+            self._ready.extend(ready)
+            while self._ready and self._workers < self.max_concurrency:
+                self._workers += 1
+                task = loop.create_task(self._work())
+                self._worker_tasks.add(task)
+                task.add_done_callback(self._worker_tasks.discard)
+
+    async def _work(self):
+        try:
+            while self._ready:
+                await self._poll(self._ready.popleft())
+        finally:
+            self._workers -= 1
+            self._wakeup.set()
+
+    async def _poll(self, wait):
+        wait.attempt += 1
+        try:
+            state, response = await wait.waiter.poll(wait.kwargs)
+        except Exception as error:
+            self._finish(wait, exception=error)
+            return
+        if wait.future.cancelled():
+            # Dropped while polled.
+            return
+        name = wait.waiter.name
+        if state == 'success':
+            self._finish(wait, result=response)
+        elif state == 'failure':
+            self._finish(wait, exception=WaiterError(
+                name=name, reason='Waiter encountered a terminal failure '
+                'state', last_response=response))
+        elif state is None and 'Error' in response:
+            self._finish(wait, exception=WaiterError(
+                name=name, reason='An error occurred (%s): %s' % (
+                    response['Error'].get('Code', 'Unknown'),
+                    response['Error'].get('Message', 'Unknown')),
+                last_response=response))
+        elif wait.attempt >= wait.max_attempts:
+            self._finish(wait, exception=WaiterError(
+                name=name, reason='Max attempts exceeded',
+                last_response=response))
+        else:
+            logger.debug('Waiter %s polled %s times, next poll in %s '
+                         'seconds.', name, wait.attempt, wait.delay)
+            self._schedule(wait, wait.delay)
+
+    def _finish(self, wait, result=None, exception=None):
+        if self._waits.get(wait.key) is wait:
+            del self._waits[wait.key]
+        if wait.future.done():
+            return
+        if exception is not None:
+            wait.future.set_exception(exception)
+            if not wait.callers:
+                # Nobody is left to retrieve it.
+                wait.future.exception()
+        else:
+            wait.future.set_result(result)
+
+
+def _freeze(value):
+    # A hashable key of the parameters of a wait.
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item))
+                            for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, (bytearray, set)):
+        return repr(value)
+    return value
@@ -0,0 +1,109 @@
+"""Measure the header work of signing a request: setting the headers of a
+DynamoDB request, the checks and replacements of
+``SigV4Auth._modify_request_before_signing``, and the canonical headers,
+with ``HeaderDict`` against a header dict title-casing every name, read by
+a signer lowercasing them again.
+
+Usage::
+
+    python -m benchmarks.bench_headers [iterations]
+"""
+import sys
+import time
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+from awsclient.auth import SIGNED_HEADERS_BLACKLIST, SigV4Auth
+from awsclient.datastructures import HeaderDict, MultiDict
+from awsclient.request import Request
+
+Credentials = namedtuple('Credentials', ['access_key', 'secret_key', 'token'])
+
+HEADERS = [
+    ('X-Amz-Target', 'DynamoDB_20120810.GetItem'),
+    ('Content-Type', 'application/x-amz-json-1.0'),
+    ('User-Agent', 'awsclient/0.0.1'),
+    ('X-Amz-Meta-Owner', 'team'),
+    ('X-Amz-Meta-Project', 'awsclient'),
+]
+
+
+def _hkey(s):
+    return s.title().replace('_', '-')
+
+
+class TitleCaseHeaderDict(MultiDict):
+    def __init__(self):
+        self.dict = {}
+
+    def __contains__(self, key):
+        return _hkey(key) in self.dict
+
+    def __delitem__(self, key):
+        del self.dict[_hkey(key)]
+
+    def __getitem__(self, key):
+        return self.dict[_hkey(key)][0]
+
+    def __setitem__(self, key, value):
+        self.dict[_hkey(key)] = [value if isinstance(value, str) else
+                                 str(value)]
+
+
+class LowercasingSigV4Auth(SigV4Auth):
+    def _sorted_headers_to_sign(self, request, url_parts=None):
+        header_map = {}
+        for name, value in request.headers.allitems():
+            lname = name.lower()
+            if lname not in SIGNED_HEADERS_BLACKLIST:
+                header_map.setdefault(lname, []).append(value)
+        if 'host' not in header_map:
+            header_map['host'] = [self._canonical_host(url_parts).lower()]
+        return [(name, header_map[name]) for name in sorted(header_map)]
+
+    def _canonical_headers(self, sorted_headers):
+        headers = []
+        for key, values in sorted_headers:
+            value = ','.join(self._header_value(v) for v in sorted(values))
+            headers.append('%s:%s' % (key, value))
+        return '\n'.join(headers)
+
+
+def header_work(signer, headers_cls, url_parts):
+    request = Request('POST', 'https://dynamodb.us-east-1.amazonaws.com/')
+    request.headers = headers = headers_cls()
+    request.context['timestamp'] = '20200101T000000Z'
+    for name, value in HEADERS:
+        headers[name] = value
+    signer._modify_request_before_signing(request)
+    sorted_headers = signer._sorted_headers_to_sign(request, url_parts)
+    return (signer._canonical_headers(sorted_headers),
+            ';'.join([key for key, _ in sorted_headers]))
+
+
+def run(signer, headers_cls, iterations):
+    url_parts = urlsplit('https://dynamodb.us-east-1.amazonaws.com/')
+    start = time.perf_counter()
+    for _ in range(iterations):
+        header_work(signer, headers_cls, url_parts)
+    return iterations / (time.perf_counter() - start)
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    credentials = Credentials('AKIDEXAMPLE', 'secret', 'token')
+    signer = SigV4Auth(credentials, 'dynamodb', 'us-east-1')
+    baseline = LowercasingSigV4Auth(credentials, 'dynamodb', 'us-east-1')
+    url_parts = urlsplit('https://dynamodb.us-east-1.amazonaws.com/')
+    assert header_work(signer, HeaderDict, url_parts) == header_work(
+        baseline, TitleCaseHeaderDict, url_parts)
+
+    title_rate = run(baseline, TitleCaseHeaderDict, iterations)
+    indexed_rate = run(signer, HeaderDict, iterations)
+    print('title-cased headers: %10.0f requests/s' % title_rate)
+    print('indexed headers:     %10.0f requests/s (%.2fx)' % (
+        indexed_rate, indexed_rate / title_rate))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""Measure the serialization of DynamoDB requests and the parsing of their
+responses by the code clientmaker generates for the json protocol, against
+a serializer and a parser walking the shapes of the model for every
+request.
+
+The clients must have been generated first, with ``python make.py``.
+
+Usage::
+
+    python -m benchmarks.bench_json_protocol [iterations]
+"""
+import asyncio
+import json
+import sys
+import time
+
+from awsclient.services.dynamodb import DynamoDBClient, _parse_get_item
+from awsclient.utils import (
+    decode_blob, encode_blob, parse_timestamp, serialize_timestamp)
+from clientmaker.model import ServiceModel
+
+ITEM = dict(
+    [('id', {'S': 'item-1'}), ('payload', {'B': b'x' * 64})] +
+    [('attr%d' % i, {'N': str(i)}) for i in range(30)] +
+    [('tags', {'L': [{'S': 'tag%d' % i} for i in range(10)]})])
+
+
+class RequestClient(DynamoDBClient):
+    """A client returning the request dicts instead of sending them."""
+
+    async def _make_api_call(self, operation_name, request_dict, parser,
+                             **kwargs):
+        return request_dict
+
+
+def walk_serialize(value, shape):
+    type_name = shape.type_name
+    if type_name == 'structure':
+        result = {}
+        for name, member in shape.members.items():
+            if value.get(name) is not None:
+                result[member.serialization.get('name', name)] = \
+                    walk_serialize(value[name], member)
+        return result
+    if type_name == 'list':
+        return [walk_serialize(item, shape.member) for item in value]
+    if type_name == 'map':
+        return {key: walk_serialize(item, shape.value)
+                for key, item in value.items()}
+    if type_name == 'timestamp':
+        return serialize_timestamp(value, 'unixTimestamp')
+    if type_name == 'blob':
+        return encode_blob(value)
+    return value
+
+
+def walk_parse(value, shape):
+    type_name = shape.type_name
+    if type_name == 'structure':
+        result = {}
+        for name, member in shape.members.items():
+            wire_name = member.serialization.get('name', name)
+            if value.get(wire_name) is not None:
+                result[name] = walk_parse(value[wire_name], member)
+        return result
+    if type_name == 'list':
+        return [walk_parse(item, shape.member) for item in value]
+    if type_name == 'map':
+        return {key: walk_parse(item, shape.value)
+                for key, item in value.items()}
+    if type_name == 'timestamp':
+        return parse_timestamp(value)
+    if type_name == 'blob':
+        return decode_blob(value)
+    return value
+
+
+def run(function, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    return iterations / (time.perf_counter() - start)
+
+
+async def run_async(function, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await function()
+    return iterations / (time.perf_counter() - start)
+
+
+async def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    model = ServiceModel.load('schema_data', 'dynamodb')
+    put_item = model.operation_model('PutItem')
+    get_item = model.operation_model('GetItem')
+    params = {'TableName': 'table', 'Item': ITEM}
+    client = RequestClient(credentials=object())
+    body = (await client.put_item(**params))['body']
+    assert json.loads(body) == json.loads(json.dumps(walk_serialize(
+        params, put_item.input_shape)))
+    response = json.dumps({'Item': json.loads(body)['Item']}).encode('utf-8')
+    assert _parse_get_item(200, {}, response) == walk_parse(
+        json.loads(response), get_item.output_shape)
+
+    walked = run(lambda: json.dumps(walk_serialize(
+        params, put_item.input_shape)).encode('utf-8'), iterations)
+    generated = await run_async(lambda: client.put_item(**params),
+                                iterations)
+    print('serialize walked:    %10.0f requests/s' % walked)
+    print('serialize generated: %10.0f requests/s (%.2fx)' % (
+        generated, generated / walked))
+    walked = run(lambda: walk_parse(
+        json.loads(response), get_item.output_shape), iterations)
+    generated = run(lambda: _parse_get_item(200, {}, response), iterations)
+    print('parse walked:        %10.0f responses/s' % walked)
+    print('parse generated:     %10.0f responses/s (%.2fx)' % (
+        generated, generated / walked))
+    await client.aclose()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,76 @@
+"""Measure event loop latency while the payload of a large upload is signed.
+
+A ticker coroutine records how late each of its 1ms sleeps wakes up while
+``SigV4Auth.add_auth`` and ``SigV4Auth.add_auth_async`` sign a request
+whose body is a file of the given size.
+
+Usage::
+
+    python -m benchmarks.bench_payload_hash [size_in_mib]
+"""
+import asyncio
+import sys
+import tempfile
+import time
+from collections import namedtuple
+
+from awsclient.auth import SigV4Auth
+from awsclient.request import Request
+
+Credentials = namedtuple('Credentials', ['access_key', 'secret_key', 'token'])
+TICK = 0.001
+
+
+async def ticker(lags, stop):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(TICK)
+        lags.append(loop.time() - start - TICK)
+
+
+async def measure(sign, body):
+    lags = []
+    stop = asyncio.Event()
+    task = asyncio.ensure_future(ticker(lags, stop))
+    await asyncio.sleep(0.05)
+    signer = SigV4Auth(Credentials('AKIDEXAMPLE', 'secret', None),
+                       's3', 'us-east-1')
+    request = Request('PUT', 'https://s3.amazonaws.com/bucket/key', data=body)
+    body.seek(0)
+    start = time.perf_counter()
+    await sign(signer, request)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await task
+    lags.sort()
+    return elapsed, lags[-1], lags[int(len(lags) * 0.99)], len(lags)
+
+
+async def sign_sync(signer, request):
+    signer.add_auth(request)
+
+
+async def sign_async(signer, request):
+    await signer.add_auth_async(request)
+
+
+def main():
+    size_mib = int(sys.argv[1]) if len(sys.argv) > 1 else 1024
+    block = b'x' * (1024 * 1024)
+    with tempfile.TemporaryFile() as body:
+        for _ in range(size_mib):
+            body.write(block)
+        body.flush()
+        for name, sign in (('add_auth', sign_sync),
+                           ('add_auth_async', sign_async)):
+            elapsed, max_lag, p99_lag, ticks = asyncio.run(
+                measure(sign, body))
+            print('%-15s signed %d MiB in %.2fs, %5d ticks, '
+                  'max loop lag %8.1fms, p99 %6.1fms' % (
+                      name, size_mib, elapsed, ticks,
+                      max_lag * 1000, p99_lag * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Measure the percent-encoding of S3 object keys, as url paths, and of
+query keys and values, with ``percent_encode`` against
+``urllib.parse.quote``: passes over the corpus with an empty cache, then
+passes over the same keys with the cache filled, as when the keys of a
+working set are listed, read and written again.
+
+The corpus is made of keys as found in S3 buckets: logs and date
+partitioned paths, photos with spaces in their names, unicode file names,
+Hive style partitions with ``=`` in their segments, and listing parameters.
+
+Usage::
+
+    python -m benchmarks.bench_percent_encode [keys] [passes]
+"""
+import random
+import sys
+import time
+from urllib.parse import quote
+
+from awsclient import utils
+from awsclient.utils import percent_encode
+
+
+def s3_keys(count):
+    random.seed(0)
+    services = ['web', 'api', 'worker', 'billing']
+    albums = ['summer vacation', 'Family & Friends', 'été 2020', '東京']
+    tables = ['events', 'sessions', 'orders']
+    keys = []
+    for i in range(count):
+        kind = i % 4
+        day = '2020/%02d/%02d' % (random.randint(1, 12), random.randint(1, 28))
+        if kind == 0:
+            keys.append('logs/%s/%s/%02d/part-%05d.log.gz' % (
+                random.choice(services), day, random.randint(0, 23), i))
+        elif kind == 1:
+            keys.append('photos/%s/%s/IMG %04d (copy).jpg' % (
+                day[:4], random.choice(albums), i))
+        elif kind == 2:
+            keys.append('documents/%s/rapport_annuel_%d_résumé.pdf' % (
+                random.choice(albums), i))
+        else:
+            keys.append('warehouse/%s/dt=%s/region=us-east-1/'
+                        'part-%05d.snappy.parquet' % (
+                            random.choice(tables), day.replace('/', '-'), i))
+    return keys
+
+
+def query_pairs(keys):
+    pairs = []
+    for key in keys:
+        pairs.append(('prefix', key.rsplit('/', 1)[0] + '/'))
+        pairs.append(('start-after', key))
+        pairs.append(('delimiter', '/'))
+        pairs.append(('encoding-type', 'url'))
+    return pairs
+
+
+def quote_work(keys, pairs):
+    paths = [quote(key, safe='/~') for key in keys]
+    query = [quote(k, safe='-_.~') + '=' + quote(v, safe='-_.~')
+             for k, v in pairs]
+    return paths, query
+
+
+def percent_encode_work(keys, pairs):
+    paths = [percent_encode(key, safe='/~') for key in keys]
+    query = [percent_encode(k) + '=' + percent_encode(v) for k, v in pairs]
+    return paths, query
+
+
+def cold_percent_encode_work(keys, pairs):
+    utils._cached_encode.cache_clear()
+    return percent_encode_work(keys, pairs)
+
+
+def run(function, keys, pairs, passes):
+    start = time.perf_counter()
+    for _ in range(passes):
+        function(keys, pairs)
+    return passes * (len(keys) + len(pairs)) / (time.perf_counter() - start)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    passes = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    keys = s3_keys(count)
+    pairs = query_pairs(keys)
+
+    cold_rate = run(cold_percent_encode_work, keys, pairs, passes)
+    warm_rate = run(percent_encode_work, keys, pairs, passes)
+    quote_rate = run(quote_work, keys, pairs, passes)
+    assert percent_encode_work(keys, pairs) == quote_work(keys, pairs)
+
+    print('quote:                %10.0f strings/s' % quote_rate)
+    print('percent_encode, cold: %10.0f strings/s (%.2fx)' % (
+        cold_rate, cold_rate / quote_rate))
+    print('percent_encode, warm: %10.0f strings/s (%.2fx)' % (
+        warm_rate, warm_rate / quote_rate))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Measure presigned S3 GET urls per second, signed one ``Request`` at a
+time by ``S3SigV4QueryAuth.add_auth`` against a batch of
+``S3SigV4QueryAuth.presign_many``.
+
+Usage::
+
+    python -m benchmarks.bench_presign [urls]
+"""
+import sys
+import time
+from collections import namedtuple
+from urllib.parse import parse_qs, quote, urlsplit
+
+from awsclient.auth import S3SigV4QueryAuth
+from awsclient.request import Request
+
+Credentials = namedtuple('Credentials', ['access_key', 'secret_key', 'token'])
+
+BUCKET = 'examplebucket'
+URL = 'https://examplebucket.s3.us-east-1.amazonaws.com'
+
+
+def sign_one(signer, key, timestamp):
+    request = Request('GET', '%s/%s' % (URL, quote(key, safe='/~')))
+    request.context['timestamp'] = timestamp
+    signer._modify_request_before_signing(request)
+    signer._inject_signature_to_request(request, signer.sign(request))
+    return request.url
+
+
+def query(url):
+    return dict((k, v[0]) for k, v in parse_qs(urlsplit(url).query).items())
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    keys = ['photos/2020/%08d image.jpg' % i for i in range(count)]
+    signer = S3SigV4QueryAuth(
+        Credentials('AKIDEXAMPLE', 'secret', None), 's3', 'us-east-1')
+
+    start = time.perf_counter()
+    urls = signer.presign_many(BUCKET, keys)
+    batch_rate = count / (time.perf_counter() - start)
+
+    timestamp = query(urls[0])['X-Amz-Date']
+    start = time.perf_counter()
+    for key in keys:
+        sign_one(signer, key, timestamp)
+    single_rate = count / (time.perf_counter() - start)
+
+    for key, url in zip(keys[:100], urls):
+        assert query(url) == query(sign_one(signer, key, timestamp))
+        assert urlsplit(url).path == urlsplit(
+            sign_one(signer, key, timestamp)).path
+    print('add_auth:     %10.0f urls/s' % single_rate)
+    print('presign_many: %10.0f urls/s (%.2fx)' % (
+        batch_rate, batch_rate / single_rate))
+
+
+if __name__ == '__main__':
+    main()
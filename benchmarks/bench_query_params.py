@@ -0,0 +1,71 @@
+"""Measure the query string work of a GET request with many parameters:
+building the params, the canonical query string signed, and the url built
+by httpx, with ``QueryParams`` against a ``MultiDict`` whose params are
+quoted again by the signer and by httpx.
+
+Usage::
+
+    python -m benchmarks.bench_query_params [iterations]
+"""
+import sys
+import time
+from urllib.parse import quote
+
+import httpx
+
+from awsclient.datastructures import MultiDict, QueryParams
+
+URL = 'https://s3.us-east-1.amazonaws.com/examplebucket'
+PARAMS = [('list-type', '2'), ('prefix', 'photos/2020/summer vacation/'),
+          ('delimiter', '/'), ('max-keys', '1000'),
+          ('start-after', 'photos/2020/summer vacation/IMG_0001.jpg'),
+          ('encoding-type', 'url'), ('fetch-owner', 'true')] + [
+    ('x-param-%02d' % i, 'value %d/%d' % (i, i * 7)) for i in range(20)]
+
+
+def canonical_query_string_params(params):
+    l = []
+    for param in sorted(params):
+        value = str(params[param])
+        l.append('%s=%s' % (quote(param, safe='-_.~'),
+                            quote(value, safe='-_.~')))
+    return '&'.join(l)
+
+
+def multidict_request():
+    params = MultiDict(PARAMS)
+    canonical = canonical_query_string_params(params)
+    request = httpx.Request('GET', URL, params=list(params.allitems()))
+    return canonical, request
+
+
+def query_params_request():
+    params = QueryParams(PARAMS)
+    canonical = params.canonical_query_string()
+    request = httpx.Request('GET', URL + '?' + params.query_string())
+    return canonical, request
+
+
+def run(function, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    return iterations / (time.perf_counter() - start)
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    canonical, request = query_params_request()
+    assert canonical == multidict_request()[0]
+    assert request.url.query.decode('ascii') == \
+        QueryParams(PARAMS).query_string()
+
+    multidict_rate = run(multidict_request, iterations)
+    query_params_rate = run(query_params_request, iterations)
+    print('MultiDict:   %10.0f requests/s' % multidict_rate)
+    print('QueryParams: %10.0f requests/s (%.2fx)' % (
+        query_params_rate, query_params_rate / multidict_rate))
+
+
+if __name__ == '__main__':
+    main()
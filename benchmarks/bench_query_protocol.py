@@ -0,0 +1,105 @@
+"""Measure the serialization of EC2 DescribeInstances requests, with
+hundreds of filters and instance ids, by the code clientmaker generates
+for the ec2 protocol against a serializer walking the shapes of the model
+into a dict of flattened keys, then encoded by
+``percent_encode_sequence``.
+
+The clients must have been generated first, with ``python make.py``.
+
+Usage::
+
+    python -m benchmarks.bench_query_protocol [iterations]
+"""
+import asyncio
+import sys
+import time
+
+from awsclient.services.ec2 import EC2Client
+from awsclient.utils import percent_encode_sequence
+from clientmaker.model import ServiceModel
+
+PARAMS = {
+    'Filters': [{'Name': 'tag:team-%d' % i,
+                 'Values': ['value-%d' % j for j in range(5)]}
+                for i in range(100)],
+    'InstanceIds': ['i-%017x' % i for i in range(200)],
+    'MaxResults': 1000,
+}
+
+
+class RequestClient(EC2Client):
+    """A client returning the request dicts instead of sending them."""
+
+    async def _make_api_call(self, operation_name, request_dict, parser,
+                             **kwargs):
+        return request_dict
+
+
+def member_name(name, member):
+    query_name = member.serialization.get('queryName')
+    if query_name is not None:
+        return query_name
+    location_name = member.serialization.get('name')
+    if location_name is not None:
+        return location_name[0].upper() + location_name[1:]
+    return name
+
+
+def walk_serialize(serialized, value, shape, prefix):
+    type_name = shape.type_name
+    if type_name == 'structure':
+        for name, member in shape.members.items():
+            if value.get(name) is not None:
+                key = member_name(name, member)
+                walk_serialize(serialized, value[name], member,
+                               '%s.%s' % (prefix, key) if prefix else key)
+    elif type_name == 'list':
+        for i, item in enumerate(value, 1):
+            walk_serialize(serialized, item, shape.member,
+                           '%s.%s' % (prefix, i))
+    elif type_name == 'boolean':
+        serialized[prefix] = 'true' if value else 'false'
+    else:
+        serialized[prefix] = str(value)
+
+
+def walked(params, operation_model):
+    serialized = {'Action': operation_model.wire_name,
+                  'Version': operation_model.metadata['apiVersion']}
+    walk_serialize(serialized, params, operation_model.input_shape, '')
+    return percent_encode_sequence(serialized).encode('utf-8')
+
+
+def run(function, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    return iterations / (time.perf_counter() - start)
+
+
+async def run_async(function, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await function()
+    return iterations / (time.perf_counter() - start)
+
+
+async def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    model = ServiceModel.load('schema_data', 'ec2')
+    operation_model = model.operation_model('DescribeInstances')
+    client = RequestClient(credentials=object())
+    body = (await client.describe_instances(**PARAMS))['body']
+    assert body == walked(PARAMS, operation_model)
+
+    walk_rate = run(lambda: walked(PARAMS, operation_model), iterations)
+    generated_rate = await run_async(
+        lambda: client.describe_instances(**PARAMS), iterations)
+    print('serialize walked:    %10.0f requests/s' % walk_rate)
+    print('serialize generated: %10.0f requests/s (%.2fx)' % (
+        generated_rate, generated_rate / walk_rate))
+    await client.aclose()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
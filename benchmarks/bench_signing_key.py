@@ -0,0 +1,52 @@
+"""Measure SigV4 signatures per second with and without the signing key cache.
+
+Usage::
+
+    python -m benchmarks.bench_signing_key [iterations]
+"""
+import sys
+import time
+from collections import namedtuple
+
+from awsclient.auth import SigV4Auth, SigningKeyCache, signing_key_cache
+
+Credentials = namedtuple('Credentials', ['access_key', 'secret_key', 'token'])
+
+
+class BenchRequest(object):
+    def __init__(self, timestamp):
+        self.context = {'timestamp': timestamp}
+
+
+class UncachedSigV4Auth(SigV4Auth):
+    def signing_key(self, request):
+        return SigningKeyCache.derive_key(
+            self.credentials.secret_key, request.context['timestamp'][0:8],
+            self._region_name, self._service_name)
+
+
+def run(signer, iterations):
+    request = BenchRequest('20200101T000000Z')
+    string_to_sign = '\n'.join([
+        'AWS4-HMAC-SHA256', '20200101T000000Z',
+        '20200101/us-east-1/s3/aws4_request', 'a' * 64])
+    start = time.perf_counter()
+    for _ in range(iterations):
+        signer.signature(string_to_sign, request)
+    return iterations / (time.perf_counter() - start)
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    credentials = Credentials('AKIDEXAMPLE', 'secret', None)
+    uncached = run(UncachedSigV4Auth(credentials, 's3', 'us-east-1'),
+                   iterations)
+    signing_key_cache.clear()
+    cached = run(SigV4Auth(credentials, 's3', 'us-east-1'), iterations)
+    print('uncached: %10.0f signatures/s' % uncached)
+    print('cached:   %10.0f signatures/s' % cached)
+    print('speedup:  %10.2fx' % (cached / uncached))
+
+
+if __name__ == '__main__':
+    main()
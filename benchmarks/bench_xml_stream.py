@@ -0,0 +1,90 @@
+"""Measure the peak memory and the time to the first item of parsing a
+large S3 ListObjectsV2 response incrementally, against parsing the whole
+document once it has been received, with the parser clientmaker
+generates for the operation.
+
+The clients must have been generated first, with ``python make.py``.
+
+Usage::
+
+    python -m benchmarks.bench_xml_stream [objects]
+"""
+import asyncio
+import sys
+import time
+import tracemalloc
+
+from awsclient.services.s3 import _parse_list_objects_v2
+
+HEADER = (b'<?xml version="1.0" encoding="UTF-8"?>'
+          b'<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+          b'<Name>bucket</Name><Prefix></Prefix><KeyCount>%d</KeyCount>'
+          b'<MaxKeys>%d</MaxKeys><IsTruncated>false</IsTruncated>')
+CONTENTS = (b'<Contents><Key>data/object-%08d</Key>'
+            b'<LastModified>2020-01-01T00:00:00.000Z</LastModified>'
+            b'<ETag>&quot;9b2cf535f27731c974343645a3985328&quot;</ETag>'
+            b'<Size>%d</Size><StorageClass>STANDARD</StorageClass>'
+            b'</Contents>')
+FOOTER = b'</ListBucketResult>'
+
+
+class Body(object):
+    """A response body received in chunks."""
+
+    def __init__(self, objects):
+        self.objects = objects
+
+    async def iter_chunks(self, chunk_size):
+        chunk = HEADER % (self.objects, self.objects)
+        for i in range(self.objects):
+            chunk += CONTENTS % (i, i)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = b''
+                await asyncio.sleep(0)
+        yield chunk + FOOTER
+
+
+async def read(body):
+    return b''.join([chunk async for chunk in body.iter_chunks(65536)])
+
+
+async def parse_whole(objects):
+    start = time.perf_counter()
+    parsed = _parse_list_objects_v2(200, {}, await read(Body(objects)))
+    first = time.perf_counter() - start
+    for item in parsed['Contents']:
+        pass
+    return first
+
+
+async def parse_stream(objects):
+    start = time.perf_counter()
+    first = None
+    async for name, item in _parse_list_objects_v2.iter_parse(
+            200, {}, Body(objects)):
+        if first is None:
+            first = time.perf_counter() - start
+    return first
+
+
+def measure(coroutine):
+    tracemalloc.start()
+    start = time.perf_counter()
+    first = asyncio.run(coroutine)
+    total = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return first, total, peak
+
+
+def main():
+    objects = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    for label, parse in (('whole', parse_whole), ('stream', parse_stream)):
+        first, total, peak = measure(parse(objects))
+        print('%-6s first item %8.1f ms, total %8.1f ms, peak %8.1f MB' % (
+            label, first * 1000, total * 1000, peak / 1e6))
+
+
+if __name__ == '__main__':
+    main()
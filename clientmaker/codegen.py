@@ -0,0 +1,1132 @@
+"""Generate the source of async service clients from service models.
+
+Every operation of a service becomes a coroutine method of the generated
+client class.  The code that serializes the arguments of the operation and
+the code that parses its response is generated as straight-line python,
+specialised to the input and output shapes of the operation, so that no
+shape is walked at request time.  Structures used by several operations
+get a module level ``_ser_*``/``_parse_*`` function, shared by all of them.
+"""
+import contextlib
+import html
+import itertools
+import keyword
+import re
+import textwrap
+from collections import OrderedDict
+from urllib.parse import quote
+
+from clientmaker.exceptions import ClientMakerError
+from clientmaker.utils import xform_name
+
+_NON_IDENTIFIER_RE = re.compile(r'\W')
+_TAG_RE = re.compile(r'<[^>]+>')
+_LABEL_RE = re.compile(r'\{([^}]+?)(\+?)\}')
+
+NUMBER_TYPES = ('integer', 'long', 'float', 'double')
+
+
+class UnsupportedProtocolError(ClientMakerError):
+    fmt = 'Unable to generate a client for the {protocol} protocol.'
+
+
+def python_name(name):
+    """Turn a name of the service model into a valid python identifier."""
+    name = _NON_IDENTIFIER_RE.sub('_', name)
+    if name[0].isdigit():
+        name = '_' + name
+    if keyword.iskeyword(name):
+        name += '_'
+    return name
+
+
+def summarize(documentation, width=72):
+    """The first paragraph of an HTML documentation string, as text."""
+    paragraph = documentation.split('</p>', 1)[0]
+    text = html.unescape(_TAG_RE.sub('', paragraph))
+    text = ' '.join(text.split()).replace('\\', '\\\\').replace('"""', "'''")
+    if not text:
+        return ''
+    return '\n'.join(textwrap.wrap(text, width))
+
+
+class Expression(str):
+    """A python expression, among the literal parts of a parameter name."""
+
+
+class Index(Expression):
+    """The python expression of the index of a list item or a map entry,
+    among the parts of a parameter name."""
+
+
+def join_key(*parts):
+    """Join the parts of the name of a query parameter.
+
+    Parts are literal strings, ``Expression``s or keys previously joined.
+    Adjacent literals are folded together, so that the generated code does
+    not concatenate constants at runtime.
+    """
+    folded = []
+    for part in parts:
+        for item in part if isinstance(part, tuple) else (part,):
+            if (folded and not isinstance(item, Expression) and
+                    not isinstance(folded[-1], Expression)):
+                folded[-1] += item
+            else:
+                folded.append(item)
+    return tuple(folded)
+
+
+def encode_key(key):
+    """The parts of a key built by ``join_key``, the literal ones percent
+    encoded into bytes."""
+    return tuple(part if isinstance(part, Expression) else
+                 quote(part, safe='-_.~').encode('ascii') for part in key)
+
+
+def bytes_source(*parts):
+    """The python source of bytes made of parts.
+
+    Parts are literal bytes and ``Expression``s of bytes, or of ints for
+    the ``Index``es.  The literals are folded into a single ``%`` format,
+    so that the expressions are formatted at once at runtime.
+    """
+    expressions = [part for part in parts if isinstance(part, Expression)]
+    if not expressions:
+        return repr(b''.join(parts))
+    literals = b''.join(
+        b'%d' if isinstance(part, Index) else
+        b'%s' if isinstance(part, Expression) else part.replace(b'%', b'%%')
+        for part in parts)
+    if len(expressions) == 1:
+        return '%r %% %s' % (literals, expressions[0])
+    return '%r %% (%s)' % (literals, ', '.join(expressions))
+
+
+def wire_name(member_name, shape):
+    return shape.serialization.get('name', member_name)
+
+
+def timestamp_format(shape, default):
+    return shape.serialization.get('timestampFormat', default)
+
+
+class CodeWriter(object):
+    """Accumulate lines of python source at the current indentation."""
+
+    def __init__(self, indent=0):
+        self._lines = []
+        self._indent = indent
+
+    def line(self, text):
+        self._lines.append('    ' * self._indent + text)
+
+    @contextlib.contextmanager
+    def block(self, header):
+        self.line(header)
+        self._indent += 1
+        yield
+        self._indent -= 1
+
+    def source(self):
+        return '\n'.join(self._lines)
+
+
+class ProtocolGenerator(object):
+    """Generate the request serializers and response parsers of a protocol.
+
+    ``serialize`` writes the statements of an operation method that build
+    the ``_request`` dict handed to ``BaseClient._make_api_call``, and
+    ``parser`` returns the name of the function parsing the response, or
+    of the ``XMLStreamParser`` parsing its stream.
+    """
+
+    def __init__(self, module):
+        self.module = module
+        self._conversions = {}
+
+    def serialize(self, operation, writer):
+        raise NotImplementedError('serialize')
+
+    def parser(self, operation):
+        raise NotImplementedError('parser')
+
+    def streams_output(self, operation):
+        """Whether the parser of operation reads the response as a
+        stream."""
+        return operation.has_streaming_output
+
+    def function_name(self, prefix, shape):
+        return '_%s_%s' % (prefix, python_name(shape.name))
+
+    def needs_conversion(self, shape, _seen=()):
+        """Whether the values of shape differ between python and the wire.
+
+        Values of shapes that need no conversion, no renamed member and no
+        scalar to encode, are passed through untouched.
+        """
+        type_name = shape.type_name
+        if type_name in ('timestamp', 'blob'):
+            return True
+        if type_name == 'list':
+            return self.needs_conversion(shape.member, _seen)
+        if type_name == 'map':
+            return self.needs_conversion(shape.value, _seen)
+        if type_name != 'structure':
+            return False
+        if shape.name in self._conversions:
+            return self._conversions[shape.name]
+        if shape.name in _seen:
+            # Recursive shapes are always converted.
+            return True
+        _seen += (shape.name,)
+        result = any(
+            wire_name(name, member) != name or
+            self.needs_conversion(member, _seen)
+            for name, member in shape.members.items())
+        self._conversions[shape.name] = result
+        return result
+
+    def write_request(self, writer, method, url_path, query, headers, body):
+        writer.line('_request = {')
+        writer.line('    %r: %r,' % ('method', method))
+        writer.line('    %r: %s,' % ('url_path', url_path))
+        writer.line('    %r: %s,' % ('query', query))
+        writer.line('    %r: %s,' % ('headers', headers))
+        writer.line('    %r: %s,' % ('body', body))
+        writer.line('}')
+
+    def members(self, shape):
+        if shape is None:
+            return []
+        return list(shape.members.items())
+
+    def optional(self, writer, shape, member_name, member):
+        """Open a block only run when the argument member_name was given.
+
+        Idempotency tokens that were not given are generated instead.
+        """
+        variable = python_name(member_name)
+        if member.metadata.get('idempotencyToken'):
+            with writer.block('if %s is None:' % variable):
+                writer.line('%s = str(uuid.uuid4())' % variable)
+            return _null_context()
+        if member_name in shape.required_members:
+            return _null_context()
+        return writer.block('if %s is not None:' % variable)
+
+    # JSON values, shared by the json and rest-json protocols.
+
+    def json_value(self, shape, expr):
+        """A python expression serializing expr to a JSON value."""
+        type_name = shape.type_name
+        if not self.needs_conversion(shape):
+            return expr
+        if type_name == 'structure':
+            return '%s(%s)' % (self.json_structure(shape), expr)
+        if type_name == 'list':
+            item = self.module.new_name('item')
+            return '[%s for %s in %s]' % (
+                self.json_value(shape.member, item), item, expr)
+        if type_name == 'map':
+            key, value = self.module.new_name('key'), self.module.new_name(
+                'value')
+            return '{%s: %s for %s, %s in %s.items()}' % (
+                key, self.json_value(shape.value, value), key, value, expr)
+        if type_name == 'timestamp':
+            return 'serialize_timestamp(%s, %r)' % (
+                expr, timestamp_format(shape, 'unixTimestamp'))
+        return 'encode_blob(%s)' % expr
+
+    def json_structure(self, shape):
+        name = self.function_name('ser', shape)
+
+        def build(writer):
+            with writer.block('def %s(value):' % name):
+                writer.line('result = {}')
+                for member_name, member in shape.members.items():
+                    writer.line('member = value.get(%r)' % member_name)
+                    with writer.block('if member is not None:'):
+                        writer.line('result[%r] = %s' % (
+                            wire_name(member_name, member),
+                            self.json_value(member, 'member')))
+                writer.line('return result')
+
+        return self.module.add_function(name, build)
+
+    def json_parsed_value(self, shape, expr):
+        """A python expression parsing the JSON value expr."""
+        type_name = shape.type_name
+        if not self.needs_conversion(shape):
+            return expr
+        if type_name == 'structure':
+            return '%s(%s)' % (self.json_parse_structure(shape), expr)
+        if type_name == 'list':
+            item = self.module.new_name('item')
+            return '[%s for %s in %s]' % (
+                self.json_parsed_value(shape.member, item), item, expr)
+        if type_name == 'map':
+            key, value = self.module.new_name('key'), self.module.new_name(
+                'value')
+            return '{%s: %s for %s, %s in %s.items()}' % (
+                key, self.json_parsed_value(shape.value, value), key, value,
+                expr)
+        if type_name == 'timestamp':
+            return 'parse_timestamp(%s)' % expr
+        return 'decode_blob(%s)' % expr
+
+    def json_parse_structure(self, shape):
+        name = self.function_name('parse', shape)
+
+        def build(writer):
+            with writer.block('def %s(value):' % name):
+                writer.line('parsed = {}')
+                self.json_parse_members(
+                    writer, shape.members.items(), 'value', 'parsed')
+                writer.line('return parsed')
+
+        return self.module.add_function(name, build)
+
+    def json_parse_members(self, writer, members, source, target):
+        for member_name, member in members:
+            writer.line('member = %s.get(%r)' % (
+                source, wire_name(member_name, member)))
+            with writer.block('if member is not None:'):
+                writer.line('%s[%r] = %s' % (
+                    target, member_name,
+                    self.json_parsed_value(member, 'member')))
+
+    # XML values, shared by the rest-xml, query and ec2 protocols.
+
+    def xml_parsed_value(self, shape, node):
+        """A python expression parsing the XML element node."""
+        type_name = shape.type_name
+        if type_name == 'structure':
+            return '%s(%s)' % (self.xml_parse_structure(shape), node)
+        if type_name == 'list':
+            item = self.module.new_name('item')
+            return '[%s for %s in %s.findall(%r)]' % (
+                self.xml_parsed_value(shape.member, item), item, node,
+                wire_name('member', shape.member))
+        if type_name == 'map':
+            return self.xml_parsed_map(shape, '%s.findall(%r)' % (
+                node, 'entry'))
+        return self.xml_parsed_text(shape, '%s.text' % node)
+
+    def xml_parsed_map(self, shape, entries):
+        entry = self.module.new_name('entry')
+        return '{%s.findtext(%r): %s for %s in %s}' % (
+            entry, wire_name('key', shape.key),
+            self.xml_parsed_value(shape.value, '%s.find(%r)' % (
+                entry, wire_name('value', shape.value))),
+            entry, entries)
+
+    def xml_parsed_text(self, shape, text):
+        type_name = shape.type_name
+        if type_name in ('integer', 'long'):
+            return 'int(%s)' % text
+        if type_name in ('float', 'double'):
+            return 'float(%s)' % text
+        if type_name == 'boolean':
+            return '%s == %r' % (text, 'true')
+        if type_name == 'timestamp':
+            return 'parse_timestamp(%s)' % text
+        if type_name == 'blob':
+            return 'decode_blob(%s)' % text
+        return '(%s or %r)' % (text, '')
+
+    def xml_parse_structure(self, shape):
+        name = self.function_name('parse', shape)
+
+        def build(writer):
+            with writer.block('def %s(element):' % name):
+                writer.line('parsed = {}')
+                self.xml_parse_members(
+                    writer, shape.members.items(), 'element', 'parsed')
+                writer.line('return parsed')
+
+        return self.module.add_function(name, build)
+
+    def xml_member_name(self, member_name, member):
+        if member.type_name == 'list' and member.serialization.get(
+                'flattened'):
+            name = member.member.serialization.get('name')
+            if name is not None:
+                return name
+        return wire_name(member_name, member)
+
+    def xml_parse_members(self, writer, members, element, target):
+        for member_name, member in members:
+            name = self.xml_member_name(member_name, member)
+            flattened = member.serialization.get('flattened')
+            if member.serialization.get('xmlAttribute'):
+                writer.line('node = %s.get(%r)' % (element, name))
+                with writer.block('if node is not None:'):
+                    writer.line('%s[%r] = %s' % (
+                        target, member_name,
+                        self.xml_parsed_text(member, 'node')))
+            elif flattened and member.type_name == 'list':
+                writer.line('nodes = %s.findall(%r)' % (element, name))
+                with writer.block('if nodes:'):
+                    item = self.module.new_name('item')
+                    writer.line('%s[%r] = [%s for %s in nodes]' % (
+                        target, member_name,
+                        self.xml_parsed_value(member.member, item), item))
+            elif flattened and member.type_name == 'map':
+                writer.line('nodes = %s.findall(%r)' % (element, name))
+                with writer.block('if nodes:'):
+                    writer.line('%s[%r] = %s' % (
+                        target, member_name,
+                        self.xml_parsed_map(member, 'nodes')))
+            else:
+                writer.line('node = %s.find(%r)' % (element, name))
+                with writer.block('if node is not None:'):
+                    writer.line('%s[%r] = %s' % (
+                        target, member_name,
+                        self.xml_parsed_value(member, 'node')))
+
+
+@contextlib.contextmanager
+def _null_context():
+    yield
+
+
+class JSONGenerator(ProtocolGenerator):
+    def serialize(self, operation, writer):
+        metadata = operation.metadata
+        input_shape = operation.input_shape
+        writer.line('_data = {}')
+        for member_name, member in self.members(input_shape):
+            with self.optional(writer, input_shape, member_name, member):
+                writer.line('_data[%r] = %s' % (
+                    wire_name(member_name, member),
+                    self.json_value(member, python_name(member_name))))
+        headers = {
+            'X-Amz-Target': '%s.%s' % (metadata['targetPrefix'],
+                                       operation.wire_name),
+            'Content-Type': 'application/x-amz-json-%s' % metadata.get(
+                'jsonVersion', '1.0'),
+        }
+        self.write_request(writer, 'POST', repr('/'), '[]',
+                           repr(headers), "json_dumps(_data)")
+
+    def parser(self, operation):
+        output_shape = operation.output_shape
+        if output_shape is None:
+            return 'parse_empty'
+        name = '_parse_%s' % xform_name(operation.name)
+
+        def build(writer):
+            with writer.block('def %s(status_code, headers, body):' % name):
+                with writer.block('if not body:'):
+                    writer.line('return {}')
+                writer.line('return %s' % self.json_parsed_value(
+                    output_shape, 'json_loads(body)'))
+
+        return self.module.add_function(name, build)
+
+
+class BaseRestGenerator(ProtocolGenerator):
+    """The parts of the request and response handled alike by the
+    rest-json and rest-xml protocols: the URI, the query string and the
+    headers."""
+
+    def serialize(self, operation, writer):
+        input_shape = operation.input_shape
+        path, _, static_query = operation.http['requestUri'].partition('?')
+        query = []
+        for pair in static_query.split('&') if static_query else []:
+            name, _, value = pair.partition('=')
+            query.append((name, value))
+        writer.line('_headers = {}')
+        writer.line('_query = %r' % query)
+        labels = {}
+        body_members = []
+        for member_name, member in self.members(input_shape):
+            location = member.serialization.get('location')
+            variable = python_name(member_name)
+            if location == 'uri':
+                labels[wire_name(member_name, member)] = (variable, member)
+            elif location == 'querystring':
+                with self.optional(writer, input_shape, member_name, member):
+                    self.serialize_querystring(writer, member, variable)
+            elif location == 'header':
+                with self.optional(writer, input_shape, member_name, member):
+                    self.serialize_header(writer, member, variable)
+            elif location == 'headers':
+                with self.optional(writer, input_shape, member_name, member):
+                    with writer.block('for key, value in %s.items():' %
+                                      variable):
+                        writer.line('_headers[%r + key] = value' %
+                                    member.serialization.get('name', ''))
+            else:
+                body_members.append((member_name, member))
+        body = self.serialize_body(writer, input_shape, body_members)
+        self.write_request(writer, operation.http['method'],
+                           self.url_path(path, labels), '_query', '_headers',
+                           body)
+
+    def url_path(self, path, labels):
+        values = []
+
+        def replace(match):
+            variable, member = labels[match.group(1)]
+            safe = '/~' if match.group(2) else '~'
+            values.append('percent_encode(%s, safe=%r)' % (variable, safe))
+            return '%s'
+
+        template = _LABEL_RE.sub(replace, path.replace('%', '%%'))
+        if not values:
+            return repr(path)
+        return '%r %% (%s,)' % (template, ', '.join(values))
+
+    def scalar_string(self, shape, expr, default_timestamp_format):
+        type_name = shape.type_name
+        if type_name == 'boolean':
+            return "('true' if %s else 'false')" % expr
+        if type_name in NUMBER_TYPES:
+            return 'str(%s)' % expr
+        if type_name == 'timestamp':
+            return 'serialize_timestamp(%s, %r)' % (
+                expr, timestamp_format(shape, default_timestamp_format))
+        return expr
+
+    def serialize_querystring(self, writer, shape, variable):
+        name = shape.serialization.get('name')
+        if shape.type_name == 'list':
+            writer.line('_query.extend((%r, %s) for item in %s)' % (
+                name, self.scalar_string(shape.member, 'item', 'iso8601'),
+                variable))
+        elif shape.type_name == 'map':
+            with writer.block('for key, value in %s.items():' % variable):
+                if shape.value.type_name == 'list':
+                    writer.line(
+                        '_query.extend((key, item) for item in value)')
+                else:
+                    writer.line('_query.append((key, value))')
+        else:
+            writer.line('_query.append((%r, %s))' % (
+                name, self.scalar_string(shape, variable, 'iso8601')))
+
+    def serialize_header(self, writer, shape, variable):
+        name = shape.serialization.get('name')
+        if shape.type_name == 'list':
+            value = "','.join(%s)" % variable
+        elif shape.serialization.get('jsonvalue'):
+            value = 'encode_blob(json_dumps(%s))' % variable
+        else:
+            value = self.scalar_string(shape, variable, 'rfc822')
+        writer.line('_headers[%r] = %s' % (name, value))
+
+    def serialize_body(self, writer, input_shape, body_members):
+        """Write the statements building the body, return its expression."""
+        raise NotImplementedError('serialize_body')
+
+    def parser(self, operation):
+        output_shape = operation.output_shape
+        if output_shape is None:
+            return 'parse_empty'
+        name = '_parse_%s' % xform_name(operation.name)
+
+        def build(writer):
+            with writer.block('def %s(status_code, headers, body):' % name):
+                writer.line('parsed = {}')
+                body_members = self.parse_head(writer, output_shape)
+                payload = output_shape.serialization.get('payload')
+                if payload is not None:
+                    self.parse_payload(writer, payload,
+                                       output_shape.members[payload])
+                elif body_members:
+                    with writer.block('if body:'):
+                        self.parse_body(writer, body_members)
+                writer.line('return parsed')
+
+        return self.module.add_function(name, build)
+
+    def parse_head(self, writer, output_shape):
+        """Write the statements parsing the members read from the headers
+        and the status code, return the other members."""
+        body_members = []
+        for member_name, member in output_shape.members.items():
+            location = member.serialization.get('location')
+            if location == 'header':
+                self.parse_header(writer, member_name, member)
+            elif location == 'headers':
+                prefix = member.serialization.get('name', '').lower()
+                writer.line(
+                    'parsed[%r] = {name[%d:]: value for name, value '
+                    'in headers.items() if name.startswith(%r)}' % (
+                        member_name, len(prefix), prefix))
+            elif location == 'statusCode':
+                writer.line('parsed[%r] = status_code' % member_name)
+            else:
+                body_members.append((member_name, member))
+        return body_members
+
+    def parse_header(self, writer, member_name, shape):
+        writer.line('value = headers.get(%r)' % shape.serialization.get(
+            'name', member_name))
+        type_name = shape.type_name
+        if shape.serialization.get('jsonvalue'):
+            value = 'json_loads(decode_blob(value))'
+        elif type_name in ('integer', 'long'):
+            value = 'int(value)'
+        elif type_name in ('float', 'double'):
+            value = 'float(value)'
+        elif type_name == 'boolean':
+            value = "value == 'true'"
+        elif type_name == 'timestamp':
+            value = 'parse_timestamp(value)'
+        elif type_name == 'list':
+            value = "[item.strip() for item in value.split(',')]"
+        else:
+            value = 'value'
+        with writer.block('if value is not None:'):
+            writer.line('parsed[%r] = %s' % (member_name, value))
+
+    def parse_payload(self, writer, member_name, shape):
+        if shape.serialization.get('streaming') or (
+                shape.type_name == 'blob'):
+            # Streaming outputs get the AsyncStreamingBody as body.
+            writer.line('parsed[%r] = body' % member_name)
+        elif shape.type_name == 'string':
+            writer.line("parsed[%r] = body.decode('utf-8')" % member_name)
+        else:
+            with writer.block('if body:'):
+                self.parse_payload_structure(writer, member_name, shape)
+
+    def parse_payload_structure(self, writer, member_name, shape):
+        raise NotImplementedError('parse_payload_structure')
+
+    def parse_body(self, writer, body_members):
+        raise NotImplementedError('parse_body')
+
+
+class RestJSONGenerator(BaseRestGenerator):
+    def serialize_body(self, writer, input_shape, body_members):
+        payload = input_shape and input_shape.serialization.get('payload')
+        if payload is not None:
+            member = input_shape.members[payload]
+            variable = python_name(payload)
+            if member.type_name in ('blob', 'string'):
+                return variable
+            writer.line('_body = None')
+            with self.optional(writer, input_shape, payload, member):
+                writer.line("_headers['Content-Type'] = 'application/json'")
+                writer.line('_body = json_dumps(%s)' %
+                            self.json_value(member, variable))
+            return '_body'
+        if not body_members:
+            return 'None'
+        writer.line('_data = {}')
+        for member_name, member in body_members:
+            with self.optional(writer, input_shape, member_name, member):
+                writer.line('_data[%r] = %s' % (
+                    wire_name(member_name, member),
+                    self.json_value(member, python_name(member_name))))
+        writer.line("_headers['Content-Type'] = 'application/json'")
+        return 'json_dumps(_data)'
+
+    def parse_payload_structure(self, writer, member_name, shape):
+        writer.line('parsed[%r] = %s' % (
+            member_name, self.json_parsed_value(shape, 'json_loads(body)')))
+
+    def parse_body(self, writer, body_members):
+        writer.line('data = json_loads(body)')
+        self.json_parse_members(writer, body_members, 'data', 'parsed')
+
+
+class RestXMLGenerator(BaseRestGenerator):
+    def xml_namespace(self, writer, element, shape):
+        namespace = shape.serialization.get('xmlNamespace')
+        if namespace is None:
+            return
+        attribute = 'xmlns'
+        if namespace.get('prefix'):
+            attribute = 'xmlns:%s' % namespace['prefix']
+        writer.line('%s.set(%r, %r)' % (element, attribute, namespace['uri']))
+
+    def serialize_body(self, writer, input_shape, body_members):
+        payload = input_shape and input_shape.serialization.get('payload')
+        if payload is not None:
+            member = input_shape.members[payload]
+            variable = python_name(payload)
+            if member.type_name in ('blob', 'string'):
+                return variable
+            writer.line('_body = None')
+            with self.optional(writer, input_shape, payload, member):
+                writer.line('_root = Element(%r)' % wire_name(
+                    member.name, member))
+                self.xml_namespace(writer, '_root', member)
+                writer.line('%s(_root, %s)' % (
+                    self.xml_structure(member), variable))
+                writer.line('_body = tostring(_root)')
+            return '_body'
+        if not body_members:
+            return 'None'
+        writer.line('_root = Element(%r)' % wire_name(
+            input_shape.name, input_shape))
+        self.xml_namespace(writer, '_root', input_shape)
+        for member_name, member in body_members:
+            with self.optional(writer, input_shape, member_name, member):
+                self.xml_value(writer, member, '_root',
+                               self.xml_member_name(member_name, member),
+                               python_name(member_name))
+        return 'tostring(_root) if len(_root) else None'
+
+    def xml_structure(self, shape):
+        name = self.function_name('ser', shape)
+
+        def build(writer):
+            with writer.block('def %s(element, value):' % name):
+                for member_name, member in shape.members.items():
+                    writer.line('member = value.get(%r)' % member_name)
+                    with writer.block('if member is not None:'):
+                        self.xml_value(
+                            writer, member, 'element',
+                            self.xml_member_name(member_name, member),
+                            'member')
+                if not shape.members:
+                    writer.line('pass')
+
+        return self.module.add_function(name, build)
+
+    def xml_value(self, writer, shape, parent, name, expr):
+        """Write the statements adding the value expr under parent."""
+        type_name = shape.type_name
+        if shape.serialization.get('xmlAttribute'):
+            writer.line('%s.set(%r, %s)' % (
+                parent, name, self.xml_text(shape, expr)))
+        elif type_name == 'structure':
+            child = self.module.new_name('child')
+            writer.line('%s = SubElement(%s, %r)' % (child, parent, name))
+            self.xml_namespace(writer, child, shape)
+            writer.line('%s(%s, %s)' % (self.xml_structure(shape), child,
+                                        expr))
+        elif type_name == 'list':
+            if not shape.serialization.get('flattened'):
+                child = self.module.new_name('child')
+                writer.line('%s = SubElement(%s, %r)' % (child, parent, name))
+                parent, name = child, wire_name('member', shape.member)
+            item = self.module.new_name('item')
+            with writer.block('for %s in %s:' % (item, expr)):
+                self.xml_value(writer, shape.member, parent, name, item)
+        elif type_name == 'map':
+            if not shape.serialization.get('flattened'):
+                child = self.module.new_name('child')
+                writer.line('%s = SubElement(%s, %r)' % (child, parent, name))
+                parent, name = child, 'entry'
+            key, value = self.module.new_name('key'), self.module.new_name(
+                'value')
+            entry = self.module.new_name('entry')
+            with writer.block('for %s, %s in %s.items():' % (
+                    key, value, expr)):
+                writer.line('%s = SubElement(%s, %r)' % (entry, parent, name))
+                writer.line('SubElement(%s, %r).text = %s' % (
+                    entry, wire_name('key', shape.key), key))
+                self.xml_value(writer, shape.value, entry,
+                               wire_name('value', shape.value), value)
+        else:
+            writer.line('SubElement(%s, %r).text = %s' % (
+                parent, name, self.xml_text(shape, expr)))
+
+    def xml_text(self, shape, expr):
+        if shape.type_name == 'blob':
+            return 'encode_blob(%s)' % expr
+        return self.scalar_string(shape, expr, 'iso8601')
+
+    def parse_payload_structure(self, writer, member_name, shape):
+        writer.line('parsed[%r] = %s' % (
+            member_name, self.xml_parsed_value(shape, 'xml_root(body)')))
+
+    def parse_body(self, writer, body_members):
+        writer.line('root = xml_root(body)')
+        self.xml_parse_members(writer, body_members, 'root', 'parsed')
+
+    def streams_output(self, operation):
+        return (operation.has_streaming_output or
+                bool(self.streamed_lists(operation)))
+
+    def streamed_lists(self, operation):
+        """The list members of the body of the output of operation, parsed
+        item by item from the stream of the response.
+
+        Only the lists of paginated operations, which can be long, are
+        streamed.  Outputs with a payload are parsed whole.
+        """
+        output_shape = operation.output_shape
+        if output_shape is None or output_shape.serialization.get(
+                'payload') or xform_name(
+                operation.name) not in self.module.paginators:
+            return []
+        return [(member_name, member)
+                for member_name, member in output_shape.members.items()
+                if member.type_name == 'list' and
+                member.serialization.get('location') is None and
+                not member.serialization.get('xmlAttribute')]
+
+    def parser(self, operation):
+        output_shape = operation.output_shape
+        lists = self.streamed_lists(operation)
+        if not lists:
+            return super(RestXMLGenerator, self).parser(operation)
+        # An XMLStreamParser, from the parser of the headers, the parser of
+        # the body members left once the list items have been streamed, and
+        # the list members keyed by the tag of their elements.
+        name = '_parse_%s' % xform_name(operation.name)
+        head_name = self.module.add_function(
+            name + '_head', lambda writer: self.parse_stream_head(
+                writer, name + '_head', output_shape))
+        body_name = self.module.add_function(
+            name + '_body', lambda writer: self.parse_stream_body(
+                writer, name + '_body', output_shape))
+        entries = []
+        for member_name, member in lists:
+            item = member.member
+            if item.type_name == 'structure':
+                convert = self.xml_parse_structure(item)
+            else:
+                convert = 'lambda node: %s' % self.xml_parsed_value(
+                    item, 'node')
+            if member.serialization.get('flattened'):
+                tag = self.xml_member_name(member_name, member)
+                item_tag = None
+            else:
+                tag = wire_name(member_name, member)
+                item_tag = wire_name('member', item)
+            entries.append('%r: (%r, %s, %r),' % (
+                tag, member_name, convert, item_tag))
+
+        def build(writer):
+            writer.line('%s = XMLStreamParser(%s, %s, {' % (
+                name, head_name, body_name))
+            for entry in entries:
+                writer.line('    ' + entry)
+            writer.line('})')
+
+        return self.module.add_function(name, build)
+
+    def parse_stream_head(self, writer, name, output_shape):
+        with writer.block('def %s(status_code, headers):' % name):
+            writer.line('parsed = {}')
+            self.parse_head(writer, output_shape)
+            writer.line('return parsed')
+
+    def parse_stream_body(self, writer, name, output_shape):
+        body_members = [
+            (member_name, member)
+            for member_name, member in output_shape.members.items()
+            if member.serialization.get('location') not in (
+                'header', 'headers', 'statusCode')]
+        with writer.block('def %s(root, parsed):' % name):
+            self.xml_parse_members(writer, body_members, 'root', 'parsed')
+
+
+class QueryGenerator(ProtocolGenerator):
+    """The query protocol, whose parameters are sent form encoded, with
+    nested members flattened into names like ``Tags.member.2.Key``.
+
+    The body is written into a single bytearray.  The names of the
+    parameters are percent encoded at generation time, and formatted with
+    the indexes of the list items at runtime: the values are the only thing
+    encoded per request.
+    """
+
+    def serialize(self, operation, writer):
+        input_shape = operation.input_shape
+        writer.line('_body = bytearray(%s)' % bytes_source(
+            b'Action=', *encode_key((operation.wire_name,)) + (
+                b'&Version=',) + encode_key((
+                    operation.metadata['apiVersion'],))))
+        for member_name, member in self.members(input_shape):
+            variable = python_name(member_name)
+            with self.optional(writer, input_shape, member_name, member):
+                self.query_value(
+                    writer, member, '_body',
+                    join_key(self.query_member_name(member_name, member)),
+                    variable)
+        headers = {'Content-Type':
+                   'application/x-www-form-urlencoded; charset=utf-8'}
+        self.write_request(writer, 'POST', repr('/'), '[]',
+                           repr(headers), 'bytes(_body)')
+
+    def query_member_name(self, member_name, member):
+        if member.type_name == 'list' and member.serialization.get(
+                'flattened'):
+            name = member.member.serialization.get('name')
+            if name is not None:
+                return name
+        return wire_name(member_name, member)
+
+    def query_structure(self, shape):
+        name = self.function_name('ser', shape)
+
+        def build(writer):
+            with writer.block('def %s(body, prefix, value):' % name):
+                for member_name, member in shape.members.items():
+                    writer.line('member = value.get(%r)' % member_name)
+                    with writer.block('if member is not None:'):
+                        self.query_value(
+                            writer, member, 'body', join_key(
+                                Expression('prefix'), self.query_member_name(
+                                    member_name, member)),
+                            'member')
+                if not shape.members:
+                    writer.line('pass')
+
+        return self.module.add_function(name, build)
+
+    def query_value(self, writer, shape, body, key, expr):
+        """Write the statements appending the parameters of expr to body.
+
+        key is the name of the parameter, as built by ``join_key``.
+        Structures are appended by their ``_ser_*`` function, given the
+        encoded prefix of the names of their members.
+        """
+        type_name = shape.type_name
+        if type_name == 'structure':
+            writer.line('%s(%s, %s, %s)' % (
+                self.query_structure(shape), body,
+                bytes_source(*encode_key(join_key(key, '.'))), expr))
+        elif type_name == 'list':
+            key = self.list_key(writer, shape, body, key, expr)
+            index, item = self.module.new_name('i'), self.module.new_name(
+                'item')
+            with writer.block('for %s, %s in enumerate(%s, 1):' % (
+                    index, item, expr)):
+                item_key = join_key(key, '.', Index(index))
+                self.query_value(writer, shape.member, body, item_key, item)
+        elif type_name == 'map':
+            if not shape.serialization.get('flattened'):
+                key = join_key(key, '.entry')
+            index, map_key, value = (self.module.new_name('i'),
+                                     self.module.new_name('key'),
+                                     self.module.new_name('value'))
+            with writer.block('for %s, (%s, %s) in enumerate(%s.items(), 1):'
+                              % (index, map_key, value, expr)):
+                key = join_key(key, '.', Index(index), '.')
+                self.query_parameter(writer, body, join_key(
+                    key, wire_name('key', shape.key)),
+                    self.query_scalar(shape.key, map_key))
+                self.query_value(writer, shape.value, body, join_key(
+                    key, wire_name('value', shape.value)), value)
+        else:
+            self.query_parameter(writer, body, key,
+                                 self.query_scalar(shape, expr))
+
+    def query_parameter(self, writer, body, key, value=None):
+        """Write the statement appending the parameter key to body, with
+        the bytes of the python expression value."""
+        parts = (b'&',) + encode_key(key) + (b'=',)
+        if value is not None:
+            parts += (Expression(value),)
+        writer.line('%s += %s' % (body, bytes_source(*parts)))
+
+    def list_key(self, writer, shape, body, key, expr):
+        """The prefix of the names of the items of a list parameter."""
+        with writer.block('if not %s:' % expr):
+            self.query_parameter(writer, body, key)
+        if shape.serialization.get('flattened'):
+            return key
+        return join_key(key, '.' + wire_name('member', shape.member))
+
+    def query_scalar(self, shape, expr):
+        """The python expression of the encoded bytes of a scalar."""
+        type_name = shape.type_name
+        if type_name == 'boolean':
+            return "(b'true' if %s else b'false')" % expr
+        if type_name in NUMBER_TYPES:
+            return "str(%s).encode('ascii')" % expr
+        if type_name == 'timestamp':
+            expr = 'serialize_timestamp(%s, %r)' % (
+                expr, timestamp_format(shape, 'iso8601'))
+        elif type_name == 'blob':
+            expr = 'encode_blob(%s)' % expr
+        return "percent_encode(%s).encode('ascii')" % expr
+
+    def parser(self, operation):
+        output_shape = operation.output_shape
+        if output_shape is None:
+            return 'parse_empty'
+        name = '_parse_%s' % xform_name(operation.name)
+        wrapper = output_shape.serialization.get('resultWrapper')
+
+        def build(writer):
+            with writer.block('def %s(status_code, headers, body):' % name):
+                with writer.block('if not body:'):
+                    writer.line('return {}')
+                writer.line('node = xml_root(body)')
+                if wrapper is not None:
+                    writer.line('node = node.find(%r)' % wrapper)
+                    with writer.block('if node is None:'):
+                        writer.line('return {}')
+                writer.line('return %s(node)' % self.xml_parse_structure(
+                    output_shape))
+
+        return self.module.add_function(name, build)
+
+
+class EC2Generator(QueryGenerator):
+    """The ec2 protocol, a variant of query where all lists are flattened
+    and parameters are named after the capitalized locationName."""
+
+    def query_member_name(self, member_name, member):
+        name = member.serialization.get('queryName')
+        if name is not None:
+            return name
+        name = member.serialization.get('name')
+        if name is not None:
+            return name[0].upper() + name[1:]
+        return member_name
+
+    def list_key(self, writer, shape, body, key, expr):
+        return key
+
+
+PROTOCOL_GENERATORS = {
+    'json': JSONGenerator,
+    'rest-json': RestJSONGenerator,
+    'rest-xml': RestXMLGenerator,
+    'query': QueryGenerator,
+    'ec2': EC2Generator,
+}
+
+
+class ServiceClientGenerator(object):
+    """Generate the module of the async client of a service.
+
+    :type service_model: clientmaker.model.ServiceModel
+    :param service_model: The model of the service.
+
+    :type service_name: str
+    :param service_name: The name the service is known as, e.g. ``s3``.
+
+    :type retry_config: dict
+    :param retry_config: The retry config of the service, from
+        ``RetryModel.service_config``.
+
+    :type endpoints: dict
+    :param endpoints: The endpoints of the service, from
+        ``EndpointResolver.service_config``.
+
+    :type waiters: dict
+    :param waiters: The waiters of the service, from
+        ``WaiterModel.client_config``.
+
+    :type paginators: dict
+    :param paginators: The paginators of the service, from
+        ``PaginatorModel.client_config``.
+    """
+
+    def __init__(self, service_model, service_name, retry_config=None,
+                 endpoints=None, waiters=None, paginators=None):
+        self.service_model = service_model
+        self.service_name = service_name
+        self.retry_config = retry_config
+        self.endpoints = endpoints
+        self.waiters = waiters or {}
+        self.paginators = paginators or {}
+        for config in itertools.chain(self.waiters.values(),
+                                      self.paginators.values()):
+            # The name of the generated method of the operation.
+            config['method'] = python_name(config['method'])
+        protocol = service_model.protocol
+        try:
+            generator_cls = PROTOCOL_GENERATORS[protocol]
+        except KeyError:
+            raise UnsupportedProtocolError(protocol=protocol)
+        self._protocol = generator_cls(self)
+        self._functions = OrderedDict()
+        self._names = itertools.count()
+
+    @property
+    def module_name(self):
+        return python_name(self.service_name)
+
+    @property
+    def class_name(self):
+        try:
+            service_id = self.service_model.service_id
+        except ClientMakerError:
+            service_id = self.service_name
+        words = re.split(r'[^0-9a-zA-Z]+', service_id)
+        return ''.join(w[0].upper() + w[1:] for w in words if w) + 'Client'
+
+    def new_name(self, prefix):
+        """A name for a variable of a comprehension or a loop."""
+        return '%s%d' % (prefix, next(self._names))
+
+    def add_function(self, name, build):
+        """Add the module level function name, generated by build.
+
+        Functions are generated once per module, whichever operations use
+        them.
+        """
+        if name not in self._functions:
+            # Reserved first, so that recursive shapes refer to themselves.
+            self._functions[name] = None
+            writer = CodeWriter()
+            build(writer)
+            self._functions[name] = writer.source()
+        return name
+
+    def generate(self, template):
+        """Render the source of the module with the jinja template."""
+        operations = [self._operation(name)
+                      for name in self.service_model.operation_names]
+        model = self.service_model
+        return template.render(
+            service_name=self.service_name,
+            service_full_name=model.metadata.get(
+                'serviceFullName', self.service_name),
+            api_version=model.api_version,
+            class_name=self.class_name,
+            attributes=[
+                ('SERVICE_NAME', self.service_name),
+                ('ENDPOINT_PREFIX', model.endpoint_prefix),
+                ('SIGNING_NAME', model.signing_name),
+                ('SIGNATURE_VERSION', model.signature_version),
+                ('PROTOCOL', model.protocol),
+                ('RETRY_CONFIG', self.retry_config),
+                ('ENDPOINTS', self.endpoints),
+                ('WAITERS', self.waiters),
+                ('PAGINATORS', self.paginators),
+            ],
+            documentation=summarize(model.documentation, 68),
+            operations=operations,
+            functions=[source for source in self._functions.values()])
+
+    def _operation(self, operation_name):
+        operation = self.service_model.operation_model(operation_name)
+        input_shape = operation.input_shape
+        arguments = ['self']
+        if input_shape is not None and input_shape.members:
+            required = input_shape.required_members
+            arguments.append('*')
+            arguments.extend(python_name(name)
+                             for name in input_shape.members
+                             if name in required)
+            arguments.extend('%s=None' % python_name(name)
+                             for name in input_shape.members
+                             if name not in required)
+        writer = CodeWriter(indent=2)
+        self._protocol.serialize(operation, writer)
+        call = ['%r' % operation.name, '_request',
+                self._protocol.parser(operation)]
+        if self._protocol.streams_output(operation):
+            call.append('stream_output=True')
+        if operation.auth_type in ('none', 'v4-unsigned-body'):
+            call.append('auth_type=%r' % operation.auth_type)
+        writer.line('return await self._make_api_call(')
+        writer.line('    %s)' % ', '.join(call))
+        method_name = python_name(xform_name(operation.name))
+        signature = textwrap.fill(
+            ', '.join(arguments) + '):', width=79,
+            initial_indent='    async def %s(' % method_name,
+            subsequent_indent=' ' * (len(method_name) + 15),
+            break_long_words=False, break_on_hyphens=False)
+        return {
+            'signature': signature,
+            'documentation': summarize(operation.documentation, 68),
+            'body': writer.source(),
+        }
@@ -41,6 +41,18 @@ class UnknownServiceError(ClientMakerError):
         "{known_service_names}")
 
 
+class UnknownAPIVersionError(ClientMakerError):
+    """Raised when trying to load a model of an unknown API version.
+
+    :ivar service_name: The name of the service.
+    :ivar api_version: The unknown API version.
+
+    """
+    fmt = (
+        "The '{service_name}' service does not have an API version of "
+        "'{api_version}'. Valid API versions are: {known_api_versions}")
+
+
 class WaiterConfigError(ClientMakerError):
     """Error when processing waiter configuration."""
     fmt = 'Error processing waiter config: {error_msg}'
\ No newline at end of file
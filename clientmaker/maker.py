@@ -1,12 +1,14 @@
 
 import sys
 import os
+import jinja2
 from loguru import logger
+from clientmaker.codegen import ServiceClientGenerator
 from clientmaker.model import SchemaLoader
 from clientmaker.model import ServiceModel
 from clientmaker.model import WaiterModel
 from clientmaker.model import PaginatorModel
-from clientmaker.model import EndpointModel
+from clientmaker.model import EndpointResolver
 from clientmaker.model import RetryModel
 from clientmaker.model import AllServices
 
@@ -15,25 +17,82 @@ class ClientMaker(object):
     def __init__(self):
         self.init_logging()
         self.data_path = os.path.join(os.getcwd(), 'schema_data')
+        self.output_path = os.path.join(os.getcwd(), 'awsclient', 'services')
+        self.jinja_env = jinja2.Environment(
+            loader=jinja2.FileSystemLoader(os.path.join(
+                os.path.dirname(__file__), 'client_template')),
+            trim_blocks=True, lstrip_blocks=True, keep_trailing_newline=True)
+        self.jinja_env.filters['pyrepr'] = repr
     
     def init_logging(self):
         logger.add(sys.stdout, format="[{time}] [{level}] [{message}]", filter="my_module", level="INFO")
     
-    def make(self):
-        logger.info('start to make client.')
+    def compile(self, service_names=None, all_versions=False):
+        """Compile the model cache of every service, or of service_names.
+
+        The service, paginators and waiters models are compiled into the
+        marshal files of ``schema_data/.cache``, see
+        ``SchemaLoader.compile``.  Files that are up to date are left as is.
+        """
+        logger.info('start to compile the model cache.')
         loader = SchemaLoader.get_loader(self.data_path)
-        model = ServiceModel.load(self.data_path, "s3")
-        logger.info(model.operation_names)
-        model_data = loader.load_service_model('s3', 'waiters')
-        model = WaiterModel(model_data)
-        logger.info(model.waiter_names)
-        model_data = loader.load_service_model('s3', 'paginators')
-        model = PaginatorModel(model_data)
-        logger.info(model.pagination_names)
+        loader.compile(service_names, all_versions=all_versions)
+        logger.info('compile process completed.')
+
+    def make(self, service_names=None, api_versions=None):
+        """Generate the client module of every service, or of service_names.
 
-        model = EndpointModel.load(self.data_path)
-        logger.info(model.partitions)
+        The model cache is compiled first, then the modules are written to
+        ``awsclient/services/<service>.py``.
 
-        model = RetryModel.load(self.data_path)
-        logger.info(model.definitions)
+        :type api_versions: dict
+        :param api_versions: The API versions to pin, keyed by service
+            name, e.g. ``{'ec2': '2015-04-15'}``.  The client of a pinned
+            version is written to ``<service>_<api_version>.py``, e.g.
+            ``awsclient/services/ec2_2015_04_15.py``, next to the client
+            of the latest version.
+        """
+        self.compile(service_names)
+        logger.info('start to make client.')
+        loader = SchemaLoader.get_loader(self.data_path)
+        template = self.jinja_env.get_template('client.jinja2')
+        retry_model = RetryModel.load(self.data_path)
+        endpoint_resolver = EndpointResolver.load(self.data_path)
+        if service_names is None:
+            service_names = list(loader.services)
+        builds = [(service_name, None) for service_name in service_names]
+        if api_versions:
+            builds.extend(sorted(api_versions.items()))
+        for service_name, api_version in builds:
+            type_names = loader.service_files(
+                service_name, api_version)['type_names']
+            if 'service' not in type_names:
+                continue
+            model = ServiceModel.load(self.data_path, service_name,
+                                      api_version)
+            waiters = None
+            if 'waiters' in type_names:
+                waiters = WaiterModel.load(
+                    self.data_path, service_name,
+                    api_version).client_config()
+            paginators = None
+            if 'paginators' in type_names:
+                paginators = PaginatorModel.load(
+                    self.data_path, service_name,
+                    api_version).client_config(model)
+            generator = ServiceClientGenerator(
+                model, service_name,
+                retry_config=retry_model.service_config(model.endpoint_prefix),
+                endpoints=endpoint_resolver.service_config(
+                    model.endpoint_prefix),
+                waiters=waiters, paginators=paginators)
+            source = generator.generate(template)
+            module_name = generator.module_name
+            if api_version is not None:
+                module_name = '%s_%s' % (module_name,
+                                         api_version.replace('-', '_'))
+            fpath = os.path.join(self.output_path, '%s.py' % module_name)
+            with open(fpath, 'w', encoding='utf-8') as f:
+                f.write(source)
+            logger.info('{} client written to {}', service_name, fpath)
         logger.info('make process completed.')
@@ -2,7 +2,7 @@
 from .service import ServiceModel
 from .waiter import WaiterModel
 from .retry import RetryModel
-from .endpoint import EndpointModel
+from .endpoint import EndpointModel, EndpointResolver
 from .paginator import PaginatorModel
 from .loader import SchemaLoader
 from .main import AllServices, OneServiceModel
\ No newline at end of file
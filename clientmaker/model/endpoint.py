@@ -1,6 +1,7 @@
 
 import os
 import json
+import re
 
 class PartitionModel(object):
     def __init__(self, partition_config):
@@ -25,4 +26,163 @@ class EndpointModel(object):
     def load(cls, data_path):
         with open(os.path.join(data_path, 'endpoints.json'), 'rb') as f:
             data = json.loads(f.read())
-            return cls(data)
\ No newline at end of file
+            return cls(data)
+
+
+class EndpointResolver(object):
+    """Resolve the endpoints of services from ``endpoints.json``.
+
+    The endpoints of every (partition, service, region) known to the
+    config, and the regions of every partition, are indexed once when the
+    resolver is created, and the region regexes of the partitions are
+    compiled, so that resolving an endpoint is a dict lookup.  The
+    endpoints of regions the config does not list, built from the
+    defaults of the partition matching them, are memoized.
+
+    :type endpoint_config: dict
+    :param endpoint_config: The content of ``endpoints.json``.
+    """
+
+    def __init__(self, endpoint_config):
+        self._endpoint_config = endpoint_config
+        self._partitions = endpoint_config['partitions']
+        self._region_partitions = {}
+        self._region_regexes = []
+        self._index = {}
+        self._cache = {}
+        for partition in self._partitions:
+            self._region_regexes.append(
+                (re.compile(partition['regionRegex']), partition))
+            for region_name in partition.get('regions', {}):
+                self._region_partitions[region_name] = partition
+        for partition in self._partitions:
+            name = partition['partition']
+            for service_name, service in partition['services'].items():
+                for endpoint_name in service.get('endpoints', {}):
+                    # Endpoints not named after a region, like aws-global,
+                    # are looked up like regions.
+                    self._region_partitions.setdefault(endpoint_name,
+                                                       partition)
+                    self._index[name, service_name, endpoint_name] = \
+                        self._resolve(partition, service_name, endpoint_name)
+                global_endpoint = self._global_endpoint(partition,
+                                                        service_name)
+                if global_endpoint is None:
+                    continue
+                # Every region of the partition uses the endpoint of a non
+                # regionalized service.
+                for region_name in partition.get('regions', {}):
+                    self._index.setdefault((name, service_name, region_name),
+                                           global_endpoint)
+
+    @classmethod
+    def load(cls, data_path):
+        with open(os.path.join(data_path, 'endpoints.json'), 'rb') as f:
+            return cls(json.loads(f.read()))
+
+    def construct_endpoint(self, service_name, region_name,
+                           partition_name=None):
+        """Return the endpoint of a service in a region.
+
+        :type service_name: str
+        :param service_name: The endpoint prefix of the service.
+
+        :type region_name: str
+        :param region_name: The name of the region.
+
+        :type partition_name: str
+        :param partition_name: The partition to look the region up in,
+            found from the region name if not given.
+
+        :rtype: dict
+        :return: The ``hostname``, ``protocols``, ``signatureVersions`` and,
+            if any, the ``credentialScope`` and ``sslCommonName`` of the
+            endpoint, or None if no partition has the region.
+        """
+        key = (partition_name, service_name, region_name)
+        if key in self._cache:
+            return self._cache[key]
+        if partition_name is None:
+            partition = self.partition_for_region(region_name)
+        else:
+            partition = self._partition(partition_name)
+        endpoint = None
+        if partition is not None:
+            endpoint = self._index.get(
+                (partition['partition'], service_name, region_name))
+            if endpoint is None:
+                endpoint = self._global_endpoint(partition, service_name)
+            if endpoint is None:
+                endpoint = self._resolve(partition, service_name,
+                                         region_name)
+        self._cache[key] = endpoint
+        return endpoint
+
+    def partition_for_region(self, region_name):
+        """Return the config of the partition of region_name, or None."""
+        partition = self._region_partitions.get(region_name)
+        if partition is None:
+            for regex, candidate in self._region_regexes:
+                if regex.match(region_name):
+                    partition = self._region_partitions[region_name] = \
+                        candidate
+                    break
+        return partition
+
+    def service_config(self, service_name):
+        """Return the endpoints of a service, as used by ``BaseClient``.
+
+        The config holds the resolved endpoints of every region listed for
+        the service, in all the partitions, and, for the regions it does
+        not list, the region regex and the endpoint template of each
+        partition, so that it can be embedded as is in the generated
+        clients.
+
+        :type service_name: str
+        :param service_name: The endpoint prefix of the service.
+        """
+        endpoints = {}
+        for (_, service, region_name), endpoint in self._index.items():
+            if service == service_name:
+                endpoints.setdefault(region_name, endpoint)
+        partitions = []
+        for partition in self._partitions:
+            template = self._global_endpoint(partition, service_name)
+            if template is None:
+                template = self._resolve(partition, service_name, '{region}')
+            partitions.append({'regionRegex': partition['regionRegex'],
+                               'endpoint': template})
+        return {'endpoints': endpoints, 'partitions': partitions}
+
+    def _partition(self, partition_name):
+        for partition in self._partitions:
+            if partition['partition'] == partition_name:
+                return partition
+        return None
+
+    def _global_endpoint(self, partition, service_name):
+        service = partition['services'].get(service_name, {})
+        endpoint_name = service.get('partitionEndpoint')
+        if endpoint_name is None or service.get('isRegionalized', True):
+            return None
+        return self._index.get(
+            (partition['partition'], service_name, endpoint_name)) or \
+            self._resolve(partition, service_name, endpoint_name)
+
+    def _resolve(self, partition, service_name, endpoint_name):
+        service = partition['services'].get(service_name, {})
+        endpoint = dict(partition.get('defaults', {}))
+        endpoint.update(service.get('defaults', {}))
+        endpoint.update(service.get('endpoints', {}).get(endpoint_name, {}))
+        endpoint['partition'] = partition['partition']
+        endpoint['endpointName'] = endpoint_name
+        endpoint['dnsSuffix'] = partition['dnsSuffix']
+        for name in ('hostname', 'sslCommonName'):
+            if name in endpoint:
+                endpoint[name] = endpoint[name].replace(
+                    '{service}', service_name).replace(
+                    '{dnsSuffix}', partition['dnsSuffix'])
+                if endpoint_name != '{region}':
+                    endpoint[name] = endpoint[name].replace(
+                        '{region}', endpoint_name)
+        return endpoint
@@ -65,14 +65,54 @@ applied to the model after it is loaded. Data in these files might represent
 information that doesn't quite fit in the original models, but is still needed
 for the sdk. For instance, additional operation parameters might be added here
 which don't represent the actual service api.
+
+
+Compiled Cache
+==============
+
+Decoding the JSON models is the bulk of the cost of loading them, so the
+service, paginators and waiters models of an API version of a service are
+compiled, once loaded, into a marshal file of the cache directory
+(``.cache`` in the data path by default), ``<service>-<api_version>.marshal``,
+with their keys and short strings interned.  A cache file records the
+modification times of the files it was compiled from, and is only used
+while they are unchanged.  ``SchemaLoader.compile`` builds the cache of all
+the services ahead of time, it is the first step of ``python make.py``, and
+``python make.py compile`` runs it alone.
+
+Services and their API versions are found and loaded on demand: loading
+the models of a service neither lists nor reads the directories of the
+other services, nor of its other API versions.  The latest API version is
+loaded unless one is given, e.g.::
+
+    loader = SchemaLoader.get_loader(data_path)
+    loader.load_service_model('ec2', 'service', api_version='2015-04-15')
+
+The models loaded are kept by the loader, which is shared by the data
+path, so each API version of a service is loaded once per process however
+many models use it.
 """
+import marshal
 import os
+import sys
 
 import json
 from collections import OrderedDict
 from clientmaker.exceptions import DataNotFoundError, UnknownServiceError
+from clientmaker.exceptions import UnknownAPIVersionError
+from clientmaker.utils import CachedProperty
 from loguru import logger
 
+CACHE_DIRNAME = '.cache'
+# Bumped whenever the layout of the cache files changes.
+CACHE_VERSION = 2
+# The model types compiled into the cache, the others (e.g. examples) are
+# read from their JSON file when asked for.
+COMPILED_TYPES = ('service', 'paginators', 'waiters')
+# Strings shorter than this are interned: keys, shape names, enum values...
+# Documentation strings are not worth it.
+INTERN_MAX_LENGTH = 64
+
 
 def deep_merge(base, extra):
     """Deeply two dictionaries, overriding existing keys in the base.
@@ -96,9 +136,15 @@ def deep_merge(base, extra):
 class SchemaLoader(object):
     _loaders = {}
 
-    def __init__(self, data_path):
+    def __init__(self, data_path, cache_path=None):
         self.data_path = data_path
-        self.services = self.load_services()
+        if cache_path is None:
+            cache_path = os.path.join(data_path, CACHE_DIRNAME)
+        self.cache_path = cache_path
+        self._api_versions = {}
+        # Keyed by (service_name, api_version).
+        self._service_files = {}
+        self._models = {}
 
     @classmethod
     def get_loader(cls, data_path):
@@ -110,32 +156,80 @@ class SchemaLoader(object):
     def extras_types(self):
         return self._extras_types
 
+    @CachedProperty
+    def services(self):
+        """The files of every service, only listed when first used."""
+        return self.load_services()
+
     def load_services(self):
         services = dict()
-        possible_services = [
-            d for d in os.listdir(self.data_path)
-            if os.path.isdir(os.path.join(self.data_path, d))]
-        for service_name in possible_services:
-            full_dirname = os.path.join(self.data_path, service_name)
-            api_versions = os.listdir(full_dirname)
-            max_api_version = max(api_versions)
-            type_names = dict()
-            service_version_dirname = os.path.join(full_dirname, max_api_version)
-            for d in os.listdir(service_version_dirname):
-                fpath = os.path.join(service_version_dirname, d)
-                if not fpath.endswith('.json'):
-                    continue
-                name = d.split('-')[0]
-                if d.find('.sdk-extras.') > 0:
-                    name = '{}.sdk-extras'.format(name)
-                if name in type_names:
-                    logger.error('{} already in typenames {}'.format(d, type_names))
-                type_names[name] = fpath
-            services[service_name] = dict(api_version = max_api_version, type_names=type_names)
+        for service_name in os.listdir(self.data_path):
+            if service_name.startswith(('.', '_')):
+                continue
+            if os.path.isdir(os.path.join(self.data_path, service_name)):
+                services[service_name] = self.service_files(service_name)
         return OrderedDict(sorted(services.items(), key=lambda t: t[0]))
 
+    def api_versions(self, service_name):
+        """The API versions of a service, sorted from the oldest.
+
+        Only the service directory is listed, the model files of a version
+        are looked for when it is used.
+        """
+        api_versions = self._api_versions.get(service_name)
+        if api_versions is not None:
+            return api_versions
+        full_dirname = os.path.join(self.data_path, service_name)
+        try:
+            api_versions = sorted(
+                d for d in os.listdir(full_dirname)
+                if not d.startswith(('.', '_')))
+        except (FileNotFoundError, NotADirectoryError):
+            raise UnknownServiceError(
+                service_name=service_name,
+                known_service_names=', '.join(sorted(self.services)))
+        if not api_versions:
+            raise DataNotFoundError(data_path=full_dirname)
+        self._api_versions[service_name] = api_versions
+        return api_versions
+
+    def service_files(self, service_name, api_version=None):
+        """Find the model files of an API version of a service.
 
-    def load_service_model(self, service_name, type_name):
+        :type api_version: str
+        :param api_version: The API version, e.g. ``2015-04-15``, the
+            latest one by default.
+        """
+        api_versions = self.api_versions(service_name)
+        if api_version is None:
+            api_version = api_versions[-1]
+        elif api_version not in api_versions:
+            raise UnknownAPIVersionError(
+                service_name=service_name, api_version=api_version,
+                known_api_versions=', '.join(api_versions))
+        key = (service_name, api_version)
+        files = self._service_files.get(key)
+        if files is not None:
+            return files
+        type_names = dict()
+        service_version_dirname = os.path.join(
+            self.data_path, service_name, api_version)
+        for d in os.listdir(service_version_dirname):
+            fpath = os.path.join(service_version_dirname, d)
+            if not fpath.endswith('.json'):
+                continue
+            name = d.split('-')[0]
+            if d.find('.sdk-extras.') > 0:
+                name = '{}.sdk-extras'.format(name)
+            if name in type_names:
+                logger.error('{} already in typenames {}'.format(
+                    d, type_names))
+            type_names[name] = fpath
+        files = dict(api_version=api_version, type_names=type_names)
+        self._service_files[key] = files
+        return files
+
+    def load_service_model(self, service_name, type_name, api_version=None):
         """Load a  service model
 
         This is the main method for loading aws models (e.g. a service
@@ -148,34 +242,124 @@ class SchemaLoader(object):
         :param type_name: The model type.  Valid types include, but are not
             limited to: ``service``, ``paginators``, ``waiters``.
 
+        :type api_version: str
+        :param api_version: The API version to load, the latest one of the
+            service by default.
 
         :raises: UnknownServiceError if there is no known service with
             the provided service_name.
 
+        :raises: UnknownAPIVersionError if the service has no api_version.
+
         :raises: DataNotFoundError if no data could be found for the
             service_name/type_name/api_version.
 
         :return: The loaded data, as a python type (e.g. dict, list, etc).
         """
-        data_fullpath = self.services.get(service_name, {}).get('type_names', {}).get(type_name)
-        if not data_fullpath:
-            raise UnknownServiceError(
-                service_name=service_name,
-                known_service_names=', '.join(sorted(self.services)))
-        model = self.load_data(data_fullpath)
-
-        # Load in all the extras
-        if service_name == 'service':
-            extras_name = 'service.sdk-extras'
-            extras_fullpath = self.services.get(service_name, {}).get('type_names', {}).get(extras_name)
-            extras_model = self.load_data(extras_fullpath)
-            if 'merge' in extras_model:
-                deep_merge(model, extras_model['merge'])
-
-        return model
+        if type_name in COMPILED_TYPES:
+            models = self._load_compiled(service_name, api_version)
+            if type_name in models:
+                return models[type_name]
+        else:
+            data_fullpath = self.service_files(service_name, api_version)[
+                'type_names'].get(type_name)
+            if data_fullpath:
+                return self.load_data(data_fullpath)
+        raise DataNotFoundError(data_path=os.path.join(
+            service_name, api_version or '', type_name))
+
+    def compile(self, service_names=None, all_versions=False):
+        """Compile the cache of service_names, or of every service.
+
+        Only the latest API version of a service is compiled, unless
+        all_versions is true.
+        """
+        if service_names is None:
+            service_names = list(self.services)
+        for service_name in service_names:
+            api_versions = [None]
+            if all_versions:
+                api_versions = self.api_versions(service_name)
+            for api_version in api_versions:
+                self._load_compiled(service_name, api_version)
+
+    def _load_compiled(self, service_name, api_version=None):
+        files = self.service_files(service_name, api_version)
+        key = (service_name, files['api_version'])
+        models = self._models.get(key)
+        if models is not None:
+            return models
+        cache_file = os.path.join(
+            self.cache_path, '%s-%s.marshal' % key)
+        models = self._read_cache(cache_file)
+        if models is None:
+            models, sources = self._load_json_models(service_name, files)
+            self._write_cache(cache_file, models, sources)
+        self._models[key] = models
+        return models
+
+    def _load_json_models(self, service_name, files):
+        type_names = files['type_names']
+        models = {}
+        for type_name in COMPILED_TYPES:
+            if type_name not in type_names:
+                continue
+            model = self.load_data(type_names[type_name])
+            # Load in all the extras
+            extras_fullpath = type_names.get(type_name + '.sdk-extras')
+            if extras_fullpath:
+                extras_model = self.load_data(extras_fullpath)
+                if 'merge' in extras_model:
+                    deep_merge(model, extras_model['merge'])
+            models[type_name] = _intern_strings(model)
+        # Adding a file changes the mtime of the version directory.
+        sources = [os.path.join(
+            self.data_path, service_name, files['api_version'])]
+        sources.extend(type_names.values())
+        return models, sources
+
+    def _read_cache(self, cache_file):
+        try:
+            with open(cache_file, 'rb') as f:
+                version, mtimes, models = marshal.loads(f.read())
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        if version != CACHE_VERSION:
+            return None
+        for fpath, mtime in mtimes:
+            try:
+                if os.stat(fpath).st_mtime_ns != mtime:
+                    return None
+            except OSError:
+                return None
+        logger.debug("Loading compiled models: {}".format(cache_file))
+        return models
+
+    def _write_cache(self, cache_file, models, sources):
+        try:
+            mtimes = [(fpath, os.stat(fpath).st_mtime_ns)
+                      for fpath in sources]
+            os.makedirs(self.cache_path, exist_ok=True)
+            temp_file = '%s.%d' % (cache_file, os.getpid())
+            with open(temp_file, 'wb') as f:
+                marshal.dump((CACHE_VERSION, mtimes, models), f)
+            os.replace(temp_file, cache_file)
+        except OSError as e:
+            # The cache is an optimization, a read-only data path is fine.
+            logger.debug("Unable to write {}: {}".format(cache_file, e))
 
     def load_data(self, full_path):
         with open(full_path, 'rb') as fp:
             payload = fp.read().decode('utf-8')
             logger.debug("Loading JSON file: {}".format(full_path))
-            return json.loads(payload, object_pairs_hook=OrderedDict)
+            return json.loads(payload)
+
+
+def _intern_strings(value):
+    if isinstance(value, dict):
+        return {sys.intern(k): _intern_strings(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_intern_strings(v) for v in value]
+    if isinstance(value, str) and len(value) < INTERN_MAX_LENGTH:
+        return sys.intern(value)
+    return value
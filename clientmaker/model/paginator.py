@@ -1,3 +1,11 @@
+from clientmaker.model.loader import SchemaLoader
+from clientmaker.model.service import OperationNotFoundError
+from clientmaker.utils import xform_name
+
+# The suffixes of the names of the lists of identifiers a listing can be
+# split on.
+IDENTIFIER_LIST_SUFFIXES = ('Ids', 'Names')
+
 
 class PaginatorModel(object):
     def __init__(self, paginator_config):
@@ -10,4 +18,61 @@ class PaginatorModel(object):
         except KeyError:
             raise ValueError("Paginator for operation does not exist: %s"
                              % operation_name)
-        return single_paginator_config
\ No newline at end of file
+        return single_paginator_config
+
+    @classmethod
+    def load(cls, data_path, service_name, api_version=None):
+        loader = SchemaLoader.get_loader(data_path)
+        return cls(loader.load_service_model(
+            service_name, "paginators", api_version))
+
+    def client_config(self, service_model=None):
+        """Return the configs of the paginators, as used by ``BaseClient``.
+
+        The configs are keyed by the snake case name of their operation,
+        which is also the name of its client method, so that they can be
+        embedded as is in the generated clients.
+
+        With the service model, the configs also tell how a listing can be
+        split into parallel streams, from the input shape of the operation:
+
+            * segments - Whether the operation takes ``Segment`` and
+              ``TotalSegments``, like the DynamoDB Scan.
+            * start_after - The member the listing starts after, like
+              ``StartAfter`` of S3 ListObjectsV2, to split it in ranges.
+            * list_members - The lists of identifiers a listing can be
+              split on, like the ``logStreamNames`` of CloudWatch Logs.
+              Only lists of strings named like identifiers are, other
+              lists like the ``AttributesToGet`` of the DynamoDB Scan
+              select what each item holds.
+        """
+        configs = {}
+        for operation_name in self.pagination_names:
+            method = xform_name(operation_name)
+            config = dict(self.get_paginator(operation_name), method=method)
+            if service_model is not None:
+                config.update(self._fan_out(service_model, operation_name))
+            configs[method] = config
+        return configs
+
+    def _fan_out(self, service_model, operation_name):
+        try:
+            input_shape = service_model.operation_model(
+                operation_name).input_shape
+        except OperationNotFoundError:
+            return {}
+        if input_shape is None:
+            return {}
+        members = input_shape.members
+        fan_out = {}
+        if 'Segment' in members and 'TotalSegments' in members:
+            fan_out['segments'] = True
+        if 'StartAfter' in members:
+            fan_out['start_after'] = 'StartAfter'
+        list_members = [name for name, member in members.items()
+                        if member.type_name == 'list' and
+                        member.member.type_name == 'string' and
+                        name.endswith(IDENTIFIER_LIST_SUFFIXES)]
+        if list_members:
+            fan_out['list_members'] = list_members
+        return fan_out
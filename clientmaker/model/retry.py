@@ -23,9 +23,46 @@ class RetryModel(object):
         self._retry_config = retry_config
         self.definitions = [RetryDefinition(k,v) for k,v in retry_config['definitions'].items()]
         self.retries = [SingleRetryModel(k, v) for k,v in retry_config['retry'].items()]
-    
+
     @classmethod
     def load(cls, data_path):
         with open(os.path.join(data_path, '_retry.json'), 'rb') as f:
             data = json.loads(f.read())
-            return cls(data)
\ No newline at end of file
+            return cls(data)
+
+    def service_config(self, endpoint_prefix):
+        """Return the retry config of a service, as used by
+        ``awsclient.retries``.
+
+        The config of the service is merged into the default one, and the
+        ``$ref`` to the shared definitions are resolved, so that the config
+        can be embedded as is in the generated clients.
+
+        :type endpoint_prefix: str
+        :param endpoint_prefix: The endpoint prefix of the service, the
+            retry rules are keyed by.
+        """
+        retry = self._retry_config['retry']
+        default = retry.get('__default__', {})
+        config = {}
+        for operation_name, operation_config in retry.get(
+                endpoint_prefix, {}).items():
+            config[operation_name] = self._resolve(operation_config)
+        service_default = config.get('__default__', {})
+        merged = dict(self._resolve(default), **service_default)
+        merged['policies'] = dict(self._resolve(default).get('policies', {}),
+                                  **service_default.get('policies', {}))
+        config['__default__'] = merged
+        return config
+
+    def _resolve(self, config):
+        definitions = self._retry_config['definitions']
+        config = dict(config)
+        policies = {}
+        for name, policy in config.get('policies', {}).items():
+            if '$ref' in policy:
+                policy = definitions[policy['$ref']]
+            policies[name] = policy
+        if policies:
+            config['policies'] = policies
+        return config
@@ -59,6 +59,12 @@ class Shape(object):
                       'endpointdiscoveryid']
     MAP_TYPE = OrderedDict
 
+    # Shapes are interned by their ShapeResolver, and a service model has
+    # thousands of them, so they have no __dict__.  The serialization and
+    # metadata are computed once, when the shape is created.
+    __slots__ = ('name', 'type_name', 'documentation', 'serialization',
+                 'metadata', '_shape_model', '_shape_resolver')
+
     def __init__(self, shape_name, shape_model, shape_resolver=None):
         """
 
@@ -91,66 +97,42 @@ class Shape(object):
             # be required to provide an object they won't use.
             shape_resolver = UnresolvableShapeMap()
         self._shape_resolver = shape_resolver
-        self._cache = {}
-
-    @CachedProperty
-    def serialization(self):
-        """Serialization information about the shape.
-
-        This contains information that may be needed for input serialization
-        or response parsing.  This can include:
-
-            * name
-            * queryName
-            * flattened
-            * location
-            * payload
-            * streaming
-            * xmlNamespace
-            * resultWrapper
-            * xmlAttribute
-            * jsonvalue
-            * timestampFormat
-
-        :rtype: dict
-        :return: Serialization information about the shape.
-
-        """
-        model = self._shape_model
-        serialization = {}
-        for attr in self.SERIALIZED_ATTRS:
-            if attr in self._shape_model:
-                serialization[attr] = model[attr]
+        # Serialization information about the shape.
+        #
+        # This contains information that may be needed for input
+        # serialization or response parsing.  This can include:
+        #
+        #     * name
+        #     * queryName
+        #     * flattened
+        #     * location
+        #     * payload
+        #     * streaming
+        #     * xmlNamespace
+        #     * resultWrapper
+        #     * xmlAttribute
+        #     * jsonvalue
+        #     * timestampFormat
+        serialization = {attr: shape_model[attr]
+                         for attr in self.SERIALIZED_ATTRS
+                         if attr in shape_model}
         # For consistency, locationName is renamed to just 'name'.
         if 'locationName' in serialization:
             serialization['name'] = serialization.pop('locationName')
-        return serialization
-
-    @CachedProperty
-    def metadata(self):
-        """Metadata about the shape.
-
-        This requires optional information about the shape, including:
-
-            * min
-            * max
-            * enum
-            * sensitive
-            * required
-            * idempotencyToken
-
-        :rtype: dict
-        :return: Metadata about the shape.
+        self.serialization = serialization
+        # Metadata about the shape, optional information including:
+        #
+        #     * min
+        #     * max
+        #     * enum
+        #     * sensitive
+        #     * required
+        #     * idempotencyToken
+        self.metadata = {attr: shape_model[attr]
+                         for attr in self.METADATA_ATTRS
+                         if attr in shape_model}
 
-        """
-        model = self._shape_model
-        metadata = {}
-        for attr in self.METADATA_ATTRS:
-            if attr in self._shape_model:
-                metadata[attr] = model[attr]
-        return metadata
-
-    @CachedProperty
+    @property
     def required_members(self):
         """A list of members that are required.
 
@@ -174,8 +156,15 @@ class Shape(object):
 
 
 class StructureShape(Shape):
-    @CachedProperty
+    __slots__ = ('_members',)
+
+    @property
     def members(self):
+        # Resolved on first access, as shapes can be recursive.
+        try:
+            return self._members
+        except AttributeError:
+            pass
         members = self._shape_model['members']
         # The members dict looks like:
         #    'members': {
@@ -186,9 +175,10 @@ class StructureShape(Shape):
         shape_members = self.MAP_TYPE()
         for name, shape_ref in members.items():
             shape_members[name] = self._resolve_shape_ref(shape_ref)
+        self._members = shape_members
         return shape_members
 
-    @CachedProperty
+    @property
     def event_stream_name(self):
         for member_name, member in self.members.items():
             if member.serialization.get('eventstream'):
@@ -197,23 +187,42 @@ class StructureShape(Shape):
 
 
 class ListShape(Shape):
-    @CachedProperty
+    __slots__ = ('_member',)
+
+    @property
     def member(self):
-        return self._resolve_shape_ref(self._shape_model['member'])
+        try:
+            return self._member
+        except AttributeError:
+            self._member = self._resolve_shape_ref(
+                self._shape_model['member'])
+            return self._member
 
 
 class MapShape(Shape):
-    @CachedProperty
+    __slots__ = ('_key', '_value')
+
+    @property
     def key(self):
-        return self._resolve_shape_ref(self._shape_model['key'])
+        try:
+            return self._key
+        except AttributeError:
+            self._key = self._resolve_shape_ref(self._shape_model['key'])
+            return self._key
 
-    @CachedProperty
+    @property
     def value(self):
-        return self._resolve_shape_ref(self._shape_model['value'])
+        try:
+            return self._value
+        except AttributeError:
+            self._value = self._resolve_shape_ref(self._shape_model['value'])
+            return self._value
 
 
 class StringShape(Shape):
-    @CachedProperty
+    __slots__ = ()
+
+    @property
     def enum(self):
         return self.metadata.get('enum', [])
 
@@ -255,9 +264,10 @@ class ServiceModel(object):
         self._service_name = service_name
 
     @classmethod
-    def load(cls, data_path, service_name):
+    def load(cls, data_path, service_name, api_version=None):
         loader = SchemaLoader.get_loader(data_path)
-        return cls(loader.load_service_model(service_name, "service"))
+        return cls(loader.load_service_model(
+            service_name, "service", api_version))
 
     def shape_for(self, shape_name, member_traits=None):
         return self._shape_resolver.get_shape_by_name(
@@ -558,9 +568,17 @@ class ShapeResolver(object):
 
     def __init__(self, shape_map):
         self._shape_map = shape_map
+        # Shapes are interned by name and member traits, so that walking
+        # a model creates each shape once.
         self._shape_cache = {}
 
     def get_shape_by_name(self, shape_name, member_traits=None):
+        key = (shape_name, _freeze_traits(member_traits)) if member_traits \
+            else shape_name
+        try:
+            return self._shape_cache[key]
+        except KeyError:
+            pass
         try:
             shape_model = self._shape_map[shape_name]
         except KeyError:
@@ -574,6 +592,7 @@ class ShapeResolver(object):
             shape_model = shape_model.copy()
             shape_model.update(member_traits)
         result = shape_cls(shape_name, shape_model, self)
+        self._shape_cache[key] = result
         return result
 
     def resolve_shape_ref(self, shape_ref):
@@ -597,6 +616,17 @@ class ShapeResolver(object):
             return self.get_shape_by_name(shape_name, member_traits)
 
 
+def _freeze_traits(value):
+    # A hashable key of member traits, whose values can be dicts (e.g.
+    # xmlNamespace) or lists.
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze_traits(item))
+                            for key, item in value.items()))
+    if isinstance(value, list):
+        return tuple(_freeze_traits(item) for item in value)
+    return value
+
+
 class UnresolvableShapeMap(object):
     """A ShapeResolver that will throw ValueErrors when shapes are resolved.
     """
@@ -1,9 +1,11 @@
 
-import jmespath
 import logging
 import time
 
+from awsclient.waiter import compile_acceptor
 from clientmaker.exceptions import WaiterConfigError
+from clientmaker.model.loader import SchemaLoader
+from clientmaker.utils import CachedProperty, xform_name
 
 
 class WaiterModel(object):
@@ -30,12 +32,37 @@ class WaiterModel(object):
         self.version = version
         self.waiter_names = list(sorted(waiter_config['waiters'].keys()))
 
+    @classmethod
+    def load(cls, data_path, service_name, api_version=None):
+        loader = SchemaLoader.get_loader(data_path)
+        return cls(loader.load_service_model(
+            service_name, "waiters", api_version))
+
     def _verify_supported_version(self, version):
         if version != self.SUPPORTED_VERSION:
-            raise Exception("Unsupported waiter version, supported version "
-                           "must be: %s, but version of waiter config "
-                           "is: %s" % (self.SUPPORTED_VERSION,
-                                       version))
+            raise WaiterConfigError(
+                error_msg="Unsupported waiter version, supported version "
+                          "must be: %s, but version of waiter config "
+                          "is: %s" % (self.SUPPORTED_VERSION, version))
+
+    def client_config(self):
+        """Return the configs of the waiters, as used by ``BaseClient``.
+
+        The configs are keyed by the snake case name of the waiters, and
+        hold the name of the client method of their operation, so that
+        they can be embedded as is in the generated clients.
+        """
+        configs = {}
+        for waiter_name in self.waiter_names:
+            config = self.get_waiter(waiter_name)
+            configs[xform_name(waiter_name)] = {
+                'name': waiter_name,
+                'method': xform_name(config.operation),
+                'delay': config.delay,
+                'maxAttempts': config.max_attempts,
+                'acceptors': config._config['acceptors'],
+            }
+        return configs
 
     def get_waiter(self, waiter_name):
         try:
@@ -59,7 +86,7 @@ class SingleWaiterConfig(object):
         self.delay = single_waiter_config['delay']
         self.max_attempts = single_waiter_config['maxAttempts']
 
-    @property
+    @CachedProperty
     def acceptors(self):
         acceptors = []
         for acceptor_config in self._config['acceptors']:
@@ -74,102 +101,8 @@ class AcceptorConfig(object):
         self.matcher = config['matcher']
         self.expected = config['expected']
         self.argument = config.get('argument')
-        self.matcher_func = self._create_matcher_func()
-
-    def _create_matcher_func(self):
-        # An acceptor function is a callable that takes a single value.  The
-        # parsed AWS response.  Note that the parsed error response is also
-        # provided in the case of errors, so it's entirely possible to
-        # handle all the available matcher capabilities in the future.
-        # There's only three supported matchers, so for now, this is all
-        # contained to a single method.  If this grows, we can expand this
-        # out to separate methods or even objects.
-
-        if self.matcher == 'path':
-            return self._create_path_matcher()
-        elif self.matcher == 'pathAll':
-            return self._create_path_all_matcher()
-        elif self.matcher == 'pathAny':
-            return self._create_path_any_matcher()
-        elif self.matcher == 'status':
-            return self._create_status_matcher()
-        elif self.matcher == 'error':
-            return self._create_error_matcher()
-        else:
-            raise WaiterConfigError(
-                error_msg="Unknown acceptor: %s" % self.matcher)
-
-    def _create_path_matcher(self):
-        expression = jmespath.compile(self.argument)
-        expected = self.expected
-
-        def acceptor_matches(response):
-            if 'Error' in response:
-                return
-            return expression.search(response) == expected
-        return acceptor_matches
-
-    def _create_path_all_matcher(self):
-        expression = jmespath.compile(self.argument)
-        expected = self.expected
-
-        def acceptor_matches(response):
-            if 'Error' in response:
-                return
-            result = expression.search(response)
-            if not isinstance(result, list) or not result:
-                # pathAll matcher must result in a list.
-                # Also we require at least one element in the list,
-                # that is, an empty list should not result in this
-                # acceptor match.
-                return False
-            for element in result:
-                if element != expected:
-                    return False
-            return True
-        return acceptor_matches
-
-    def _create_path_any_matcher(self):
-        expression = jmespath.compile(self.argument)
-        expected = self.expected
-
-        def acceptor_matches(response):
-            if 'Error' in response:
-                return
-            result = expression.search(response)
-            if not isinstance(result, list) or not result:
-                # pathAny matcher must result in a list.
-                # Also we require at least one element in the list,
-                # that is, an empty list should not result in this
-                # acceptor match.
-                return False
-            for element in result:
-                if element == expected:
-                    return True
-            return False
-        return acceptor_matches
-
-    def _create_status_matcher(self):
-        expected = self.expected
-
-        def acceptor_matches(response):
-            # We don't have any requirements on the expected incoming data
-            # other than it is a dict, so we don't assume there's
-            # a ResponseMetadata.HTTPStatusCode.
-            status_code = response.get('ResponseMetadata', {}).get(
-                'HTTPStatusCode')
-            return status_code == expected
-        return acceptor_matches
-
-    def _create_error_matcher(self):
-        expected = self.expected
-
-        def acceptor_matches(response):
-            # When the client encounters an error, it will normally raise
-            # an exception.  However, the waiter implementation will catch
-            # this exception, and instead send us the parsed error
-            # response.  So response is still a dictionary, and in the case
-            # of an error response will contain the "Error" and
-            # "ResponseMetadata" key.
-            return response.get("Error", {}).get("Code", "") == expected
-        return acceptor_matches
\ No newline at end of file
+        # The acceptors are matched by the code of the generated clients.
+        try:
+            self.matcher_func = compile_acceptor(config)[1]
+        except ValueError as error:
+            raise WaiterConfigError(error_msg=str(error))
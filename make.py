@@ -9,4 +9,8 @@ sys.path.insert(0, maker_path)
 from clientmaker.maker import ClientMaker
 
 cm = ClientMaker()
-cm.make()
\ No newline at end of file
+if sys.argv[1:] == ['compile']:
+    # Only compile the model cache, e.g. after updating schema_data.
+    cm.compile()
+else:
+    cm.make()
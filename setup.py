@@ -22,15 +22,19 @@ setup(
     description='asyncio aws sdk.',
     long_description=long_description,
     long_description_content_type="text/markdown",
-    packages=['awsclient'],
+    packages=['awsclient', 'awsclient.services'],
     include_package_data=False,
     zip_safe=False,
     platforms='any',
-    install_requires=['httpx==0.9.3', 'dataclass;python_version<"3.7"'],
+    install_requires=['httpx>=0.23', 'jmespath',
+                      'dataclass;python_version<"3.7"'],
     extras_require={
         'dev': [
             'pytest>=3',
         ],
+        'speedups': [
+            'orjson',
+        ],
     },
     classifiers=[
         'Development Status :: 2 - Pre-Alpha',
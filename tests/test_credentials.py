@@ -0,0 +1,224 @@
+"""Tests of the credential providers and of the refresh of temporary
+credentials, against a local HTTP server standing in for the instance
+metadata service and STS."""
+import asyncio
+import datetime
+import http.server
+import json
+import threading
+import time
+from urllib.parse import parse_qs
+
+import pytest
+
+from awsclient.auth import S3SigV4QueryAuth
+from awsclient.credentials import (
+    AssumeRoleProvider, InstanceMetadataProvider, RefreshableCredentials)
+from awsclient.exceptions import CredentialRetrievalError
+
+ROLE_NAME = 'test-role'
+ROLE_ARN = 'arn:aws:iam::123456789012:role/test-role'
+IMDS_TOKEN = 'imds-token'
+STS_RESPONSE = (
+    '<AssumeRoleResponse xmlns="https://sts.amazonaws.com/doc/2011-06-15/">'
+    '<AssumeRoleResult><Credentials>'
+    '<AccessKeyId>%s</AccessKeyId>'
+    '<SecretAccessKey>secret</SecretAccessKey>'
+    '<SessionToken>token</SessionToken>'
+    '<Expiration>%s</Expiration>'
+    '</Credentials></AssumeRoleResult></AssumeRoleResponse>')
+
+
+def expiration(seconds):
+    expiry = datetime.datetime.now(datetime.timezone.utc) + \
+        datetime.timedelta(seconds=seconds)
+    return expiry.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+class StandInServer(object):
+    """An HTTP server answering like IMDSv2 and STS.
+
+    The credentials of the n-th call, counted from 1, have the access key
+    ``AKID<n>`` and expire after ``lifetimes[n - 1]`` seconds, the last
+    lifetime being repeated.
+    """
+
+    def __init__(self, lifetimes=(3600,), delay=0):
+        self.lifetimes = lifetimes
+        self.delay = delay
+        self.requests = []
+        self.credential_calls = 0
+        self._lock = threading.Lock()
+        self._server = http.server.ThreadingHTTPServer(
+            ('127.0.0.1', 0), self._handler())
+        self.url = 'http://127.0.0.1:%d' % self._server.server_port
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def next_credentials(self):
+        with self._lock:
+            self.credential_calls += 1
+            number = self.credential_calls
+        time.sleep(self.delay)
+        lifetime = self.lifetimes[min(number, len(self.lifetimes)) - 1]
+        return 'AKID%d' % number, expiration(lifetime)
+
+    def _handler(self):
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_PUT(self):
+                server.requests.append(('PUT', self.path, dict(self.headers)))
+                if self.path == '/latest/api/token' and self.headers.get(
+                        'X-aws-ec2-metadata-token-ttl-seconds'):
+                    self._reply(200, IMDS_TOKEN)
+                else:
+                    self._reply(400, '')
+
+            def do_GET(self):
+                server.requests.append(('GET', self.path, dict(self.headers)))
+                if self.headers.get('X-aws-ec2-metadata-token') != \
+                        IMDS_TOKEN:
+                    self._reply(401, '')
+                    return
+                path = '/latest/meta-data/iam/security-credentials/'
+                if self.path == path:
+                    self._reply(200, ROLE_NAME + '\n')
+                elif self.path == path + ROLE_NAME:
+                    access_key, expiry = server.next_credentials()
+                    self._reply(200, json.dumps({
+                        'AccessKeyId': access_key,
+                        'SecretAccessKey': 'secret',
+                        'Token': 'token',
+                        'Expiration': expiry,
+                    }))
+                else:
+                    self._reply(404, '')
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                body = parse_qs(self.rfile.read(length).decode('utf-8'))
+                server.requests.append(('POST', self.path, dict(self.headers),
+                                        body))
+                if body.get('Action') != ['AssumeRole']:
+                    self._reply(400, '')
+                    return
+                self._reply(200, STS_RESPONSE % server.next_credentials())
+
+            def _reply(self, status, body):
+                body = body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+
+def assume_role_provider(server):
+    profiles = {
+        'dev': {'role_arn': ROLE_ARN, 'source_profile': 'base',
+                'role_session_name': 'tests'},
+        'base': {'aws_access_key_id': 'BASEKEY',
+                 'aws_secret_access_key': 'base-secret'},
+    }
+    return AssumeRoleProvider('dev', profiles, environ={},
+                              sts_endpoint_url=server.url)
+
+
+def test_instance_metadata_uses_imdsv2_token():
+    with StandInServer() as server:
+        provider = InstanceMetadataProvider(environ={}, endpoint=server.url)
+        credentials = asyncio.run(provider.load())
+    assert isinstance(credentials, RefreshableCredentials)
+    assert credentials.access_key == 'AKID1'
+    assert credentials.method == 'iam-role'
+    method, path, headers = server.requests[0]
+    assert (method, path) == ('PUT', '/latest/api/token')
+    assert all(request[2].get('X-aws-ec2-metadata-token') == IMDS_TOKEN
+               for request in server.requests[1:])
+
+
+def test_instance_metadata_disabled():
+    provider = InstanceMetadataProvider(
+        environ={'AWS_EC2_METADATA_DISABLED': 'true'},
+        endpoint='http://127.0.0.1:1')
+    assert asyncio.run(provider.load()) is None
+
+
+def test_assume_role_signs_with_source_profile():
+    with StandInServer() as server:
+        credentials = asyncio.run(assume_role_provider(server).load())
+    assert credentials.access_key == 'AKID1'
+    assert credentials.token == 'token'
+    method, path, headers, body = server.requests[0]
+    assert method == 'POST'
+    assert body['RoleArn'] == [ROLE_ARN]
+    assert body['RoleSessionName'] == ['tests']
+    assert 'Credential=BASEKEY/' in headers['Authorization']
+
+
+def test_concurrent_requests_share_one_refresh():
+    # Expiring within the mandatory timeout, the credentials are refreshed
+    # before any request is signed, by a single call to STS.
+    with StandInServer(lifetimes=(300, 3600), delay=0.1) as server:
+        async def main():
+            credentials = await assume_role_provider(server).load()
+            return await asyncio.gather(*[
+                credentials.get_frozen_credentials() for _ in range(2000)])
+
+        frozen = asyncio.run(main())
+    assert server.credential_calls == 2
+    assert {credentials.access_key for credentials in frozen} == {'AKID2'}
+
+
+def test_advisory_refresh_does_not_block():
+    # Expiring within the advisory timeout only, the credentials are
+    # refreshed in the background while requests use the current ones.
+    with StandInServer(lifetimes=(12 * 60, 3600), delay=0.2) as server:
+        async def main():
+            credentials = await assume_role_provider(server).load()
+            start = time.monotonic()
+            current = await credentials.get_frozen_credentials()
+            elapsed = time.monotonic() - start
+            await asyncio.sleep(0.5)
+            refreshed = await credentials.get_frozen_credentials()
+            return current, elapsed, refreshed
+
+        current, elapsed, refreshed = asyncio.run(main())
+    assert current.access_key == 'AKID1'
+    assert elapsed < 0.1
+    assert refreshed.access_key == 'AKID2'
+    assert server.credential_calls == 2
+
+
+def expired_credentials():
+    async def refresh():
+        return {'access_key': 'FRESH', 'secret_key': 'secret',
+                'token': 'token', 'expiry_time': expiration(3600)}
+    return RefreshableCredentials(
+        {'access_key': 'EXPIRED', 'secret_key': 'secret', 'token': 'token',
+         'expiry_time': expiration(-60)}, refresh, 'assume-role')
+
+
+def test_presign_refuses_expired_credentials():
+    signer = S3SigV4QueryAuth(expired_credentials(), 's3', 'us-east-1')
+    with pytest.raises(CredentialRetrievalError):
+        signer.presign_many('bucket', ['key'])
+
+
+def test_presign_async_refreshes_expired_credentials():
+    signer = S3SigV4QueryAuth(expired_credentials(), 's3', 'us-east-1')
+    urls = asyncio.run(signer.presign_many_async('bucket', ['key']))
+    assert 'X-Amz-Credential=FRESH%2F' in urls[0]